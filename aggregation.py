@@ -0,0 +1,522 @@
+"""
+oemof application for research project quarree100.
+
+Time series aggregation with typical periods. The timeseries of the nodes
+data are cut into periods (e.g. days), the periods are clustered with
+k-means or k-medoids on the normalised timeseries and the model is built
+for the representative periods only. Every timestep is weighted with the
+number of original periods its typical period stands for.
+
+Usage:
+
+>>> nd = setup_solve_model.nodes_from_excel(filename)
+>>> nd_agg = aggregation.aggregate_nodes_data(nd, n_periods=12)
+>>> es = setup_solve_model.setup_es(excel_nodes=nd_agg)
+>>> results = setup_solve_model.solve_es(energysystem=es, excel_nodes=nd_agg)
+
+Alternatively, the timeseries are downsampled chronologically to steps of
+several hours with :func:`downsample_nodes_data`.
+
+The content of the storages is carried over the original periods (see
+:func:`link_storage_periods`): every original period changes the content
+by the change within its typical period, so energy can be shifted between
+periods, e.g. from sunny to cloudy days or between seasons. Flow limits
+summed over the horizon (summed_max, summed_min) cannot be weighted, they
+are summed over the timesteps of the typical periods only. The limits of
+:const:`setup_solve_model.SUMMED_LIMITS` are therefore scaled to the share
+of the modelled timesteps in the represented ones, like the budget of a
+slice in :func:`setup_solve_model.slice_nodes_data`.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import copy
+import logging
+import numpy as np
+import pandas as pd
+from pyomo.environ import (Constraint, NonNegativeReals, NonPositiveReals,
+                           Var)
+import setup_solve_model
+
+
+def _sq_distances(x, centers):
+    """Squared euclidean distances between all rows of x and centers."""
+    d = ((x ** 2).sum(axis=1)[:, None] + (centers ** 2).sum(axis=1)[None, :]
+         - 2 * x.dot(centers.T))
+    return np.maximum(d, 0)
+
+
+def _init_centers(x, k, rng):
+    """Choose k rows of x as initial centers (k-means++)."""
+    idx = [rng.randint(len(x))]
+    d = _sq_distances(x, x[idx])[:, 0]
+    for _ in range(1, k):
+        if d.sum() > 0:
+            new = rng.choice(len(x), p=d / d.sum())
+        else:
+            new = rng.randint(len(x))
+        idx.append(new)
+        d = np.minimum(d, _sq_distances(x, x[[new]])[:, 0])
+    return np.array(idx)
+
+
+def _kmeans(x, k, rng, max_iter):
+    centers = x[_init_centers(x, k, rng)]
+    for _ in range(max_iter):
+        labels = _sq_distances(x, centers).argmin(axis=1)
+        new_centers = centers.copy()
+        for j in range(k):
+            if (labels == j).any():
+                new_centers[j] = x[labels == j].mean(axis=0)
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    return _sq_distances(x, centers).argmin(axis=1), None
+
+
+def _kmedoids(x, k, rng, max_iter):
+    dist = np.sqrt(_sq_distances(x, x))
+    medoids = _init_centers(x, k, rng)
+    for _ in range(max_iter):
+        labels = dist[:, medoids].argmin(axis=1)
+        new_medoids = medoids.copy()
+        for j in range(k):
+            members = np.flatnonzero(labels == j)
+            if len(members):
+                cost = dist[np.ix_(members, members)].sum(axis=1)
+                new_medoids[j] = members[cost.argmin()]
+        if (new_medoids == medoids).all():
+            break
+        medoids = new_medoids
+    return dist[:, medoids].argmin(axis=1), medoids
+
+
+def cluster_periods(periods, n_clusters, method='kmeans', seed=0,
+                    max_iter=100):
+    """Cluster the rows of a matrix of (normalised) periods.
+
+    Parameters
+    ----------
+    periods : numpy.ndarray
+        One row per period.
+    n_clusters : int
+        Number of clusters (typical periods).
+    method : str
+        'kmeans' (representatives are the cluster means) or 'kmedoids'
+        (representatives are original periods).
+    seed : int
+        Seed of the random initialisation.
+    max_iter : int
+        Maximum number of iterations.
+
+    Returns
+    -------
+    labels : numpy.ndarray
+        Cluster of every period, numbered in order of first occurrence.
+    medoids : numpy.ndarray or None
+        Index of the medoid period of every cluster ('kmedoids' only).
+    """
+    if not 0 < n_clusters <= len(periods):
+        raise ValueError('Number of typical periods has to be between 1 and '
+                         'the number of periods ({0}).'.format(len(periods)))
+
+    rng = np.random.RandomState(seed)
+    if method == 'kmeans':
+        labels, medoids = _kmeans(periods, n_clusters, rng, max_iter)
+    elif method == 'kmedoids':
+        labels, medoids = _kmedoids(periods, n_clusters, rng, max_iter)
+    else:
+        raise ValueError('Unknown clustering method {0}.'.format(method))
+
+    # renumber the (non-empty) clusters in order of their first occurrence
+    _, first = np.unique(labels, return_index=True)
+    order = labels[np.sort(first)]
+    new_labels = np.empty(labels.max() + 1, dtype=int)
+    new_labels[order] = np.arange(len(order))
+    if medoids is not None:
+        medoids = medoids[order]
+
+    return new_labels[labels], medoids
+
+
+def aggregation_error(original, aggregated):
+    """Compare the original with the reconstructed timeseries.
+
+    Parameters
+    ----------
+    original : :pandas:`pandas.DataFrame`
+    aggregated : :pandas:`pandas.DataFrame`
+        Timeseries with every period replaced by its typical period.
+
+    Returns
+    -------
+    :pandas:`pandas.DataFrame`
+        Per column: root mean square error relative to the range of the
+        column ('rmse'), mean absolute error relative to the range ('mae')
+        and relative deviation of the sum ('sum_deviation').
+    """
+    value_range = (original.max() - original.min()).replace(0, 1)
+    diff = aggregated - original
+    total = original.sum().replace(0, np.nan)
+
+    return pd.DataFrame({
+        'rmse': np.sqrt((diff ** 2).mean()) / value_range,
+        'mae': diff.abs().mean() / value_range,
+        'sum_deviation': diff.sum() / total})
+
+
+def aggregate_nodes_data(nodes_data, n_periods, period_length=24,
+                         method='kmeans', seed=0):
+    """Reduce the timeseries of the nodes data to typical periods.
+
+    Parameters
+    ----------
+    nodes_data : :obj:`dict`
+        Nodes data, e.g. from :func:`setup_solve_model.nodes_from_excel`.
+    n_periods : int
+        Number of typical periods.
+    period_length : int
+        Number of timesteps per period, e.g. 24 for days or 168 for weeks
+        of hourly data.
+    method : str
+        Clustering method, 'kmeans' or 'kmedoids'.
+    seed : int
+        Seed of the random initialisation of the clustering.
+
+    Returns
+    -------
+    :obj:`dict`
+        Copy of the nodes data with the timeseries of the typical periods
+        and the additional key 'aggregation' holding the 'weights' of every
+        timestep, the 'period_length', the 'assignment' of the original
+        periods to the typical periods and the 'error' of the aggregation
+        (see :func:`aggregation_error`). The limits summed over the horizon
+        are scaled to the typical periods (see module documentation).
+    """
+    ts = nodes_data['timeseries']
+    timesteps = int(nodes_data['general']['timesteps'][0])
+    n_full = timesteps // period_length
+    if n_full == 0:
+        raise ValueError('Period length {0} exceeds the {1} timesteps.'
+                         .format(period_length, timesteps))
+    if n_full * period_length < timesteps:
+        logging.warning(
+            'The last {0} timesteps do not form a full period and are '
+            'represented by the typical periods.'.format(
+                timesteps - n_full * period_length))
+
+    data = ts.iloc[:n_full * period_length].astype(float)
+    values = data.values
+
+    # normalise every column to [0, 1] before clustering
+    vmin = values.min(axis=0)
+    vrange = values.max(axis=0) - vmin
+    vrange[vrange == 0] = 1
+    normalised = (values - vmin) / vrange
+
+    def as_periods(array):
+        return array.reshape(n_full, period_length * array.shape[1])
+
+    labels, medoids = cluster_periods(as_periods(normalised), n_periods,
+                                      method=method, seed=seed)
+    n_clusters = labels.max() + 1
+    if n_clusters < n_periods:
+        logging.warning('Only {0} non-empty typical periods found.'
+                        .format(n_clusters))
+
+    periods = as_periods(values)
+    if medoids is None:
+        typical = np.array([periods[labels == j].mean(axis=0)
+                            for j in range(n_clusters)])
+    else:
+        typical = periods[medoids]
+
+    # number of represented periods, scaled to cover an incomplete last one,
+    # times the length of a timestep in hours
+    counts = np.bincount(labels, minlength=n_clusters)
+    hours = setup_solve_model.timestep_hours(nodes_data)
+    weights = np.repeat(counts * timesteps / float(n_full * period_length),
+                        period_length) * hours
+
+    new_ts = pd.DataFrame(typical.reshape(-1, values.shape[1]),
+                          columns=ts.columns,
+                          index=ts.index[:n_clusters * period_length])
+
+    reconstructed = pd.DataFrame(
+        typical[labels].reshape(-1, values.shape[1]),
+        columns=ts.columns, index=data.index)
+    error = aggregation_error(data, reconstructed)
+
+    logging.info(
+        'Aggregated {0} periods of {1} timesteps to {2} typical periods. '
+        'Mean relative RMSE: {3:.4f}, max. relative RMSE: {4:.4f} ({5})'
+        .format(n_full, period_length, n_clusters, error['rmse'].mean(),
+                error['rmse'].max(), error['rmse'].idxmax()))
+
+    nd = {k: v for k, v in nodes_data.items() if k != 'timeseries'}
+    nd['general'] = copy.deepcopy(nodes_data['general'])
+    nd['general'].loc[0, 'timesteps'] = n_clusters * period_length
+    nd['timeseries'] = new_ts
+
+    # the summed limits hold for the modelled timesteps (not weighted)
+    share = n_clusters * period_length / float(timesteps)
+    for key, columns in setup_solve_model.SUMMED_LIMITS.items():
+        if key in nd:
+            nd[key] = nd[key].copy()
+            for col in columns:
+                if col in nd[key]:
+                    nd[key][col] = pd.to_numeric(
+                        nd[key][col], errors='coerce') * share
+
+    nd['aggregation'] = {
+        'weights': weights,
+        'period_length': period_length,
+        'assignment': pd.Series(labels, name='typical_period',
+                                index=pd.RangeIndex(n_full, name='period')),
+        'error': error}
+
+    return nd
+
+
+def downsample_nodes_data(nodes_data, factor):
+    """Average the timeseries of the nodes data over steps of `factor`.
+
+    The steps are kept in chronological order and have a time increment of
+    `factor` timesteps, so storages are linked over the whole horizon like
+    in the original model. The last step may cover fewer timesteps, its
+    time increment is shortened accordingly. See also
+    :func:`setup_solve_model.resample_nodes_data` for steps given as
+    frequency.
+
+    Parameters
+    ----------
+    nodes_data : :obj:`dict`
+        Nodes data, e.g. from :func:`setup_solve_model.nodes_from_excel`.
+    factor : int
+        Number of timesteps averaged to one step.
+
+    Returns
+    -------
+    :obj:`dict`
+        Copy of the nodes data with the averaged timeseries and the
+        additional key 'aggregation' (see :func:`aggregate_nodes_data`)
+        with the 'timeincrement' of every step. The whole horizon forms a
+        single period.
+    """
+    if 'aggregation' in nodes_data:
+        raise ValueError('Aggregated nodes data cannot be downsampled.')
+
+    ts = nodes_data['timeseries']
+    timesteps = int(nodes_data['general']['timesteps'][0])
+
+    data = ts.iloc[:timesteps].astype(float)
+    steps = np.arange(timesteps) // factor
+    means = data.groupby(steps).mean()
+    hours = setup_solve_model.timestep_hours(nodes_data)
+    weights = np.bincount(steps) * hours
+
+    new_ts = pd.DataFrame(means.values, columns=ts.columns,
+                          index=ts.index[:timesteps:factor])
+
+    reconstructed = pd.DataFrame(means.values[steps], columns=ts.columns,
+                                 index=data.index)
+    error = aggregation_error(data, reconstructed)
+
+    logging.info(
+        'Downsampled {0} timesteps to {1} steps. Mean relative RMSE: '
+        '{2:.4f}, max. relative RMSE: {3:.4f} ({4})'.format(
+            timesteps, len(means), error['rmse'].mean(), error['rmse'].max(),
+            error['rmse'].idxmax()))
+
+    nd = {k: v for k, v in nodes_data.items() if k != 'timeseries'}
+    nd['general'] = copy.deepcopy(nodes_data['general'])
+    nd['general'].loc[0, 'timesteps'] = len(means)
+    nd['timeseries'] = new_ts
+    nd['aggregation'] = {
+        'weights': weights,
+        'timeincrement': weights,
+        'period_length': len(means),
+        'assignment': pd.Series(steps, name='step',
+                                index=pd.RangeIndex(timesteps,
+                                                    name='timestep')),
+        'error': error}
+
+    return nd
+
+
+def _storage_level_bounds(block, n, t):
+    """Return the minimum and maximum content of a storage at a timestep."""
+    if hasattr(block, 'invest'):
+        capacity = block.invest[n] + n.investment.existing
+    else:
+        capacity = n.nominal_storage_capacity
+    return (capacity * n.min_storage_level[t],
+            capacity * n.max_storage_level[t])
+
+
+def link_storage_periods(om, period_length, assignment=None):
+    """Link the storages of a model built for typical periods.
+
+    Without `assignment` the storages are cyclic within every typical
+    period: the storage balance of the first timestep of every period refers
+    to the content at the end of the same period instead of the end of the
+    previous (unrelated) typical period. The first period starts with the
+    initial content of the storage and ends with it.
+
+    With the `assignment` of the original periods to the typical periods
+    the content is carried over the whole horizon (superposition of inter-
+    and intra-period content):
+
+    * :attr:`inter_content[n, p]` is the content at the beginning of the
+      original period p (p = 0 is the initial content, the last one the
+      content at the end of the horizon). It changes from period to period
+      by the change of content within the assigned typical period.
+    * The content of a typical period (:attr:`capacity`) is relative to its
+      own start content :attr:`period_start[n, s]`, its maximum and minimum
+      deviation from it (:attr:`intra_max`, :attr:`intra_min`) added to the
+      content of every original period has to be within the limits of the
+      storage.
+
+    Self-discharge of the carried content is approximated with the loss
+    rate of the first timestep of the typical period.
+
+    Parameters
+    ----------
+    om : :class:`oemof.solph.Model`
+        Model built from aggregated nodes data.
+    period_length : int
+        Number of timesteps per typical period.
+    assignment : array-like (optional)
+        Typical period of every original period, e.g.
+        `nodes_data['aggregation']['assignment']`.
+    """
+    timesteps = list(om.TIMESTEPS)
+    starts = timesteps[::period_length]
+
+    for name in ['GenericStorageBlock', 'GenericInvestmentStorageBlock']:
+        block = getattr(om, name, None)
+        if not hasattr(block, 'capacity'):
+            continue
+
+        storages = list(block.balance_first.keys())
+
+        if assignment is None:
+            _cyclic_periods(om, block, storages, starts, period_length)
+        else:
+            _inter_periods(om, block, storages, starts, period_length,
+                           [starts[k] for k in np.asarray(assignment)])
+
+
+def _cyclic_periods(om, block, storages, starts, period_length):
+    """Make the storages cyclic within every typical period."""
+
+    def _period_balance_rule(b, n, t):
+        """Storage balance of the first timestep of a typical period."""
+        i = list(n.inputs.keys())[0]
+        o = list(n.outputs.keys())[0]
+        expr = 0
+        expr += b.capacity[n, t]
+        expr += - b.capacity[n, t + period_length - 1] * (
+            1 - n.loss_rate[t])
+        expr += (- om.flow[i, n, t] *
+                 n.inflow_conversion_factor[t]) * om.timeincrement[t]
+        expr += (om.flow[n, o, t] /
+                 n.outflow_conversion_factor[t]) * om.timeincrement[t]
+        return expr == 0
+
+    def _first_period_rule(b, n):
+        """Content at the end of the first period equals initial one."""
+        return b.capacity[n, period_length - 1] == b.init_cap[n]
+
+    for n in storages:
+        for t in starts[1:]:
+            block.balance[n, t].deactivate()
+        if n in block.balanced_cstr:
+            block.balanced_cstr[n].deactivate()
+
+    block.period_balance = Constraint(storages, starts[1:],
+                                      rule=_period_balance_rule)
+    block.first_period_cyclic = Constraint(storages,
+                                           rule=_first_period_rule)
+
+
+def _inter_periods(om, block, storages, starts, period_length, periods):
+    """Carry the content of the storages over the original periods, which
+    start with the typical periods `periods`."""
+    timesteps = list(om.TIMESTEPS)
+    balanced = [n for n in storages if n in block.balanced_cstr]
+
+    block.period_start = Var(storages, starts, within=NonNegativeReals)
+    block.intra_max = Var(storages, starts, within=NonNegativeReals)
+    block.intra_min = Var(storages, starts, within=NonPositiveReals)
+    block.inter_content = Var(storages, range(len(periods) + 1),
+                              within=NonNegativeReals)
+
+    def _period_balance_rule(b, n, t):
+        """Storage balance of the first timestep of a typical period."""
+        i = list(n.inputs.keys())[0]
+        o = list(n.outputs.keys())[0]
+        expr = 0
+        expr += b.capacity[n, t]
+        expr += - b.period_start[n, t] * (1 - n.loss_rate[t])
+        expr += (- om.flow[i, n, t] *
+                 n.inflow_conversion_factor[t]) * om.timeincrement[t]
+        expr += (om.flow[n, o, t] /
+                 n.outflow_conversion_factor[t]) * om.timeincrement[t]
+        return expr == 0
+
+    def _period_of(t):
+        return t - t % period_length
+
+    def _intra_max_rule(b, n, t):
+        s = _period_of(t)
+        return b.intra_max[n, s] >= b.capacity[n, t] - b.period_start[n, s]
+
+    def _intra_min_rule(b, n, t):
+        s = _period_of(t)
+        return b.intra_min[n, s] <= b.capacity[n, t] - b.period_start[n, s]
+
+    def _inter_balance_rule(b, n, p):
+        """Content at the beginning of the next original period."""
+        s = periods[p]
+        return b.inter_content[n, p + 1] == (
+            b.inter_content[n, p] * (1 - n.loss_rate[s]) ** period_length +
+            b.capacity[n, s + period_length - 1] - b.period_start[n, s])
+
+    def _inter_max_rule(b, n, p):
+        s = periods[p]
+        return (b.inter_content[n, p] + b.intra_max[n, s] <=
+                _storage_level_bounds(b, n, s)[1])
+
+    def _inter_min_rule(b, n, p):
+        s = periods[p]
+        return (b.inter_content[n, p] + b.intra_min[n, s] >=
+                _storage_level_bounds(b, n, s)[0])
+
+    def _initial_rule(b, n):
+        return b.inter_content[n, 0] == b.init_cap[n]
+
+    def _balanced_rule(b, n):
+        return b.inter_content[n, len(periods)] == b.init_cap[n]
+
+    for n in storages:
+        block.balance_first[n].deactivate()
+        for t in starts[1:]:
+            block.balance[n, t].deactivate()
+        if n in block.balanced_cstr:
+            block.balanced_cstr[n].deactivate()
+
+    block.period_balance = Constraint(storages, starts,
+                                      rule=_period_balance_rule)
+    block.intra_max_cstr = Constraint(storages, timesteps,
+                                      rule=_intra_max_rule)
+    block.intra_min_cstr = Constraint(storages, timesteps,
+                                      rule=_intra_min_rule)
+    block.inter_balance = Constraint(storages, range(len(periods)),
+                                     rule=_inter_balance_rule)
+    block.inter_max = Constraint(storages, range(len(periods)),
+                                 rule=_inter_max_rule)
+    block.inter_min = Constraint(storages, range(len(periods)),
+                                 rule=_inter_min_rule)
+    block.inter_initial = Constraint(storages, rule=_initial_rule)
+    block.inter_balanced = Constraint(balanced, rule=_balanced_rule)
@@ -0,0 +1,266 @@
+"""
+oemof application for research project quarree100.
+
+Run many scenarios in parallel worker processes. Every scenario is read,
+set up, solved and its results are exported in a separate process, so that
+a failing, hanging or crashing scenario does not affect the others.
+
+A scenario is either the path of a scenario file (any format of
+:mod:`input_backends`) or a dictionary with the keys 'source', 'name'
+(optional) and 'overrides' (optional). Overrides change single values of
+the nodes data and are keyed by (sheet, label, column); the label is None
+for sheets without labels (e.g. 'general'):
+
+>>> scenarios = [
+...     'AB1_Basecase_v12.xlsx',
+...     {'name': 'AB1_low_co2', 'source': 'AB1_Basecase_v12.xlsx',
+...      'overrides': {('general', None, 'emission limit'): 5e5,
+...                    ('transformer', 'chp', 'capex'): 900}}]
+>>> summary = run_batch(scenarios, 'results', workers=8, threads=4,
+...                     timeout=3600)
+
+From the command line:
+
+    python batch_runner.py AB1_*.xlsx --results results --workers 8 \
+        --format csv
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import traceback
+from multiprocessing.connection import wait
+import pandas as pd
+
+
+def scenario_spec(scenario):
+    """Return the dictionary form of a scenario."""
+    if isinstance(scenario, dict):
+        spec = dict(scenario)
+    else:
+        spec = {'source': scenario}
+    spec.setdefault('name', os.path.splitext(
+        os.path.basename(os.path.normpath(spec['source'])))[0])
+    spec.setdefault('overrides', {})
+    return spec
+
+
+def apply_overrides(nodes_data, overrides):
+    """Change single values of the nodes data.
+
+    Parameters
+    ----------
+    nodes_data : :obj:`dict`
+        Nodes data, changed in place.
+    overrides : :obj:`dict`
+        New values keyed by (sheet, label, column). With label None the
+        first row of the sheet is changed.
+    """
+    for (sheet, label, column), value in overrides.items():
+        table = nodes_data[sheet]
+        if column not in table.columns:
+            raise KeyError('Sheet {0} has no column {1}.'.format(
+                sheet, column))
+        if label is None:
+            rows = table.index[:1]
+        else:
+            rows = table.index[table['label'] == label]
+            if len(rows) == 0:
+                raise KeyError('Sheet {0} has no component {1}.'.format(
+                    sheet, label))
+        if table[column].dtype.kind in 'iu' and not float(value).is_integer():
+            table[column] = table[column].astype(float)
+        table.loc[rows, column] = value
+
+
+def run_scenario(spec, results_dir, solver='cbc', threads=1,
+                 fmt='parquet'):
+    """Read, set up, solve and export a single scenario.
+
+    The results are exported to the directory `<results_dir>/<name>` (see
+    :func:`postprocessing.export_results`).
+
+    Returns
+    -------
+    :obj:`dict`
+        Summary with the objective and the total emissions.
+    """
+    # imported here to keep the batch runner light for the parent process
+    import input_backends
+    import postprocessing
+    import setup_solve_model
+
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+
+    nd = input_backends.load_nodes(spec['source'])
+    apply_overrides(nd, spec['overrides'])
+
+    es = setup_solve_model.setup_es(excel_nodes=nd)
+    results = setup_solve_model.solve_es(
+        energysystem=es, excel_nodes=nd, solver=solver,
+        cmdline_options={'threads': threads})
+
+    path = postprocessing.export_results(
+        res=results, es=es, path=os.path.join(results_dir, spec['name']),
+        fmt=fmt)
+
+    meta = es.results['meta']
+    return {'termination': str(meta['solver'].get('Termination condition')),
+            'objective': meta['objective'],
+            'total_emissions': meta.get('total_emissions'),
+            'results_path': path}
+
+
+def _worker(spec, results_dir, solver, threads, fmt, conn):
+    if hasattr(os, 'setpgrp'):
+        # own process group, so that the solver is stopped on a timeout, too
+        os.setpgrp()
+    try:
+        summary = run_scenario(spec, results_dir, solver=solver,
+                               threads=threads, fmt=fmt)
+        summary['status'] = 'ok'
+    except Exception:
+        summary = {'status': 'failed', 'error': traceback.format_exc()}
+    conn.send(summary)
+    conn.close()
+
+
+def _stop(process):
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+    process.terminate()
+    process.join()
+
+
+def run_batch(scenarios, results_dir, workers=None, threads=1, timeout=None,
+              solver='cbc', fmt='parquet'):
+    """Run scenarios in parallel worker processes.
+
+    Parameters
+    ----------
+    scenarios : list
+        Scenario file paths or dictionaries (see module documentation).
+    results_dir : str
+        Directory the results are stored in.
+    workers : int (optional)
+        Number of scenarios solved at the same time. Defaults to the number
+        of CPUs divided by `threads`.
+    threads : int
+        Number of solver threads per scenario.
+    timeout : numeric (optional)
+        Seconds after which a scenario (including its solver) is stopped.
+    solver : str
+        Solver to be used.
+    fmt : str
+        Output format of the results (see
+        :func:`postprocessing.export_results`).
+
+    Returns
+    -------
+    :pandas:`pandas.DataFrame`
+        One row per scenario with the 'status' ('ok', 'failed' or
+        'timeout'), the runtime and the summary of :func:`run_scenario`
+        or the error. It is also stored as `batch_summary.csv`.
+    """
+    if workers is None:
+        workers = max(1, multiprocessing.cpu_count() // threads)
+    os.makedirs(results_dir, exist_ok=True)
+
+    pending = [scenario_spec(s) for s in scenarios]
+    names = [spec['name'] for spec in pending]
+    if len(set(names)) < len(names):
+        raise ValueError('Scenario names have to be unique.')
+
+    logging.info('Run {0} scenarios with {1} workers and {2} solver '
+                 'threads per worker'.format(len(pending), workers, threads))
+
+    running = {}
+    summaries = {}
+
+    while pending or running:
+        while pending and len(running) < workers:
+            spec = pending.pop(0)
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_worker, name=spec['name'],
+                args=(spec, results_dir, solver, threads, fmt, sender))
+            process.start()
+            sender.close()
+            running[process.sentinel] = (process, receiver, spec['name'],
+                                         time.time())
+
+        if timeout is None:
+            wait_time = None
+        else:
+            wait_time = max(0, min(start + timeout for _, _, _, start
+                                   in running.values()) - time.time())
+        ready = wait(list(running), timeout=wait_time)
+
+        for sentinel in list(running):
+            process, receiver, name, start = running[sentinel]
+            runtime = time.time() - start
+            if sentinel in ready:
+                try:
+                    summary = receiver.recv()
+                except EOFError:
+                    summary = {'status': 'failed',
+                               'error': 'Worker exited with code {0}'.format(
+                                   process.exitcode)}
+                process.join()
+            elif timeout is not None and runtime >= timeout:
+                _stop(process)
+                summary = {'status': 'timeout'}
+            else:
+                continue
+
+            receiver.close()
+            del running[sentinel]
+            summary['runtime'] = runtime
+            summaries[name] = summary
+            logging.info('Scenario {0}: {1} after {2:.0f} s'.format(
+                name, summary['status'], runtime))
+            if summary['status'] == 'failed':
+                logging.warning('Scenario {0} failed:\n{1}'.format(
+                    name, summary['error']))
+
+    result = pd.DataFrame([summaries[name] for name in names],
+                          index=pd.Index(names, name='scenario'))
+    result.to_csv(os.path.join(results_dir, 'batch_summary.csv'))
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Solve scenario files in parallel.')
+    parser.add_argument('scenarios', nargs='+', help='scenario files')
+    parser.add_argument('--results', default='results',
+                        help='directory of the results')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of parallel scenarios')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='solver threads per scenario')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='time limit per scenario in seconds')
+    parser.add_argument('--solver', default='cbc')
+    parser.add_argument('--format', default='parquet',
+                        help='output format of the results')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    summary = run_batch(args.scenarios, args.results, workers=args.workers,
+                        threads=args.threads, timeout=args.timeout,
+                        solver=args.solver, fmt=args.format)
+    print(summary[['status', 'runtime']])
+
+
+if __name__ == '__main__':
+    main()
@@ -6,7 +6,42 @@ available from its original location oemof/oemof/solph/constraints.py
 SPDX-License-Identifier: GPL-3.0-or-later
 """
 
+import numpy as np
 import pyomo.environ as po
+try:
+    from pyomo.core.expr.numeric_expr import LinearExpression
+except ImportError:
+    from pyomo.core.expr.current import LinearExpression
+
+
+def timestep_values(value, timesteps):
+    """Return a scalar or sequence attribute as array over all timesteps.
+
+    Parameters
+    ----------
+    value : numeric or array-like
+        Scalar, list, array, Series or oemof sequence.
+    timesteps : list
+        Timesteps of the model.
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    n = len(timesteps)
+    if hasattr(value, 'default') and hasattr(value, 'highest_index'):
+        # oemof sequence of a scalar, the same value for every timestep
+        return np.full(n, float(value.default))
+    try:
+        values = np.asarray(value, dtype=float)
+    except (TypeError, ValueError):
+        values = None
+    if values is not None and values.ndim == 0:
+        return np.full(n, float(values))
+    if values is None or values.ndim != 1 or len(values) < n:
+        # e.g. oemof sequences of unknown length
+        values = np.array([value[t] for t in timesteps], dtype=float)
+    return values[:n]
 
 
 def emission_limit_dyn(om, flows=None, limit=None):
@@ -17,7 +52,9 @@ def emission_limit_dyn(om, flows=None, limit=None):
     With `F_E` being the set of flows considered for the emission limit and
     `T` being the set of timestepsself.
     Total total emissions after optimization can be retrieved calling the
-    :attr:`om.oemof.solph.Model.total_emissions()`.
+    :attr:`om.oemof.solph.Model.total_emissions()`. The limit is stored in
+    the mutable parameter :attr:`om.emission_limit_value` and can be changed
+    with :func:`set_emission_limit`.
     Parameters
     ----------
     om : oemof.solph.Model
@@ -46,10 +83,42 @@ def emission_limit_dyn(om, flows=None, limit=None):
                      'has no attribute emission_factor.').format(i.label,
                                                                  o.label))
 
-    om.total_emissions =  po.Expression(
-        expr=sum(om.flow[inflow, outflow, t] * om.timeincrement[t] *
-                 om.flows[inflow, outflow].emission_factor[t]
-                 for (inflow, outflow) in flows
-                 for t in om.TIMESTEPS))
+    # the coefficients are computed per flow as arrays and only non-zero
+    # terms are added to one linear expression; the objective weighting
+    # equals the timeincrement unless typical periods are weighted
+    timesteps = list(om.TIMESTEPS)
+    increment = timestep_values(om.objective_weighting, timesteps)
+
+    coefs = []
+    variables = []
+    for (inflow, outflow) in flows:
+        factors = timestep_values(
+            flows[inflow, outflow].emission_factor, timesteps) * increment
+        nonzero = np.flatnonzero(factors)
+        coefs.extend(factors[nonzero].tolist())
+        variables.extend(om.flow[inflow, outflow, timesteps[t]]
+                         for t in nonzero)
+
+    om.total_emissions = po.Expression(
+        expr=LinearExpression(constant=0, linear_coefs=coefs,
+                              linear_vars=variables))
 
-    om.emission_limit = po.Constraint(expr=om.total_emissions <= limit)
+    # the limit is a mutable parameter, so that it can be changed with
+    # set_emission_limit() without rebuilding the model
+    om.emission_limit_value = po.Param(initialize=limit, mutable=True)
+
+    om.emission_limit = po.Constraint(
+        expr=om.total_emissions <= om.emission_limit_value)
+
+
+def set_emission_limit(om, limit):
+    """Change the limit of a constraint added with :func:`emission_limit_dyn`.
+
+    Parameters
+    ----------
+    om : oemof.solph.Model
+        Model the emission limit has been added to.
+    limit : numeric
+        New absolute emission limit for the energy system.
+    """
+    om.emission_limit_value.set_value(limit)
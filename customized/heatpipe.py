@@ -15,10 +15,13 @@ from pyomo.core.base.block import SimpleBlock
 from pyomo.environ import (Binary, Set, NonNegativeReals, Var, Constraint,
                            Expression, BuildAction)
 import logging
+import numpy as np
+import pandas as pd
 
 from oemof.solph.network import Bus, Transformer
 from oemof.solph.plumbing import sequence
 from oemof.solph import Investment
+from customized.add_contraints import LinearExpression, timestep_values
 
 
 class HeatPipeline(Transformer):
@@ -35,6 +38,13 @@ class HeatPipeline(Transformer):
     heat_loss_factor : float
         Heat loss per length unit as fraction of the nominal power. Can also be
         defined by a series.
+    catalog : :pandas:`pandas.DataFrame` (optional)
+        Discrete pipe sizes (e.g. DN catalog) to choose one of, with the
+        columns 'capacity' (nominal power), 'costs' (periodical costs per
+        length unit, like `ep_costs`) and 'loss' (heat loss per length
+        unit). The output flow must have neither a nominal value nor an
+        investment. Several pipes can share the same catalog. The loss of
+        the catalog replaces `heat_loss_factor`.
 
     See also :py:class:`~oemof.solph.network.Transformer`.
 
@@ -48,6 +58,8 @@ class HeatPipeline(Transformer):
        Investment object present)
      * :py:class:`~oemof.solph.custom.HeatPipelineInvestBlock` (if
        Investment object present)
+     * :py:class:`~oemof.solph.custom.HeatPipelineCatalogBlock` (if a
+       catalog is present)
 
     Examples
     --------
@@ -60,6 +72,7 @@ class HeatPipeline(Transformer):
 
         self.length = kwargs.get('length')
         self.heat_loss_factor = sequence(kwargs.get('heat_loss_factor'))
+        self.catalog = kwargs.get('catalog')
 
         self._invest_group = False
 
@@ -81,6 +94,17 @@ class HeatPipeline(Transformer):
 
         self._check_flows()
 
+        if self.catalog is not None:
+            if self._invest_group or any(
+                    f.nominal_value is not None
+                    for f in self.outputs.values()):
+                raise ValueError(
+                    "The output flow of HeatPipeline {0} with a catalog "
+                    "must have neither a nominal value nor an "
+                    "investment.".format(self.label))
+            # the loss is defined by the catalog
+            self.heat_loss_factor = sequence(0)
+
     def _check_flows(self):
         for flow in self.inputs.values():
             if isinstance(flow.investment, Investment):
@@ -91,12 +115,56 @@ class HeatPipeline(Transformer):
                 self._invest_group = True
 
     def constraint_group(self):
-        if self._invest_group is True:
+        if self.catalog is not None:
+            return HeatPipelineCatalogBlock
+        elif self._invest_group is True:
             return HeatPipelineInvestBlock
         else:
             return HeatPipelineBlock
 
 
+def _shared(values):
+    """Return a read-only view of a single value if all values are equal."""
+    if len(values) and (values == values[0]).all():
+        return np.broadcast_to(values[0], values.shape)
+    return values
+
+
+def _linear(coefs, variables):
+    """Return the sum of the variables weighted with the coefficients."""
+    return LinearExpression(constant=0,
+                            linear_coefs=[float(c) for c in coefs],
+                            linear_vars=list(variables))
+
+
+def pipe_parameters(group, timesteps):
+    """Precompute the ports and coefficients of heat pipelines.
+
+    Parameters
+    ----------
+    group : list of :class:`HeatPipeline`
+    timesteps : list
+        Timesteps of the model.
+
+    Returns
+    -------
+    :obj:`dict`
+        Per pipe a tuple of the input, the output, the ratio of the
+        conversion factors of output and input and the heat loss factor
+        multiplied by the length, as arrays over the timesteps. Constant
+        coefficients are stored once and broadcast to all timesteps.
+    """
+    parameters = {}
+    for n in group:
+        i = list(n.inputs.keys())[0]
+        o = list(n.outputs.keys())[0]
+        ratio = (timestep_values(n.conversion_factors[o], timesteps) /
+                 timestep_values(n.conversion_factors[i], timesteps))
+        loss = timestep_values(n.heat_loss_factor, timesteps) * n.length
+        parameters[n] = (i, o, _shared(ratio), _shared(loss))
+    return parameters
+
+
 class HeatPipelineBlock(SimpleBlock):
     r"""Block representing a pipeline of a district heating system.
     :class:`~oemof.solph.custom.HeatPipeline`
@@ -113,6 +181,8 @@ class HeatPipelineBlock(SimpleBlock):
         (2) \dot{Q}_{loss}(t) = f_{loss}(t) \cdot l \cdot \dot{Q}_{nominal}
         &
 
+    The heat loss (2) is constant and part of the right-hand side of (1).
+
     The symbols used are defined as follows
     (with Variables (V) and Parameters (P)):
 
@@ -123,8 +193,8 @@ class HeatPipelineBlock(SimpleBlock):
         ":math:`\dot{Q}_{out}(t)`", ":py:obj:`flow[n, o, t]`", "V", "Heat
         output"
         ":math:`\dot{Q}_{in}(t)`", ":py:obj:`flow[i, n, t]`", "V", "Heat input"
-        ":math:`\dot{Q}_{loss}(t)`", ":py:obj:`heat_loss[n, t]`", "P", "Heat
-        loss of heat pipeline"
+        ":math:`\dot{Q}_{loss}(t)`", ":py:obj:`heat_loss_values(n)`", "P",
+        "Heat loss of heat pipeline"
         ":math:`\dot{Q}_{nominal}`", ":py:obj:`flows[n, o].nominal_value`", "
         P", "Nominal capacity of heating pipeline"
         ":math:`\eta_{out}`", ":py:obj:`conversion_factors[o][t]`", "P", "
@@ -159,39 +229,32 @@ class HeatPipelineBlock(SimpleBlock):
 
         self.HEATPIPES = Set(initialize=[n for n in group])
 
-        # Defining Variables
-        self.heat_loss = Var(self.HEATPIPES, m.TIMESTEPS,
-                             within=NonNegativeReals)
-
-        def _heat_loss_rule(block, n, t):
-            """Rule definition for constraint to connect the installed capacity
-            and the heat loss
-            """
-            o = list(n.outputs.keys())[0]
-
-            expr = 0
-            expr += - block.heat_loss[n, t]
-            expr +=\
-                n.heat_loss_factor[t] * n.length * m.flows[n, o].nominal_value
-            return expr == 0
-
-        self.heat_loss_equation = Constraint(self.HEATPIPES, m.TIMESTEPS,
-                                             rule=_heat_loss_rule)
-
-        def _relation_rule(block, n, t):
-            """Link input and output flow and subtract heat loss."""
-            i = list(n.inputs.keys())[0]
-            o = list(n.outputs.keys())[0]
-
-            expr = 0
-            expr += - m.flow[n, o, t]
-            expr += m.flow[i, n, t] * n.conversion_factors[
-                o][t] / n.conversion_factors[i][t]
-            expr += - block.heat_loss[n, t]
-            return expr == 0
+        # ports and coefficients are looked up once per pipe
+        timesteps = list(m.TIMESTEPS)
+        pipes = pipe_parameters(group, timesteps)
+
+        self._pipes = pipes
+
+        def _relation_build(block):
+            """Link input and output flow and subtract the (fixed) heat
+            loss, pipe by pipe from the coefficient arrays."""
+            for n in group:
+                i, o, ratio, loss = pipes[n]
+                heat_loss = loss * m.flows[n, o].nominal_value
+                for t in timesteps:
+                    block.relation.add((n, t), _linear(
+                        [-1, ratio[t]],
+                        [m.flow[n, o, t], m.flow[i, n, t]]) ==
+                        float(heat_loss[t]))
 
         self.relation = Constraint(self.HEATPIPES, m.TIMESTEPS,
-                                   rule=_relation_rule)
+                                   noruleinit=True)
+        self.relation_build = BuildAction(rule=_relation_build)
+
+    def heat_loss_values(self, n):
+        """Return the heat loss of a pipe over all timesteps."""
+        i, o, ratio, loss = self._pipes[n]
+        return loss * self.parent_block().flows[n, o].nominal_value
 
 
 class HeatPipelineInvestBlock(SimpleBlock):
@@ -210,6 +273,9 @@ class HeatPipelineInvestBlock(SimpleBlock):
         (2) \dot{Q}_{loss}(t) = f_{loss}(t) \cdot l \cdot \dot{Q}_{nominal}
         &
 
+    The heat loss (2) depends on the invested capacity and is substituted
+    into (1), it is no variable of the model.
+
     The symbols used are defined as follows
     (with Variables (V) and Parameters (P)):
 
@@ -220,8 +286,8 @@ class HeatPipelineInvestBlock(SimpleBlock):
         ":math:`\dot{Q}_{out}(t)`", ":py:obj:`flow[n, o, t]`", "V", "Heat
         output"
         ":math:`\dot{Q}_{in}(t)`", ":py:obj:`flow[i, n, t]`", "V", "Heat input"
-        ":math:`\dot{Q}_{loss}(t)`", ":py:obj:`heat_loss[n, t]`", "V", "Heat
-        loss of heat pipeline"
+        ":math:`\dot{Q}_{loss}(t)`", ":py:obj:`heat_loss_values(n)`", "-",
+        "Heat loss of heat pipeline (substituted into (1))"
         ":math:`\dot{Q}_{nominal}`", ":py:obj:`flows[n, o].nominal_value`", "
         V", "Nominal capacity of heating pipeline"
         ":math:`\eta_{out}`", ":py:obj:`conversion_factors[o][t]`", "P", "
@@ -257,33 +323,240 @@ class HeatPipelineInvestBlock(SimpleBlock):
         # Defining Sets
         self.INVESTHEATPIPES = Set(initialize=[n for n in group])
 
-        # Defining Variables
-        self.heat_loss = Var(self.INVESTHEATPIPES, m.TIMESTEPS,
-                             within=NonNegativeReals)
-
-        def _heat_loss_rule(block, n, t):
-            """Rule definition for constraint to connect the installed capacity
-            and the heat loss
-            """
-            expr = 0
-            expr += - block.heat_loss[n, t]
-            expr += n.heat_loss_factor[t] * n.length * m.InvestmentFlow.invest[
-                n, list(n.outputs.keys())[0]]
-            return expr == 0
-        self.heat_loss_equation = Constraint(self.INVESTHEATPIPES, m.TIMESTEPS,
-                                             rule=_heat_loss_rule)
-
-        def _relation_rule(block, n, t):
-            """Link input and output flow and subtract heat loss."""
-            i = list(n.inputs.keys())[0]
-            o = list(n.outputs.keys())[0]
-
-            expr = 0
-            expr += - m.flow[n, o, t]
-            expr += m.flow[i, n, t] * n.conversion_factors[
-                o][t] / n.conversion_factors[i][t]
-            expr += - block.heat_loss[n, t]
-            return expr == 0
+        # ports and coefficients are looked up once per pipe
+        timesteps = list(m.TIMESTEPS)
+        pipes = pipe_parameters(group, timesteps)
+
+        self._pipes = pipes
+
+        # the heat loss depends linearly on the invested capacity and is
+        # substituted into the relation instead of being a variable
+        def _relation_build(block):
+            """Link input and output flow and subtract heat loss, pipe by
+            pipe from the coefficient arrays."""
+            for n in group:
+                i, o, ratio, loss = pipes[n]
+                invest = m.InvestmentFlow.invest[n, o]
+                for t in timesteps:
+                    block.relation.add((n, t), _linear(
+                        [-1, ratio[t], -loss[t]],
+                        [m.flow[n, o, t], m.flow[i, n, t], invest]) == 0)
 
         self.relation = Constraint(self.INVESTHEATPIPES, m.TIMESTEPS,
-                                   rule=_relation_rule)
+                                   noruleinit=True)
+        self.relation_build = BuildAction(rule=_relation_build)
+
+    def heat_loss_values(self, n):
+        """Return the heat loss of a pipe over all timesteps."""
+        i, o, ratio, loss = self._pipes[n]
+        return loss * self.parent_block().InvestmentFlow.invest[n, o].value
+
+
+class HeatPipelineCatalogBlock(SimpleBlock):
+    r"""Block representing pipelines of a district heating system whose size
+    is chosen from a catalog of discrete sizes.
+    :class:`~oemof.solph.custom.HeatPipeline`
+
+    Every size k of the catalog has a binary variable. The formulation is
+    the convex hull of the disjunction "size k or no pipe", so the LP
+    relaxation is tight and no big-M constants are needed.
+
+    **The following constraints are created:**
+
+    .. _HeatPipelineCatalogBlock-equations:
+
+    .. math::
+        &
+        (1) \sum_k y_k \leq 1\\
+        &
+        (2) \dot{Q}_{nominal} = \sum_k \dot{Q}_{k} \cdot y_k\\
+        &
+        (3) \dot{Q}_{out}(t) \leq \dot{Q}_{nominal}\\
+        &
+        (4) \dot{Q}_{out}(t) = \dot{Q}_{in}(t) \cdot
+        \frac{\eta_{out}}{\eta_{in}} - \dot{Q}_{loss}\\
+        &
+        (5) \dot{Q}_{loss} = l \cdot \sum_k q_{k} \cdot y_k
+        &
+
+    The costs :math:`l \cdot \sum_k c_{k} \cdot y_k` are added to the
+    objective. The heat loss (5) depends on the chosen size and is
+    substituted into (4), it is no variable of the model. The loss of the
+    catalog replaces the `heat_loss_factor` of the pipe.
+
+    The symbols used are defined as follows
+    (with Variables (V) and Parameters (P)):
+
+    .. csv-table::
+        :header: "symbol", "attribute", "type", "explanation"
+        :widths: 1, 1, 1, 1
+
+        ":math:`y_k`", ":py:obj:`size_k[n]`", "V", "Binary choice of
+        the k-th size of the catalog"
+        ":math:`\dot{Q}_{nominal}`", ":py:obj:`invest[n]`", "V", "Chosen
+        capacity of the heat pipeline"
+        ":math:`\dot{Q}_{loss}`", "-", "-", "Heat loss of heat pipeline
+        (substituted into (4))"
+        ":math:`\dot{Q}_{k}`", ":py:obj:`catalog['capacity']`", "P",
+        "Capacity of size k"
+        ":math:`q_{k}`", ":py:obj:`catalog['loss']`", "P", "Heat loss per
+        length unit of size k"
+        ":math:`c_{k}`", ":py:obj:`catalog['costs']`", "P", "Costs per
+        length unit of size k"
+        ":math:`l`", ":py:obj:`length`", "P", "Length of heating pipeline"
+
+
+    """
+
+    CONSTRAINT_GROUP = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+    def _create(self, group=None):
+        """ Creates the linear constraint for the class:`HeatPipeline`
+        block.
+
+        Parameters
+        ----------
+        group : list
+
+        """
+        if group is None:
+            return None
+
+        m = self.parent_block()
+
+        # Defining Sets
+        self.CATALOGHEATPIPES = Set(initialize=[n for n in group])
+
+        # ports and coefficients are looked up once per pipe
+        timesteps = list(m.TIMESTEPS)
+        pipes = pipe_parameters(group, timesteps)
+        self._pipes = pipes
+
+        catalogs = {n: (np.asarray(n.catalog['capacity'], dtype=float),
+                        np.asarray(n.catalog['costs'], dtype=float),
+                        np.asarray(n.catalog['loss'], dtype=float))
+                    for n in group}
+
+        # one binary variable per pipe and size; the sizes are indexed by
+        # their position in the catalog, so that the variables are indexed
+        # by the pipe only (as scalars in the results)
+        self._sizes = []
+        for k in range(max(len(c[0]) for c in catalogs.values())):
+            var = Var([n for n in group if len(catalogs[n][0]) > k],
+                      within=Binary)
+            self.add_component('size_{0}'.format(k), var)
+            self._sizes.append(var)
+
+        def _choices(n):
+            """(position, variable) of all sizes of a pipe."""
+            return [(k, self._sizes[k][n])
+                    for k in range(len(catalogs[n][0]))]
+
+        self.invest = Var(self.CATALOGHEATPIPES, within=NonNegativeReals)
+
+        def _one_size_rule(block, n):
+            """At most one size per pipe."""
+            return sum(y for k, y in _choices(n)) <= 1
+
+        self.one_size = Constraint(self.CATALOGHEATPIPES,
+                                   rule=_one_size_rule)
+
+        def _capacity_rule(block, n):
+            """Capacity of the chosen size."""
+            capacity = catalogs[n][0]
+            return block.invest[n] == sum(y * capacity[k]
+                                          for k, y in _choices(n))
+
+        self.capacity = Constraint(self.CATALOGHEATPIPES,
+                                   rule=_capacity_rule)
+
+        def _relation_build(block):
+            """Output flow limited by the capacity of the chosen size and
+            relation of input and output flow including the heat loss of
+            the chosen size, pipe by pipe from the coefficient arrays."""
+            for n in group:
+                i, o, ratio, loss = pipes[n]
+                choices = _choices(n)
+                sizes = [y for k, y in choices]
+                size_loss = [-catalogs[n][2][k] * n.length
+                             for k, y in choices]
+                for t in timesteps:
+                    block.max_flow.add((n, t), _linear(
+                        [1, -1], [m.flow[n, o, t], block.invest[n]]) <= 0)
+                    block.relation.add((n, t), _linear(
+                        [-1, ratio[t]] + size_loss,
+                        [m.flow[n, o, t], m.flow[i, n, t]] + sizes) == 0)
+
+        self.max_flow = Constraint(self.CATALOGHEATPIPES, m.TIMESTEPS,
+                                   noruleinit=True)
+        self.relation = Constraint(self.CATALOGHEATPIPES, m.TIMESTEPS,
+                                   noruleinit=True)
+        self.relation_build = BuildAction(rule=_relation_build)
+
+        self._catalogs = catalogs
+
+        costs = 0
+        for n in group:
+            for k, c in enumerate(catalogs[n][1]):
+                costs += self._sizes[k][n] * (c * n.length)
+
+        self.investment_costs = Expression(expr=costs)
+
+    def _objective_expression(self):
+        """Costs of the chosen sizes."""
+        if not hasattr(self, 'CATALOGHEATPIPES'):
+            return 0
+
+        return self.investment_costs
+
+    def heat_loss_values(self, n):
+        """Return the heat loss of a pipe over all timesteps."""
+        loss = n.length * sum(q * self._sizes[k][n].value
+                              for k, q in enumerate(self._catalogs[n][2]))
+        return np.full(len(self.parent_block().TIMESTEPS), loss)
+
+
+def heat_loss_results(om, results=None):
+    """Return the heat loss of all heat pipelines of a solved model.
+
+    The heat loss of the pipes is no variable of the model and therefore
+    not part of the results of :func:`oemof.outputlib.processing.results`.
+
+    Parameters
+    ----------
+    om : :class:`oemof.solph.Model`
+        Solved model.
+    results : :obj:`dict` (optional)
+        Results of the model, also a :class:`lean_results.ResultsView`. If
+        given, the heat loss is added as column 'heat_loss' to the sequences
+        of the pipes (key (pipe, None)).
+
+    Returns
+    -------
+    :pandas:`pandas.DataFrame`
+        Heat loss per timestep (rows) and pipe (columns, labels).
+    """
+    losses = {}
+    for name in ['HeatPipelineBlock', 'HeatPipelineInvestBlock',
+                 'HeatPipelineCatalogBlock']:
+        block = getattr(om, name, None)
+        if hasattr(block, '_pipes'):
+            for n in block._pipes:
+                losses[n] = block.heat_loss_values(n)
+
+    index = om.es.timeindex[:len(om.TIMESTEPS)]
+    if results is not None:
+        for n, values in losses.items():
+            if (n, None) in results:
+                results[n, None]['sequences']['heat_loss'] = values
+            else:
+                results[n, None] = {
+                    'scalars': pd.Series(dtype=float),
+                    'sequences': pd.DataFrame({'heat_loss': values},
+                                              index=index)}
+
+    return pd.DataFrame({str(n): values for n, values in losses.items()},
+                        index=index)
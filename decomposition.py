@@ -0,0 +1,208 @@
+"""
+oemof application for research project quarree100.
+
+Decomposition of an energy system into independent parts. Buses that are
+not connected by any component (e.g. separate quarters, or an electricity
+system that only shares the emission limit with a heat system) form
+separate connected components of the energy system graph. Components that
+are not coupled by a global constraint are solved as separate models in
+parallel worker processes and their results are merged:
+
+>>> nd = setup_solve_model.nodes_from_excel(filename)
+>>> es = setup_solve_model.setup_es(excel_nodes=nd)
+>>> results = decomposition.solve_components(es, nd, workers=4)
+
+The only global constraint of the model is the emission limit of
+:func:`customized.add_contraints.emission_limit_dyn`. If flows with
+emissions are found in more than one component, the components are coupled
+by the limit and the energy system is solved as a single model.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import logging
+import multiprocessing
+import numpy as np
+from oemof.graph import create_nx_graph
+import oemof.outputlib as outputlib
+import oemof.solph as solph
+import networkx as nx
+from customized import heatpipe
+import lean_results
+import setup_solve_model
+from model_solver import ModelSolver
+
+
+# sheets of the nodes data with one row per component (or bus)
+COMPONENT_SHEETS = ['buses', 'commodity_sources', 'sources_series', 'demand',
+                    'sinks', 'transformer', 'heatpipes', 'storages']
+
+
+def components(energysystem):
+    """Return the connected components of the energy system.
+
+    Parameters
+    ----------
+    energysystem : :class:`oemof.solph.EnergySystem`
+
+    Returns
+    -------
+    list of set
+        Labels (as str) of the nodes of every component, largest first.
+    """
+    grph = create_nx_graph(energysystem)
+    return sorted((set(c) for c in nx.weakly_connected_components(grph)),
+                  key=len, reverse=True)
+
+
+def emission_components(energysystem, parts):
+    """Return the indices of the components with emissions.
+
+    Parameters
+    ----------
+    energysystem : :class:`oemof.solph.EnergySystem`
+    parts : list of set
+        See :func:`components`.
+
+    Returns
+    -------
+    list of int
+    """
+    position = {label: k for k, part in enumerate(parts) for label in part}
+
+    emitting = set()
+    for node in energysystem.nodes:
+        for flow in node.outputs.values():
+            factor = getattr(flow, 'emission_factor', None)
+            if factor is not None and np.any(np.asarray(factor) != 0):
+                emitting.add(position[str(node.label)])
+    return sorted(emitting)
+
+
+def subset_nodes_data(nd, labels):
+    """Return the nodes data of the components with the given labels.
+
+    Rows of other components in the :const:`COMPONENT_SHEETS` and their
+    timeseries columns are dropped; all other sheets are kept.
+
+    Parameters
+    ----------
+    nd : :obj:`dict`
+        Nodes data
+    labels : set of str
+        Labels of the component (see :func:`components`).
+
+    Returns
+    -------
+    :obj:`dict`
+        Nodes data of the component.
+    """
+    sub = dict(nd)
+    for key, table in nd.items():
+        if key == 'timeseries':
+            keep = [col for col in table.columns
+                    if setup_solve_model.split_ts_column(col)[0] in labels]
+            sub[key] = table[keep]
+        elif key in COMPONENT_SHEETS:
+            sub[key] = table[table['label'].isin(labels)]
+    return sub
+
+
+def _solve_component(args):
+    """Set up, solve and process the model of one component."""
+    nd, solver, cmdline_options = args
+
+    es = solph.EnergySystem(timeindex=setup_solve_model.time_index(nd))
+    es.add(*setup_solve_model.create_nodes(nd=nd))
+    om = setup_solve_model.create_model(energysystem=es, excel_nodes=nd)
+    solver_results = ModelSolver(om, solver=solver,
+                                 cmdline_options=cmdline_options).solve()
+
+    # the heat loss of the pipes is no variable of the model
+    results = lean_results.extract_results(om).view()
+    heatpipe.heat_loss_results(om, results)
+
+    # nodes are replaced by their labels to send the results to the parent
+    results = dict(results.map_nodes(str))
+
+    return (results, outputlib.processing.meta_results(om),
+            str(solver_results.solver.termination_condition))
+
+
+def solve_components(energysystem=None, excel_nodes=None, solver='cbc',
+                     cmdline_options=None, workers=None):
+    """Optimise the energy system component by component.
+
+    Falls back to :func:`setup_solve_model.solve_es` if the energy system
+    has a single component or its components are coupled by the emission
+    limit.
+
+    Parameters
+    ----------
+    energysystem : :class:`oemof.solph.EnergySystem`
+    excel_nodes : :obj:`dict`
+        Nodes data
+    solver : str
+        Solver to be used.
+    cmdline_options : dict (optional)
+        Solver options, e.g. {'threads': 4}.
+    workers : int (optional)
+        Number of components solved at the same time. Defaults to the number
+        of CPUs.
+
+    Returns
+    -------
+    result : :obj:`dict`
+        Processed results, also stored with the meta results in
+        `energysystem.results['main']` and `energysystem.results['meta']`.
+        The meta results hold the summed objective and the meta results of
+        every component under 'components'.
+    """
+    parts = components(energysystem)
+
+    if len(parts) == 1:
+        logging.info('The energy system has a single component.')
+        return setup_solve_model.solve_es(
+            energysystem=energysystem, excel_nodes=excel_nodes,
+            solver=solver, cmdline_options=cmdline_options)
+
+    emitting = emission_components(energysystem, parts)
+    limit = excel_nodes['general']['emission limit'][0]
+    if len(emitting) > 1 and np.isfinite(limit):
+        logging.warning(
+            'The energy system has {0} components, but {1} of them are '
+            'coupled by the emission limit. It is solved as a single model.'
+            .format(len(parts), len(emitting)))
+        return setup_solve_model.solve_es(
+            energysystem=energysystem, excel_nodes=excel_nodes,
+            solver=solver, cmdline_options=cmdline_options)
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, len(parts)))
+
+    logging.info('Solve {0} components of the energy system with {1} '
+                 'workers'.format(len(parts), workers))
+
+    tasks = [(subset_nodes_data(excel_nodes, part), solver, cmdline_options)
+             for part in parts]
+    with multiprocessing.Pool(workers) as pool:
+        solved = pool.map(_solve_component, tasks)
+
+    nodes = {str(n): n for n in energysystem.nodes}
+    result = {}
+    metas = []
+    for k, (results, meta, termination) in enumerate(solved):
+        if termination != 'optimal':
+            logging.warning('Component {0} ({1} nodes): {2}'.format(
+                k, len(parts[k]), termination))
+        result.update({tuple(nodes.get(n, n) for n in key): value
+                       for key, value in results.items()})
+        metas.append(meta)
+
+    meta = {'objective': sum(m['objective'] for m in metas),
+            'components': metas}
+    # no model of the whole energy system is built, so it has no results yet
+    energysystem.results = {'main': result, 'meta': meta}
+
+    return result
@@ -73,6 +73,9 @@ om.solve(solver='cbc', solve_kwargs={'tee': True})
 # create result object
 results = processing.results(om)
 
+# the heat loss is no variable of the model, add it to the results
+customized.heatpipe.heat_loss_results(om, results)
+
 data = views.node(results, 'b_heat_1')['sequences'].sum(axis=0).to_dict()
 
 electricity_bus = views.node(results, 'b_heat_0')["sequences"]
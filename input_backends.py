@@ -0,0 +1,403 @@
+"""
+oemof application for research project quarree100.
+
+Input backends for the nodes data. Every loader returns the same `nodes_data`
+dictionary as :func:`setup_solve_model.nodes_from_excel`, but the data may be
+stored in faster formats than an Excel workbook:
+
+* csv: a directory with one `<Sheet>.csv` file per sheet
+* parquet: a directory with one `<Sheet>.parquet` file per sheet
+* hdf5: a single HDF5 file with one key per sheet
+* sqlite: a single SQLite database with one table per sheet
+
+The sheet names are the ones of the workbook (see
+:const:`setup_solve_model.SHEETS`). The columnar backends (parquet, hdf5,
+sqlite) only read the timeseries columns of active components.
+
+All loaders accept a time window (`start`, `end`) as positions or
+timestamps, e.g. for a one-week run:
+
+>>> nd = load_nodes('AB1_Basecase_v12.sqlite', start='2018-03-05',
+...                 end='2018-03-12')
+
+Except for Excel workbooks only the rows of the window are read; the
+limits are scaled as in :func:`setup_solve_model.slice_nodes_data`.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import logging
+import os
+import sqlite3
+import pandas as pd
+import setup_solve_model
+from setup_solve_model import SHEETS, OPTIONAL_SHEETS
+
+
+LOADERS = {}
+WRITERS = {}
+EXTENSIONS = {}
+
+
+def register_loader(name, extensions=()):
+    """Decorator to register a loader function for a backend.
+
+    A loader is called with the source path and optional keyword arguments
+    and has to return the nodes data dictionary.
+    """
+    def decorator(func):
+        LOADERS[name] = func
+        for ext in extensions:
+            EXTENSIONS[ext] = name
+        return func
+    return decorator
+
+
+def register_writer(name):
+    """Decorator to register a writer function for a backend."""
+    def decorator(func):
+        WRITERS[name] = func
+        return func
+    return decorator
+
+
+def guess_backend(source):
+    """Guess the backend from the file extension or directory content."""
+    if os.path.isdir(source):
+        for name, ext in [('parquet', '.parquet'), ('csv', '.csv')]:
+            if os.path.isfile(
+                    os.path.join(source, SHEETS['timeseries'] + ext)):
+                return name
+        raise ValueError(
+            'No timeseries file found in directory {0}.'.format(source))
+
+    ext = os.path.splitext(source)[1].lower()
+    try:
+        return EXTENSIONS[ext]
+    except KeyError:
+        raise ValueError(
+            'Unknown input format {0} of {1}. Known formats: {2}'.format(
+                ext, source, ', '.join(sorted(LOADERS))))
+
+
+def load_nodes(source, backend=None, **kwargs):
+    """Load the nodes data from any registered backend.
+
+    Parameters
+    ----------
+    source : str
+        File or directory holding the scenario data.
+    backend : str (optional)
+        Name of the backend, e.g. 'csv', 'parquet', 'hdf5', 'sqlite' or
+        'excel'. Guessed from `source` if not given.
+    kwargs :
+        Passed to the loader of the backend.
+
+    Returns
+    -------
+    nodes_data : :obj:`dict`
+    """
+    if backend is None:
+        backend = guess_backend(source)
+    try:
+        loader = LOADERS[backend]
+    except KeyError:
+        raise ValueError('Unknown input backend {0}. Known backends: {1}'
+                         .format(backend, ', '.join(sorted(LOADERS))))
+
+    nodes_data = loader(source, **kwargs)
+
+    print('Data from {0} file {1} imported.'.format(backend, source))
+
+    return nodes_data
+
+
+def save_nodes(nodes_data, target, backend):
+    """Write the nodes data with a registered backend.
+
+    This can be used to convert a scenario workbook once, e.g.
+
+    >>> nd = setup_solve_model.nodes_from_excel('AB1_Basecase_v12.xlsx')
+    >>> save_nodes(nd, 'AB1_Basecase_v12.sqlite', 'sqlite')
+    """
+    try:
+        writer = WRITERS[backend]
+    except KeyError:
+        raise ValueError('Unknown output backend {0}. Known backends: {1}'
+                         .format(backend, ', '.join(sorted(WRITERS))))
+    writer(nodes_data, target)
+
+
+def referenced_columns(nodes_data, columns):
+    """Return the timeseries columns that belong to active components.
+
+    Parameters
+    ----------
+    nodes_data : :obj:`dict`
+        Nodes data without the timeseries table.
+    columns : iterable of str
+        All columns of the timeseries table.
+
+    Returns
+    -------
+    list of str
+    """
+    labels = setup_solve_model.component_labels(nodes_data, active_only=True)
+    return [c for c in columns
+            if setup_solve_model.split_ts_column(c)[0] in labels]
+
+
+def _nodes_data(read_sheet, timeseries_columns, read_timeseries,
+                has_sheet, read_timestamps, start=None, end=None):
+    """Assemble the nodes data from backend specific read functions.
+
+    `read_sheet(sheet)` returns a parameter sheet, `timeseries_columns()`
+    the names of all timeseries columns, `read_timeseries(columns, first,
+    stop)` the rows first to stop (all rows for None) of the timeseries
+    table restricted to `columns`, `has_sheet(sheet)` whether an (optional)
+    sheet exists and `read_timestamps()` the timestamp column.
+    """
+    nodes_data = {key: read_sheet(sheet) for key, sheet in SHEETS.items()
+                  if key != 'timeseries' and
+                  (key not in OPTIONAL_SHEETS or has_sheet(sheet))}
+
+    all_columns = [c for c in timeseries_columns() if c != 'timestamp']
+    columns = referenced_columns(nodes_data, all_columns)
+    logging.info('Reading {0} of {1} timeseries columns.'.format(
+        len(columns), len(all_columns)))
+
+    window = start is not None or end is not None
+    if window:
+        timesteps = nodes_data['general']['timesteps'][0]
+        timestamps = pd.DatetimeIndex(pd.to_datetime(read_timestamps()))
+        first, stop = setup_solve_model.window_positions(
+            timestamps[:timesteps], start=start, end=end)
+        ts = read_timeseries(columns, first, stop)
+    else:
+        ts = read_timeseries(columns, None, None)
+
+    if 'timestamp' in ts.columns:
+        ts.set_index('timestamp', inplace=True)
+    ts.index = pd.to_datetime(ts.index)
+    ts.index.name = 'timestamp'
+
+    if window:
+        return setup_solve_model.slice_nodes_data(nodes_data, first, stop,
+                                                  timeseries=ts)
+
+    nodes_data['timeseries'] = ts
+    return nodes_data
+
+
+@register_loader('excel', extensions=('.xlsx', '.xls'))
+def load_excel(source, cache_dir=None, start=None, end=None):
+    return setup_solve_model.nodes_from_excel(source, cache_dir=cache_dir,
+                                              start=start, end=end)
+
+
+@register_loader('csv')
+def load_csv(source, sep=',', start=None, end=None):
+    def path(sheet):
+        return os.path.join(source, sheet + '.csv')
+
+    def read_sheet(sheet):
+        return _restore_numbers(pd.read_csv(path(sheet), sep=sep))
+
+    def timeseries_columns():
+        return pd.read_csv(path(SHEETS['timeseries']), sep=sep,
+                           nrows=0).columns
+
+    def read_timeseries(columns, first, stop):
+        rows = {}
+        if first is not None:
+            rows = {'skiprows': range(1, first + 1), 'nrows': stop - first}
+        return pd.read_csv(path(SHEETS['timeseries']), sep=sep,
+                           usecols=['timestamp'] + columns, **rows)
+
+    def has_sheet(sheet):
+        return os.path.isfile(path(sheet))
+
+    def read_timestamps():
+        return pd.read_csv(path(SHEETS['timeseries']), sep=sep,
+                           usecols=['timestamp'])['timestamp']
+
+    return _nodes_data(read_sheet, timeseries_columns, read_timeseries,
+                       has_sheet, read_timestamps, start=start, end=end)
+
+
+@register_loader('parquet')
+def load_parquet(source, start=None, end=None):
+    import pyarrow.parquet as pq
+
+    def path(sheet):
+        return os.path.join(source, sheet + '.parquet')
+
+    def read_sheet(sheet):
+        return _restore_numbers(pd.read_parquet(path(sheet)))
+
+    def timeseries_columns():
+        return pq.read_schema(path(SHEETS['timeseries'])).names
+
+    def read_timeseries(columns, first, stop):
+        table = pq.read_table(path(SHEETS['timeseries']),
+                              columns=['timestamp'] + columns)
+        if first is not None:
+            table = table.slice(first, stop - first)
+        return table.to_pandas()
+
+    def has_sheet(sheet):
+        return os.path.isfile(path(sheet))
+
+    def read_timestamps():
+        return pd.read_parquet(path(SHEETS['timeseries']),
+                               columns=['timestamp'])['timestamp']
+
+    return _nodes_data(read_sheet, timeseries_columns, read_timeseries,
+                       has_sheet, read_timestamps, start=start, end=end)
+
+
+@register_loader('hdf5', extensions=('.h5', '.hdf5', '.hdf'))
+def load_hdf5(source, start=None, end=None):
+    with pd.HDFStore(source, mode='r') as store:
+
+        def read_sheet(sheet):
+            return store.select(sheet)
+
+        def timeseries_columns():
+            return store.select(SHEETS['timeseries'], start=0, stop=0).columns
+
+        def read_timeseries(columns, first, stop):
+            return store.select(SHEETS['timeseries'], columns=columns,
+                                start=first, stop=stop)
+
+        def has_sheet(sheet):
+            return '/' + sheet in store.keys()
+
+        def read_timestamps():
+            return store.select_column(SHEETS['timeseries'], 'index')
+
+        return _nodes_data(read_sheet, timeseries_columns, read_timeseries,
+                           has_sheet, read_timestamps, start=start, end=end)
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _restore_numbers(table):
+    """Convert the numbers of string columns that mix numbers and words."""
+    for col in table.select_dtypes(include=['object', 'string']).columns:
+        values = table[col].map(_to_number)
+        is_number = values.map(lambda v: isinstance(v, float))
+        if is_number.any() and not is_number.all():
+            table[col] = values
+    return table
+
+
+def _quote(name):
+    return '"{0}"'.format(str(name).replace('"', '""'))
+
+
+@register_loader('sqlite', extensions=('.sqlite', '.sqlite3', '.db'))
+def load_sqlite(source, start=None, end=None):
+    if not os.path.isfile(source):
+        raise FileNotFoundError(source)
+
+    con = sqlite3.connect(source)
+    try:
+        def read_sheet(sheet):
+            return pd.read_sql_query(
+                'SELECT * FROM {0}'.format(_quote(sheet)), con)
+
+        def timeseries_columns():
+            info = con.execute('PRAGMA table_info({0})'.format(
+                _quote(SHEETS['timeseries']))).fetchall()
+            return [row[1] for row in info]
+
+        def read_timeseries(columns, first, stop):
+            query = 'SELECT {0} FROM {1} ORDER BY rowid'.format(
+                ', '.join(_quote(c) for c in ['timestamp'] + columns),
+                _quote(SHEETS['timeseries']))
+            if first is not None:
+                query += ' LIMIT {0} OFFSET {1}'.format(stop - first, first)
+            return pd.read_sql_query(query, con)
+
+        def has_sheet(sheet):
+            return con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                (sheet,)).fetchone() is not None
+
+        def read_timestamps():
+            return pd.read_sql_query(
+                'SELECT timestamp FROM {0} ORDER BY rowid'.format(
+                    _quote(SHEETS['timeseries'])), con)['timestamp']
+
+        return _nodes_data(read_sheet, timeseries_columns, read_timeseries,
+                           has_sheet, read_timestamps, start=start, end=end)
+    finally:
+        con.close()
+
+
+def _sheets(nodes_data):
+    """Iterate over (sheet name, table) with the timestamp as a column."""
+    for key, sheet in SHEETS.items():
+        if key not in nodes_data:
+            continue
+        table = nodes_data[key]
+        if key == 'timeseries':
+            table = table.reset_index()
+            table.rename(columns={table.columns[0]: 'timestamp'},
+                         inplace=True)
+        yield sheet, table
+
+
+@register_writer('csv')
+def save_csv(nodes_data, target):
+    os.makedirs(target, exist_ok=True)
+    for sheet, table in _sheets(nodes_data):
+        table.to_csv(os.path.join(target, sheet + '.csv'), index=False)
+
+
+@register_writer('parquet')
+def save_parquet(nodes_data, target):
+    os.makedirs(target, exist_ok=True)
+    for sheet, table in _sheets(nodes_data):
+        # parquet columns need a single type, so columns mixing numbers and
+        # strings (e.g. 'series') are stored as strings
+        table = table.copy()
+        for col in table.select_dtypes(include=['object', 'string']).columns:
+            if table[col].map(type).nunique() > 1:
+                table[col] = table[col].astype(str)
+        table.to_parquet(os.path.join(target, sheet + '.parquet'),
+                         index=False)
+
+
+@register_writer('hdf5')
+def save_hdf5(nodes_data, target):
+    with pd.HDFStore(target, mode='w') as store:
+        for sheet, table in _sheets(nodes_data):
+            if sheet == SHEETS['timeseries']:
+                # table format allows to read single columns
+                store.put(sheet, table.set_index('timestamp'),
+                          format='table')
+            else:
+                store.put(sheet, table, format='fixed')
+
+
+@register_writer('sqlite')
+def save_sqlite(nodes_data, target):
+    con = sqlite3.connect(target)
+    try:
+        for sheet, table in _sheets(nodes_data):
+            # NUMERIC affinity keeps numbers in mixed columns numeric
+            dtype = {col: 'NUMERIC'
+                     for col in table.select_dtypes(
+                         include=['object', 'string']).columns}
+            table.to_sql(sheet, con, if_exists='replace', index=False,
+                         dtype=dtype)
+        con.commit()
+    finally:
+        con.close()
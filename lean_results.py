@@ -0,0 +1,251 @@
+"""
+oemof application for research project quarree100.
+
+Lean extraction of the results of a solved model. Instead of one pandas
+DataFrame per flow and node (see :func:`oemof.outputlib.processing.results`)
+the values of the Pyomo variables are copied into contiguous NumPy arrays:
+
+* the flows of all timesteps into one matrix (timesteps x flows) with a
+  table of the flows (source, target),
+* other sequences (e.g. storage content) into a second matrix with a table
+  of their keys and variable names,
+* time independent values (e.g. investments) into a small table.
+
+>>> lean = lean_results.extract_results(om)
+>>> lean.flow('b_heat', 'demand_heat')
+>>> results = lean.view()
+>>> results[storage, None]['sequences']['capacity']
+
+The view has the keys and the shape of the `outputlib` results dictionary,
+but builds the pandas objects of a key only when it is first accessed.
+Built entries are kept, so they can be changed like the ones of the
+results dictionary, e.g. by :func:`customized.heatpipe.heat_loss_results`.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+from collections.abc import MutableMapping
+import numpy as np
+import pandas as pd
+from pyomo.core.base.var import Var
+from oemof.network import Node
+
+
+def _value(var):
+    value = var.value
+    return np.nan if value is None else value
+
+
+def _key(index):
+    """Return the oemof key (pair of nodes) of a variable index."""
+    return tuple(index) if len(index) > 1 else (index[0], None)
+
+
+def _labels(keys):
+    return pd.DataFrame({'source': [str(k[0]) for k in keys],
+                         'target': [None if k[1] is None else str(k[1])
+                                    for k in keys]})
+
+
+class LeanResults(object):
+    """Results of a solved model as contiguous arrays.
+
+    Attributes
+    ----------
+    timeindex : :pandas:`pandas.DatetimeIndex`
+    flows : :pandas:`pandas.DataFrame`
+        'source' and 'target' label of every column of `flow_values`.
+    flow_values : numpy.ndarray
+        Values of all flows (timesteps x flows).
+    sequences : :pandas:`pandas.DataFrame`
+        'source', 'target' (None for nodes) and 'variable' of every column
+        of `sequence_values`.
+    sequence_values : numpy.ndarray
+        Values of all other time dependent variables.
+    scalars : :pandas:`pandas.DataFrame`
+        'source', 'target', 'variable' and 'value' of all time independent
+        variables, e.g. investments.
+    """
+
+    def __init__(self, timeindex, flow_keys, flow_values, sequence_keys,
+                 sequence_values, scalar_keys, scalar_values):
+        self.timeindex = timeindex
+        self.flow_values = flow_values
+        self.sequence_values = sequence_values
+
+        self._flow_keys = flow_keys
+        self._sequence_keys = sequence_keys
+        self._scalar_keys = scalar_keys
+
+        self.flows = _labels(flow_keys)
+        self.sequences = _labels([k for k, _ in sequence_keys])
+        self.sequences['variable'] = [v for _, v in sequence_keys]
+        self.scalars = _labels([k for k, _ in scalar_keys])
+        self.scalars['variable'] = [v for _, v in scalar_keys]
+        self.scalars['value'] = scalar_values
+
+        self._flow_position = {
+            tuple(str(n) for n in k): j for j, k in enumerate(flow_keys)}
+
+    def flow(self, source, target):
+        """Return the flow between two nodes (or labels).
+
+        Returns
+        -------
+        :pandas:`pandas.Series`
+        """
+        j = self._flow_position[str(source), str(target)]
+        return pd.Series(self.flow_values[:, j], index=self.timeindex,
+                         name='flow')
+
+    def flow_frame(self):
+        """Return all flows as DataFrame with (source, target) columns.
+
+        Returns
+        -------
+        :pandas:`pandas.DataFrame`
+        """
+        return pd.DataFrame(
+            self.flow_values, index=self.timeindex,
+            columns=pd.MultiIndex.from_frame(self.flows), copy=False)
+
+    def view(self):
+        """Return a view in the shape of the `outputlib` results."""
+        return ResultsView(self)
+
+    def map_nodes(self, func):
+        """Return the results with every node `n` of the keys replaced by
+        `func(n)`, e.g. `str` for results without node objects."""
+        def key(k):
+            return tuple(None if n is None else func(n) for n in k)
+
+        return LeanResults(
+            self.timeindex, [key(k) for k in self._flow_keys],
+            self.flow_values, [(key(k), v) for k, v in self._sequence_keys],
+            self.sequence_values,
+            [(key(k), v) for k, v in self._scalar_keys],
+            list(self.scalars['value']))
+
+
+class ResultsView(MutableMapping):
+    """Mapping in the shape of :func:`oemof.outputlib.processing.results`
+    backed by :class:`LeanResults`.
+
+    The entries are built when they are first accessed and kept. Entries
+    can be changed and added, the arrays of :attr:`lean` are not changed.
+    """
+
+    def __init__(self, lean):
+        self.lean = lean
+        self._entries = {}
+        self._columns = {}
+        for j, key in enumerate(lean._flow_keys):
+            self._columns.setdefault(key, ([], [], []))[0].append(j)
+        for j, (key, _) in enumerate(lean._sequence_keys):
+            self._columns.setdefault(key, ([], [], []))[1].append(j)
+        for j, (key, _) in enumerate(lean._scalar_keys):
+            self._columns.setdefault(key, ([], [], []))[2].append(j)
+
+    def __getitem__(self, key):
+        if key not in self._entries:
+            self._entries[key] = self._build(key)
+        return self._entries[key]
+
+    def __setitem__(self, key, value):
+        self._columns.setdefault(key, ([], [], []))
+        self._entries[key] = value
+
+    def __delitem__(self, key):
+        del self._columns[key]
+        self._entries.pop(key, None)
+
+    def _build(self, key):
+        """Return the entry of a key built from the arrays."""
+        flows, sequences, scalars = self._columns[key]
+        lean = self.lean
+
+        data = {}
+        for j in flows:
+            data['flow'] = lean.flow_values[:, j]
+        for j in sequences:
+            data[lean._sequence_keys[j][1]] = lean.sequence_values[:, j]
+        columns = sorted(data)
+
+        values = lean.scalars['value'].values
+        scalar_data = {lean._scalar_keys[j][1]: values[j] for j in scalars}
+
+        return {'scalars': pd.Series(scalar_data, dtype=float).sort_index(),
+                'sequences': pd.DataFrame(data, index=lean.timeindex,
+                                          columns=columns)}
+
+    def __contains__(self, key):
+        return key in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def map_nodes(self, func):
+        """Return the view with the nodes of the keys replaced, see
+        :meth:`LeanResults.map_nodes`. The built entries are kept."""
+        def key(k):
+            return tuple(None if n is None else func(n) for n in k)
+
+        view = ResultsView(self.lean.map_nodes(func))
+        for k, entry in self._entries.items():
+            view[key(k)] = entry
+        return view
+
+
+def extract_results(om):
+    """Copy the variable values of a solved model into arrays.
+
+    Parameters
+    ----------
+    om : :class:`oemof.solph.Model`
+
+    Returns
+    -------
+    :class:`LeanResults`
+    """
+    T = len(om.TIMESTEPS)
+
+    # the flow variable is indexed by flows x timesteps, so its values are
+    # ordered flow by flow
+    flow_keys = list(om.FLOWS)
+    flow_values = np.fromiter((_value(v) for v in om.flow.values()),
+                              dtype=float, count=len(flow_keys) * T)
+    flow_values = np.ascontiguousarray(
+        flow_values.reshape(len(flow_keys), T).T)
+
+    sequences = {}
+    scalars = {}
+    for var in om.component_objects(Var, descend_into=True):
+        if var is om.flow or not var.is_indexed():
+            continue
+        name = var.local_name
+        for index, v in var.items():
+            if v.value is None:
+                continue
+            if not isinstance(index, tuple):
+                index = (index,)
+            if all(isinstance(n, Node) for n in index):
+                scalars[_key(index), name] = v.value
+            else:
+                column = (_key(index[:-1]), name)
+                if column not in sequences:
+                    sequences[column] = np.full(T, np.nan)
+                sequences[column][index[-1]] = v.value
+
+    sequence_keys = list(sequences)
+    sequence_values = np.empty((T, len(sequence_keys)))
+    for j, column in enumerate(sequence_keys):
+        sequence_values[:, j] = sequences[column]
+
+    scalar_keys = list(scalars)
+
+    return LeanResults(om.es.timeindex, flow_keys, flow_values,
+                       sequence_keys, sequence_values, scalar_keys,
+                       [scalars[k] for k in scalar_keys])
@@ -0,0 +1,174 @@
+"""
+oemof application for research project quarree100.
+
+Solver handling for repeated solves of one built model (e.g. parameter
+sweeps). In persistent mode the model is kept loaded in the solver between
+two solves, only changed components are passed to the solver and the solver
+is warm-started from the previous solution.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import logging
+import warnings
+import pyomo.environ as po
+from pyomo.opt import SolverFactory
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+
+
+# persistent interfaces of pyomo used for the solvers in persistent mode;
+# the appsi interfaces detect changes of mutable parameters and bounds
+# themselves, the classic ones have to be told with `ModelSolver.update`.
+# appsi_cbc only writes the changed parts of the LP but still restarts cbc.
+PERSISTENT_SOLVERS = {'cbc': 'appsi_cbc',
+                      'highs': 'appsi_highs',
+                      'gurobi': 'gurobi_persistent',
+                      'cplex': 'cplex_persistent',
+                      'xpress': 'xpress_persistent'}
+
+
+class ModelSolver:
+    """Solve an oemof model, optionally with a persistent solver interface.
+
+    Parameters
+    ----------
+    om : :class:`oemof.solph.Model`
+        The built model.
+    solver : str
+        Solver to be used, e.g. 'cbc', 'highs' or 'gurobi'. Names of pyomo
+        persistent interfaces (e.g. 'appsi_highs') are accepted, too.
+    persistent : bool
+        Keep the model loaded in the solver between solves. Falls back to
+        the regular solver interface if no persistent interface is
+        available.
+    cmdline_options : dict (optional)
+        Solver options, e.g. {'threads': 4}.
+    solve_kwargs : dict (optional)
+        Arguments passed to the solve method of the solver, e.g.
+        {'tee': True}.
+
+    Examples
+    --------
+    >>> solver = ModelSolver(om, solver='highs', persistent=True)
+    >>> solver.solve()
+    >>> add_contraints.set_emission_limit(om, 1e6)
+    >>> solver.update(om.emission_limit)
+    >>> solver.solve()
+    """
+
+    def __init__(self, om, solver='cbc', persistent=False,
+                 cmdline_options=None, solve_kwargs=None):
+        self.om = om
+        self.solver = solver
+        self.cmdline_options = cmdline_options or {}
+        self.solve_kwargs = solve_kwargs or {}
+        self.persistent = False
+        self._opt = None
+        self._solved = False
+
+        if persistent:
+            self._opt = self._persistent_solver(solver)
+            self.persistent = self._opt is not None
+
+    def _persistent_solver(self, solver):
+        name = PERSISTENT_SOLVERS.get(solver, solver)
+        opt = SolverFactory(name)
+        try:
+            available = opt.available(exception_flag=False)
+        except Exception:
+            available = False
+        if not available:
+            logging.warning('No persistent interface {0} available for '
+                            'solver {1}. Using the regular interface.'
+                            .format(name, solver))
+            return None
+
+        for k, v in self.cmdline_options.items():
+            opt.options[k] = v
+        if isinstance(opt, PersistentSolver):
+            opt.set_instance(self.om)
+        logging.info('Model loaded into persistent solver {0}'.format(name))
+        return opt
+
+    def update(self, *components):
+        """Pass changed constraints or variable bounds to the solver.
+
+        Only needed for the classic persistent interfaces (e.g. gurobi,
+        cplex) after mutable parameters or bounds have been changed; the
+        regular and the appsi interfaces pick up changes by themselves.
+
+        Parameters
+        ----------
+        components : pyomo Constraint or Var components
+        """
+        if not isinstance(self._opt, PersistentSolver):
+            return
+        for component in components:
+            if component.ctype is po.Constraint:
+                for con in component.values():
+                    self._opt.remove_constraint(con)
+                    self._opt.add_constraint(con)
+            elif component.ctype is po.Var:
+                for var in component.values():
+                    self._opt.update_var(var)
+            else:
+                raise TypeError('Cannot update component {0} of type {1}.'
+                                .format(component.name, component.ctype))
+
+    def solve(self):
+        """Solve the model and load the solution into it.
+
+        Returns
+        -------
+        solver_results : :class:`pyomo.opt.SolverResults`
+        """
+        if not self.persistent:
+            return self.om.solve(solver=self.solver,
+                                 solve_kwargs=self.solve_kwargs,
+                                 cmdline_options=self.cmdline_options)
+
+        kwargs = dict(self.solve_kwargs)
+        if (self._solved and isinstance(self._opt, PersistentSolver) and
+                self._opt.warm_start_capable()):
+            # start from the solution of the previous solve
+            kwargs.setdefault('warmstart', True)
+
+        # the solution is only loaded if it is optimal, so that an
+        # infeasible solve returns its results instead of raising
+        kwargs['load_solutions'] = False
+
+        # oemof sets the suffixes `dual` and `rc` to None unless duals are
+        # requested, but the appsi interfaces expect suffixes if the
+        # attributes exist
+        none_suffixes = [name for name in ('dual', 'rc')
+                         if name in vars(self.om) and
+                         getattr(self.om, name) is None]
+        for name in none_suffixes:
+            delattr(self.om, name)
+        try:
+            solver_results = self._opt.solve(self.om, **kwargs)
+        finally:
+            for name in none_suffixes:
+                setattr(self.om, name, None)
+        self._solved = True
+
+        status = solver_results.solver.status
+        termination_condition = solver_results.solver.termination_condition
+        if (status == po.SolverStatus.ok and termination_condition ==
+                po.TerminationCondition.optimal):
+            logging.info("Optimization successful...")
+            if isinstance(self._opt, PersistentSolver):
+                self._opt.load_vars()
+            else:
+                self.om.solutions.load_from(solver_results)
+        else:
+            msg = ("Optimization ended with status {0} and termination "
+                   "condition {1}")
+            warnings.warn(msg.format(status, termination_condition),
+                          UserWarning)
+
+        # same attributes as set by oemof.solph.Model.solve
+        self.om.es.results = solver_results
+        self.om.solver_results = solver_results
+
+        return solver_results
@@ -0,0 +1,298 @@
+"""
+oemof application for research project quarree100.
+
+Reduction of district heating networks before the model is built. Street
+level networks consist of many short pipe segments joined by buses that
+only pass the heat on. The reduction
+
+* prunes dead-end branches of invest pipes (also of pipes sized from the
+  catalog) that lead to no demand, source or storage,
+* collapses pass-through buses (buses with exactly two neighbouring buses
+  and nothing else connected) by merging the pipes in series into one
+  equivalent pipe with the summed length and the combined loss.
+
+Usage:
+
+>>> nd = setup_solve_model.nodes_from_excel(filename)
+>>> nd_red, reduction = network_reduction.reduce_heat_network(nd)
+>>> es = setup_solve_model.setup_es(excel_nodes=nd_red)
+
+The flows of the merged pipes can be mapped back to the original segments
+with :func:`segment_flows`.
+
+Merged invest pipes have a single capacity for all their segments, which is
+what a pipe without branches would be built with. The same holds for pipes
+sized from the catalog; as the catalog defines the loss per length, the
+loss of the merged pipe is that of the summed length at its output, which
+overestimates the loss of the series slightly.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import logging
+from collections import defaultdict
+import pandas as pd
+
+
+# columns of the nodes data connecting components (other than heat pipes)
+# to buses
+BUS_COLUMNS = {'commodity_sources': ['to'],
+               'sources_series': ['to'],
+               'demand': ['from'],
+               'sinks': ['from'],
+               'transformer': ['in_1', 'in_2', 'out_1', 'out_2'],
+               'storages': ['bus']}
+
+
+def _mergeable(p1, p2):
+    """Pipes are merged if both or none are invested in (with the same
+    lifetime) and both or none are sized from the catalog."""
+    if bool(p1['invest']) != bool(p2['invest']):
+        return False
+    if (p1.get('catalog') == 1) != (p2.get('catalog') == 1):
+        return False
+    return not p1['invest'] or p1.get('n') == p2.get('n')
+
+
+def _optional(p):
+    """Pipes that are invested in or sized from the catalog need not be
+    built."""
+    return bool(p['invest']) or p.get('catalog') == 1
+
+
+def _attached_buses(nd):
+    """Return the buses with any component other than heat pipes."""
+    attached = set()
+    for key, columns in BUS_COLUMNS.items():
+        if key not in nd:
+            continue
+        table = nd[key][nd[key]['active'].astype(bool)]
+        for col in columns:
+            if col in table:
+                attached.update(table[col])
+
+    buses = nd['buses'][nd['buses']['active'].astype(bool)]
+    attached.update(buses.loc[buses['excess'].astype(bool) |
+                              buses['shortage'].astype(bool), 'label'])
+    return attached
+
+
+def _merge(p1, p2):
+    """Merge two pipes in series (p1 feeds p2) into one.
+
+    With the efficiency eta and the heat loss L = f * l * capacity the
+    output of the series is eta2 * (eta1 * in - L1) - L2, so the merged pipe
+    has the efficiency eta1 * eta2 and the loss eta2 * L1 + L2.
+
+    Pipes sized from the catalog have no installed capacity and their loss
+    is defined by the catalog, so only the lengths and efficiencies are
+    merged.
+    """
+    merged = p1.copy()
+    merged['label'] = '{0}__{1}'.format(p1['first'], p2['last'])
+    merged['out_1'] = p2['out_1']
+    merged['last'] = p2['last']
+    merged['segments'] = p1['segments'] + p2['segments']
+    merged['length'] = p1['length'] + p2['length']
+    merged['efficiency'] = p1['efficiency'] * p2['efficiency']
+
+    if p1.get('catalog') == 1:
+        return merged
+
+    if p1['invest']:
+        loss = (p2['efficiency'] * p1['heat_loss_factor'] * p1['length'] +
+                p2['heat_loss_factor'] * p2['length'])
+        for col in ['capex', 'service']:
+            if col in merged:
+                merged[col] = p1[col] + p2[col]
+        if 'max_invest' in merged:
+            merged['max_invest'] = min(p1['max_invest'], p2['max_invest'])
+        if 'min_invest' in merged:
+            merged['min_invest'] = max(p1['min_invest'], p2['min_invest'])
+    else:
+        loss_abs = (p2['efficiency'] * p1['heat_loss_factor'] *
+                    p1['length'] * p1['installed'] +
+                    p2['heat_loss_factor'] * p2['length'] * p2['installed'])
+        # the output of p1 limits the output of the series, too
+        merged['installed'] = min(
+            p2['installed'],
+            p2['efficiency'] * p1['installed'] - p2['heat_loss_factor'] *
+            p2['length'] * p2['installed'])
+        loss = loss_abs / merged['installed']
+
+    merged['heat_loss_factor'] = loss / merged['length']
+    return merged
+
+
+def reduce_heat_network(nd):
+    """Reduce the heat network of the nodes data.
+
+    Parameters
+    ----------
+    nd : :obj:`dict`
+        Nodes data with a 'heatpipes' table.
+
+    Returns
+    -------
+    nd_red : :obj:`dict`
+        Copy of the nodes data with the reduced 'heatpipes' and 'buses'
+        tables.
+    reduction : :obj:`dict`
+        'segments': original pipe rows of every pipe of the reduced network
+        in flow direction, keyed by the label of the reduced pipe,
+        'pruned': labels of the removed dead-end pipes,
+        'buses': labels of the removed buses.
+    """
+    attached = _attached_buses(nd)
+
+    table = nd['heatpipes']
+    active = table['active'].astype(bool)
+    pipes = {}
+    for _, row in table[active].iterrows():
+        row = row.copy()
+        row['first'] = row['last'] = row['label']
+        row['segments'] = [row['label']]
+        pipes[row['label']] = row
+
+    originals = table[active].set_index('label')
+
+    inflows = defaultdict(set)
+    outflows = defaultdict(set)
+    for label, p in pipes.items():
+        outflows[p['in_1']].add(label)
+        inflows[p['out_1']].add(label)
+
+    def neighbours(bus):
+        return ({pipes[p]['in_1'] for p in inflows[bus]} |
+                {pipes[p]['out_1'] for p in outflows[bus]})
+
+    def remove(label):
+        p = pipes.pop(label)
+        outflows[p['in_1']].discard(label)
+        inflows[p['out_1']].discard(label)
+        return p
+
+    removed_buses = []
+    pruned = []
+
+    # prune dead ends of invest pipes
+    candidates = set(inflows) | set(outflows)
+    while candidates:
+        bus = candidates.pop()
+        if bus in attached:
+            continue
+        connected = inflows[bus] | outflows[bus]
+        if not connected or len(neighbours(bus)) != 1:
+            continue
+        if not all(_optional(pipes[p]) for p in connected):
+            continue
+        for label in list(connected):
+            p = remove(label)
+            pruned.extend(p['segments'])
+            candidates.update([p['in_1'], p['out_1']])
+        candidates.discard(bus)
+        removed_buses.append(bus)
+
+    # merge pipes in series at pass-through buses
+    for bus in list(set(inflows) | set(outflows)):
+        if bus in attached:
+            continue
+        ins = list(inflows[bus])
+        outs = list(outflows[bus])
+        if not ins or len(ins) != len(outs) or len(neighbours(bus)) != 2:
+            continue
+        pairs = []
+        for i in ins:
+            source = pipes[i]['in_1']
+            match = [o for o in outs if pipes[o]['out_1'] != source]
+            if len(match) != 1:
+                break
+            o = match[0]
+            if not _mergeable(pipes[i], pipes[o]):
+                break
+            pairs.append((i, o))
+        else:
+            if len({o for _, o in pairs}) != len(outs):
+                continue
+            for i, o in pairs:
+                merged = _merge(remove(i), remove(o))
+                while merged['label'] in pipes:
+                    merged['label'] += '_'
+                pipes[merged['label']] = merged
+                outflows[merged['in_1']].add(merged['label'])
+                inflows[merged['out_1']].add(merged['label'])
+            removed_buses.append(bus)
+
+    reduced = pd.DataFrame(list(pipes.values()))
+    segments = {}
+    for _, p in reduced.iterrows():
+        segments[p['label']] = originals.loc[p['segments']].reset_index()
+    if len(reduced):
+        reduced = reduced.drop(columns=['first', 'last', 'segments'])
+    reduced = pd.concat([reduced, table[~active]], ignore_index=True)
+
+    nd_red = dict(nd)
+    nd_red['heatpipes'] = reduced
+    nd_red['buses'] = nd['buses'][~nd['buses']['label'].isin(removed_buses)]
+
+    logging.info(
+        'Heat network reduced from {0} to {1} pipes and by {2} buses '
+        '({3} dead-end pipes pruned).'.format(
+            active.sum(), len(pipes), len(removed_buses), len(pruned)))
+
+    return nd_red, {'segments': segments, 'pruned': pruned,
+                    'buses': removed_buses}
+
+
+def segment_flows(pipe_flows, reduction, capacities=None, catalog=None):
+    """Map the output flows of reduced pipes to the original segments.
+
+    Starting at the output of a merged pipe, the output flow of every
+    segment is calculated backwards from the efficiency and the heat loss
+    of the following segments.
+
+    Parameters
+    ----------
+    pipe_flows : :pandas:`pandas.DataFrame`
+        Output flow of the pipes of the reduced network (columns: labels).
+    reduction : :obj:`dict`
+        See :func:`reduce_heat_network`.
+    capacities : :obj:`dict` (optional)
+        Invested capacity of the reduced invest pipes and capacity of the
+        size chosen from the catalog, keyed by label.
+    catalog : :pandas:`pandas.DataFrame` (optional)
+        Catalog of the pipe sizes ('capacity' and 'loss' per length unit),
+        needed for pipes sized from the catalog.
+
+    Returns
+    -------
+    :pandas:`pandas.DataFrame`
+        Output flow of all original segments (columns: labels); the flow
+        of pruned pipes is zero.
+    """
+    capacities = capacities or {}
+    flows = {}
+    for label, segments in reduction['segments'].items():
+        if label not in pipe_flows:
+            continue
+        flow = pipe_flows[label]
+        for k in range(len(segments) - 1, -1, -1):
+            seg = segments.loc[k]
+            flows[seg['label']] = flow
+            if seg.get('catalog') == 1:
+                # no size chosen (capacity 0), no loss
+                size = catalog[catalog['capacity'] ==
+                               capacities.get(label, 0)]
+                loss = size['loss'].sum() * seg['length']
+            else:
+                if seg['invest']:
+                    capacity = capacities.get(label, 0)
+                else:
+                    capacity = seg['installed']
+                loss = seg['heat_loss_factor'] * seg['length'] * capacity
+            flow = (flow + loss) / seg['efficiency']
+
+    for label in reduction['pruned']:
+        flows[label] = 0.0
+
+    return pd.DataFrame(flows, index=pipe_flows.index)
@@ -0,0 +1,121 @@
+"""
+oemof application for research project quarree100.
+
+Index of the nodes of an energy system by their class. The index is an
+oemof grouping (see :mod:`oemof.groupings`): every node is stored under its
+class and all parent classes when it is added to the energy system, so a
+:class:`customized.heatpipe.HeatPipeline` is found as a
+:class:`oemof.solph.Transformer` as well. Nodes are found by their label
+with the default grouping of oemof (`energysystem.groups[label]`).
+
+>>> es = node_registry.energy_system(timeindex=timeindex)
+>>> es.add(*nodes)
+>>> node_registry.nodes_of_type(es, solph.Bus)
+>>> node_registry.component_lists(es)['storages']
+
+Energy systems created without the grouping are indexed the first time
+they are queried.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+from collections import OrderedDict
+import oemof.solph as solph
+from oemof.groupings import Grouping
+from oemof.network import Node
+from oemof.solph.components import GenericStorage
+
+
+# classes of the nodes in the lists of :func:`component_lists` and the
+# classes excluded from them (storages are transformers in oemof)
+COMPONENT_TYPES = OrderedDict([
+    ('buses', (solph.Bus, ())),
+    ('transformer', (solph.Transformer, (GenericStorage,))),
+    ('storages', (GenericStorage, ()))])
+
+
+def _node_classes(node):
+    """Return the class of a node and all its parent node classes."""
+    return [cls for cls in type(node).__mro__
+            if issubclass(cls, Node) and cls is not Node]
+
+
+class NodeTypes(Grouping):
+    """Grouping of the nodes by class.
+
+    The group of a class is an :obj:`OrderedDict` of the nodes keyed by
+    label, in the order the nodes are added to the energy system.
+    """
+
+    def __init__(self):
+        super().__init__(key=_node_classes)
+
+    def __call__(self, node, groups):
+        for cls in self.key(node):
+            groups.setdefault(cls, OrderedDict())[node.label] = node
+
+
+NODE_TYPES = NodeTypes()
+
+
+def energy_system(**kwargs):
+    """Return a :class:`oemof.solph.EnergySystem` with the node index.
+
+    The keyword arguments are passed to the energy system.
+    """
+    kwargs['groupings'] = [NODE_TYPES] + kwargs.get('groupings', [])
+    return solph.EnergySystem(**kwargs)
+
+
+def _groups(energysystem):
+    """Return the groups of an energy system, indexing it if necessary."""
+    groups = energysystem.groups
+    if NODE_TYPES not in energysystem._groupings:
+        # nodes added later are grouped by the energy system itself
+        energysystem._groupings.append(NODE_TYPES)
+        for n in energysystem.nodes:
+            NODE_TYPES(n, groups)
+    return groups
+
+
+def nodes_of_type(energysystem, cls, exclude=()):
+    """Return the nodes that are instances of a class.
+
+    Parameters
+    ----------
+    energysystem : :class:`oemof.solph.EnergySystem`
+    cls : type
+        Node class, e.g. :class:`oemof.solph.Bus`.
+    exclude : tuple of type
+        Subclasses of `cls` whose nodes are left out.
+
+    Returns
+    -------
+    list
+        Nodes in the order they were added to the energy system.
+    """
+    nodes = _groups(energysystem).get(cls, {}).values()
+    if exclude:
+        return [n for n in nodes if not isinstance(n, exclude)]
+    return list(nodes)
+
+
+def node_by_label(energysystem, label):
+    """Return the node with the given label (or its string)."""
+    return energysystem.groups[str(label)]
+
+
+def component_lists(energysystem):
+    """Return the labels of the buses, transformers and storages.
+
+    Parameters
+    ----------
+    energysystem : :class:`oemof.solph.EnergySystem`
+
+    Returns
+    -------
+    :obj:`dict`
+        Lists of labels for the keys of :const:`COMPONENT_TYPES`.
+    """
+    return {key: [n.label for n in nodes_of_type(energysystem, cls, exclude)]
+            for key, (cls, exclude) in COMPONENT_TYPES.items()}
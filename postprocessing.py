@@ -9,24 +9,86 @@ SPDX-License-Identifier: GPL-3.0-or-later
 """
 
 import oemof.outputlib as outputlib
+import numpy as np
 import pandas as pd
 import os
+import re
+import multiprocessing
+from collections import OrderedDict, defaultdict
 import config as cfg
+import oemof.solph as solph
+from oemof.solph.components import GenericStorage
+import node_registry
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+class ResultViews(object):
+    """Per-node views of the results of an optimisation.
+
+    The keys of the results are indexed by node label in one pass, so the
+    view of a node (see :func:`oemof.outputlib.views.node`) is built from
+    the results of that node only. Built views are cached.
+
+    Parameters
+    ----------
+    results : :obj:`dict`
+        Results of :func:`oemof.outputlib.processing.results` (or a
+        :class:`lean_results.ResultsView`).
+    max_cached : int (optional)
+        Number of node views kept in the cache. The least recently used
+        views are evicted first. Without a limit all views are kept.
+    """
+
+    def __init__(self, results, max_cached=None):
+        self.results = results
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._keys = defaultdict(list)
+        for key in results:
+            for n in key:
+                if n is not None:
+                    self._keys[str(n)].append(key)
+
+    def node(self, label):
+        """Return the 'sequences' and 'scalars' of a node (or its label)."""
+        label = str(label)
+        if label in self._cache:
+            self._cache.move_to_end(label)
+            return self._cache[label]
+
+        view = outputlib.views.node(
+            {k: self.results[k] for k in self._keys[label]}, label)
+
+        self._cache[label] = view
+        if self.max_cached is not None:
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return view
+
+
+def result_views(res, max_cached=None):
+    """Return the :class:`ResultViews` of results (or the views)."""
+    if isinstance(res, ResultViews):
+        return res
+    return ResultViews(res, max_cached=max_cached)
+
+
+def _installed(view):
+    """Return the first scalar of a node view (the installed capacity)."""
+    scalars = view.get("scalars")
+    return None if scalars is None else scalars.iloc[0]
 
 
 def plot_buses(res=None, es=None):
 
-    l_buses = []
+    views = result_views(res)
 
-    for n in es.nodes:
-        type_name =\
-            str(type(n)).replace("<class 'oemof.solph.", "").replace("'>", "")
-        if type_name == "network.Bus":
-            l_buses.append(n.label)
+    l_buses = node_registry.component_lists(es)['buses']
 
     for n in l_buses:
-        bus_sequences = outputlib.views.node(res, n)["sequences"]
+        bus_sequences = views.node(n)["sequences"]
         bus_sequences.plot(kind='line', drawstyle="steps-mid", subplots=False,
                            sharey=True)
         plt.show()
@@ -34,24 +96,23 @@ def plot_buses(res=None, es=None):
 
 def plot_trans_invest(res=None, es=None):
 
-    l_transformer = []
+    views = result_views(res)
 
-    for n in es.nodes:
-        type_name =\
-            str(type(n)).replace("<class 'oemof.solph.", "").replace("'>", "")
-        if type_name == "network.Transformer":
-            l_transformer.append(n.label)
+    l_transformer = node_registry.component_lists(es)['transformer']
 
+    l_invest = []
     p_trans_install = []
 
+    # transformers (and heat pipes) without investment have no scalars
     for q in l_transformer:
-        if outputlib.views.node(res, q)["scalars"][0] is not None:
-            p_install = outputlib.views.node(res, q)["scalars"][0]
+        p_install = _installed(views.node(q))
+        if p_install is not None:
+            l_invest.append(q)
             p_trans_install.append(p_install)
 
     # plot the installed Transformer Capacities
     y = p_trans_install
-    x = l_transformer
+    x = l_invest
     width = 1/2
     plt.bar(x, y, width, color="blue")
     plt.ylabel('Installierte Leistung [kW]')
@@ -60,16 +121,12 @@ def plot_trans_invest(res=None, es=None):
 
 def plot_storages_soc(res=None, es=None):
 
-    l_storages = []
+    views = result_views(res)
 
-    for n in es.nodes:
-        type_name =\
-            str(type(n)).replace("<class 'oemof.solph.", "").replace("'>", "")
-        if type_name == "components.GenericStorage":
-            l_storages.append(n.label)
+    l_storages = node_registry.component_lists(es)['storages']
 
     for n in l_storages:
-        soc_sequences = outputlib.views.node(res, n)["sequences"]
+        soc_sequences = views.node(n)["sequences"]
         soc_sequences = soc_sequences.drop(soc_sequences.columns[[0, 2]], 1)
         soc_sequences.plot(kind='line', drawstyle="steps-mid", subplots=False,
                            sharey=True)
@@ -78,18 +135,14 @@ def plot_storages_soc(res=None, es=None):
 
 def plot_storages_invest(res=None, es=None):
 
-    l_storages = []
+    views = result_views(res)
 
-    for n in es.nodes:
-        type_name =\
-            str(type(n)).replace("<class 'oemof.solph.", "").replace("'>", "")
-        if type_name == "components.GenericStorage":
-            l_storages.append(n.label)
+    l_storages = node_registry.component_lists(es)['storages']
 
     c_storage_install = []
 
     for n in l_storages:
-        c_storage = outputlib.views.node(res, n)["scalars"][0]
+        c_storage = views.node(n)["scalars"][0]
         c_storage_install.append(c_storage)
 
     # plot the installed Storage Capacities
@@ -100,37 +153,27 @@ def plot_storages_invest(res=None, es=None):
 
 def plot_invest(res=None, om=None):
 
+    views = result_views(res)
 
     # Zeige alle Investment Flows
     l_invest = []
     p_invest = []
     inv_flows = om.InvestmentFlow.invest._data
     list_flows = [k for k in inv_flows]
-    filter = []
-    t1 = []
-    t2 = []
-
-    # Check for Type
-    for n in range(len(list_flows)):
-        t1.append(str(type(list_flows[n][0])))
-        t2.append(str(type(list_flows[n][1])))
 
     # Filter storage flows counted twice
-    for n in range(len(t2)):
-        filter.append("Bus" not in t2[n])
-
-    list_flows = [i for indx, i in enumerate(list_flows) if filter[indx]==False]
+    list_flows = [f for f in list_flows if isinstance(f[1], solph.Bus)]
 
     # Check for Storage -> Capacity instead of rated Power
     for n in range(len(list_flows)):
 
         fnode = str(list_flows[n][0])
-        if "GenericStorage" in str(type(list_flows[n][0])):
+        if isinstance(list_flows[n][0], GenericStorage):
             tnode = 'None'
         else:
             tnode = str(list_flows[n][1])
 
-        p_invest.append(outputlib.views.node(res, fnode)["scalars"][((fnode, tnode), 'invest')])
+        p_invest.append(views.node(fnode)["scalars"][((fnode, tnode), 'invest')])
         l_invest.append(fnode)
 
     # plot the installed Capacities
@@ -145,62 +188,367 @@ def plot_invest(res=None, om=None):
     plt.show()
 
 
-def export_excel(res=None, es=None):
-
-    l_buses = []
-
-    for n in es.nodes:
-        type_name =\
-            str(type(n)).replace("<class 'oemof.solph.", "").replace("'>", "")
-        if type_name == "network.Bus":
-            l_buses.append(n.label)
-
-    l_transformer = []
-
-    for n in es.nodes:
-        type_name =\
-            str(type(n)).replace("<class 'oemof.solph.", "").replace("'>", "")
-        if type_name == "network.Transformer":
-            l_transformer.append(n.label)
-
-    l_storages = []
-
-    for s in es.nodes:
-        type_name =\
-            str(type(s)).replace("<class 'oemof.solph.", "").replace("'>", "")
-        if type_name == "components.GenericStorage":
-            l_storages.append(s.label)
-
-    df_series = pd.DataFrame()
-
-    for n in l_buses:
-        bus_sequences = outputlib.views.node(res, n)["sequences"]
-        df_series = pd.concat([df_series, bus_sequences], axis=1)
-
-    for n in l_storages:
-        soc_sequences = outputlib.views.node(res, n)["sequences"]
-        df_series = pd.concat([df_series, soc_sequences], axis=1)
+def _column_name(column):
+    """Return a flat name of a column ((source, target), variable)."""
+    (source, target), variable = column
+    if target is None or target == 'None':
+        return '{0}: {1}'.format(source, variable)
+    return '{0} -> {1}: {2}'.format(source, target, variable)
+
+
+def result_tables(res=None, es=None, max_cached=1):
+    """Iterate over the tables of the results.
+
+    The tables are built one after another, so only one of them has to be
+    kept in memory at a time.
+
+    Parameters
+    ----------
+    res : :obj:`dict` or :class:`ResultViews`
+        Results of the optimisation.
+    es : :class:`oemof.solph.EnergySystem`
+    max_cached : int (optional)
+        Number of node views kept in the cache (see :class:`ResultViews`).
+
+    Yields
+    ------
+    name : str
+        Label of the bus or storage, or 'Invest'.
+    table : :pandas:`pandas.DataFrame`
+        The sequences of a bus or storage with a flat column name per flow
+        and variable, last the installed capacities of the transformers and
+        storages.
+    """
+    views = result_views(res, max_cached=max_cached)
+    comp_lists = node_registry.component_lists(es)
+
+    # installed capacities, transformers (and heat pipes) without
+    # investment have no scalars
+    invest = OrderedDict()
+    for n in comp_lists['transformer']:
+        invest[str(n)] = _installed(views.node(n))
+
+    storages = set(comp_lists['storages'])
+    for n in comp_lists['buses'] + comp_lists['storages']:
+        view = views.node(n)
+        if n in storages:
+            invest[str(n)] = _installed(view)
+        sequences = view.get("sequences")
+        if sequences is None:
+            continue
+        yield str(n), pd.DataFrame(
+            sequences.values, index=sequences.index.rename('timestamp'),
+            columns=[_column_name(c) for c in sequences.columns])
+
+    yield 'Invest', pd.DataFrame([list(invest.values())],
+                                 columns=list(invest))
+
+
+EXPORTERS = {}
+
+
+def register_exporter(name):
+    """Decorator to register an exporter for an output format.
+
+    An exporter is called with an iterator of (name, table) pairs (see
+    :func:`result_tables`) and the output directory.
+    """
+    def decorator(func):
+        EXPORTERS[name] = func
+        return func
+    return decorator
+
+
+def _file_names(tables, max_length=None):
+    """Replace the names of the tables by unique names that are valid file
+    (and sheet) names."""
+    used = set()
+    for name, table in tables:
+        base = re.sub(r'[^\w\-. ]+', '_', name)[:max_length]
+        unique = base
+        k = 1
+        while unique.lower() in used:
+            suffix = '_{0}'.format(k)
+            if max_length is not None:
+                base = base[:max_length - len(suffix)]
+            unique = base + suffix
+            k += 1
+        used.add(unique.lower())
+        yield unique, table
+
+
+@register_exporter('parquet')
+def export_parquet(tables, path):
+    for name, table in _file_names(tables):
+        table.to_parquet(os.path.join(path, name + '.parquet'))
+
+
+@register_exporter('feather')
+def export_feather(tables, path):
+    for name, table in _file_names(tables):
+        # feather files have no index
+        if isinstance(table.index, pd.DatetimeIndex):
+            table = table.reset_index()
+        table.to_feather(os.path.join(path, name + '.feather'))
+
+
+@register_exporter('hdf5')
+def export_hdf5(tables, path):
+    with pd.HDFStore(os.path.join(path, 'results.h5'), mode='w') as store:
+        for name, table in _file_names(tables):
+            store.put(name, table, format='fixed')
+
+
+@register_exporter('csv')
+def export_csv(tables, path):
+    for name, table in _file_names(tables):
+        table.to_csv(os.path.join(path, name + '.csv'))
+
+
+@register_exporter('excel')
+def export_xlsx(tables, path):
+    import xlsxwriter
+
+    # in constant memory mode every row is written to disk as soon as the
+    # next one is started, so the rows are written one after another
+    workbook = xlsxwriter.Workbook(os.path.join(path, 'results.xlsx'),
+                                   {'constant_memory': True})
+    date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm'})
+    try:
+        for name, table in _file_names(tables, max_length=31):
+            sheet = workbook.add_worksheet(name)
+            sheet.write_row(0, 1, list(table.columns))
+            timestamps = isinstance(table.index, pd.DatetimeIndex)
+            for row, (index, values) in enumerate(
+                    zip(table.index, table.values), start=1):
+                if timestamps:
+                    sheet.write_datetime(row, 0, index.to_pydatetime(),
+                                         date_format)
+                else:
+                    sheet.write(row, 0, index)
+                sheet.write_row(row, 1, [None if pd.isnull(v) else v
+                                         for v in values])
+    finally:
+        workbook.close()
+
+
+def export_results(res=None, es=None, path=None, fmt='parquet',
+                   max_cached=1):
+    """Export the results table by table (see :func:`result_tables`).
+
+    Parameters
+    ----------
+    res : :obj:`dict` or :class:`ResultViews`
+        Results of the optimisation.
+    es : :class:`oemof.solph.EnergySystem`
+    path : str (optional)
+        Output directory. Defaults to the results path of the config.
+    fmt : str
+        'parquet' (one file per table), 'feather' (one file per table),
+        'hdf5' (one key per table in `results.h5`), 'csv' (one file per
+        table) or 'excel' (one sheet per table in `results.xlsx`, written in
+        constant memory).
+    max_cached : int (optional)
+        Number of node views kept in the cache (see :class:`ResultViews`).
+
+    Returns
+    -------
+    path : str
+        Output directory.
+    """
+    try:
+        exporter = EXPORTERS[fmt]
+    except KeyError:
+        raise ValueError('Unknown output format {0}. Known formats: {1}'
+                         .format(fmt, ', '.join(sorted(EXPORTERS))))
+
+    if path is None:
+        path = os.path.join(os.path.expanduser("~"),
+                            cfg.get('paths', 'results'))
+    os.makedirs(path, exist_ok=True)
+
+    exporter(result_tables(res=res, es=es, max_cached=max_cached), path)
+
+    return path
+
+
+def export_excel(res=None, es=None, path=None, max_cached=1):
+    """Export the results to `results.xlsx` with one sheet per bus and
+    storage (see :func:`export_results`)."""
+    return export_results(res=res, es=es, path=path, fmt='excel',
+                          max_cached=max_cached)
+
+
+def minmax_positions(values, max_points=2000):
+    """Return the positions of the minimum and maximum of equal bins.
+
+    The min/max binning keeps the peaks and the envelope of a series, so a
+    plot of the selected points looks like the plot of all points.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Values (timesteps x columns).
+    max_points : int
+        Maximum number of points per column.
+
+    Returns
+    -------
+    numpy.ndarray
+        Positions of the selected points in time order (points x columns).
+    """
+    T, n_columns = values.shape
+    if T <= max_points:
+        return np.repeat(np.arange(T)[:, None], n_columns, axis=1)
+
+    n_bins = max_points // 2
+    size = -(-T // n_bins)
+    n_bins = -(-T // size)
+
+    # the last bin is padded, nan values are never selected
+    padded = np.full((n_bins * size, n_columns), np.nan)
+    padded[:T] = values
+    padded = padded.reshape(n_bins, size, n_columns)
+    nan = np.isnan(padded)
+    first = np.argmin(np.where(nan, np.inf, padded), axis=1)
+    second = np.argmax(np.where(nan, -np.inf, padded), axis=1)
+
+    offset = (np.arange(n_bins) * size)[:, None]
+    positions = np.stack([np.minimum(first, second) + offset,
+                          np.maximum(first, second) + offset], axis=1)
+    return positions.reshape(2 * n_bins, n_columns)
+
+
+def _line_figure(title, sequences, max_points, ylabel=None):
+    """Return the data of a line figure with downsampled columns."""
+    values = sequences.values.astype(float)
+    positions = minmax_positions(values, max_points)
+    index = sequences.index.values
+    lines = [(_column_name(c), index[positions[:, j]],
+              values[positions[:, j], j])
+             for j, c in enumerate(sequences.columns)]
+    return 'lines', title, lines, ylabel
+
+
+def _render_figure(args):
+    """Render a figure to a file without a display."""
+    filename, (kind, title, data, ylabel) = args
+
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    if kind == 'lines':
+        for label, x, y in data:
+            ax.plot(x, y, drawstyle="steps-mid", label=label)
+        ax.legend(fontsize='small')
+    else:
+        labels, values = data
+        ax.bar(labels, values, width=0.5, color="blue")
+        for tick in ax.get_xticklabels():
+            tick.set_rotation(45)
+    ax.set_title(title)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel)
+    fig.tight_layout()
+    fig.savefig(filename)
+
+    return filename
+
+
+def report_figures(res=None, es=None, max_points=2000):
+    """Iterate over the data of the bus, storage content and investment
+    figures.
+
+    Parameters
+    ----------
+    res : :obj:`dict` or :class:`ResultViews`
+        Results of the optimisation.
+    es : :class:`oemof.solph.EnergySystem`
+    max_points : int
+        Maximum number of points per line (see :func:`minmax_positions`).
+
+    Yields
+    ------
+    name : str
+    figure : tuple
+        Kind ('lines' or 'bars'), title, data and label of the y axis.
+    """
+    views = result_views(res, max_cached=1)
+    comp_lists = node_registry.component_lists(es)
+
+    for n in comp_lists['buses']:
+        sequences = views.node(n).get("sequences")
+        if sequences is not None:
+            yield str(n), _line_figure(str(n), sequences, max_points)
 
     c_storage_install = []
+    for n in comp_lists['storages']:
+        view = views.node(n)
+        c_storage_install.append(_installed(view))
+        sequences = view.get("sequences")
+        if sequences is None:
+            continue
+        soc = sequences[[c for c in sequences.columns if c[1] == 'capacity']]
+        yield 'soc_{0}'.format(n), _line_figure(
+            str(n), soc, max_points, ylabel='Kapazität [kWh]')
 
-    for n in l_storages:
-        c_storage = outputlib.views.node(res, n)["scalars"][0]
-        c_storage_install.append(c_storage)
-
+    l_invest = []
     p_trans_install = []
+    for n in comp_lists['transformer']:
+        p_install = _installed(views.node(n))
+        if p_install is not None:
+            l_invest.append(str(n))
+            p_trans_install.append(p_install)
 
-    for q in l_transformer:
-        p_install = outputlib.views.node(res, q)["scalars"][0]
-        p_trans_install.append(p_install)
-
-    df_invest_ges = pd.DataFrame(
-        [p_trans_install+c_storage_install],
-        columns=l_transformer+l_storages)
-
-    # the result_gesamt df is exported in excel
-    path_to_results = os.path.join(os.path.expanduser("~"),
-                                   cfg.get('paths', 'results'))
-    filename = 'results.xlsx'
-    with pd.ExcelWriter(os.path.join(path_to_results, filename)) as xls:
-        df_series.to_excel(xls, sheet_name='Timeseries')
-        df_invest_ges.to_excel(xls, sheet_name='Invest')
+    yield 'invest_transformer', (
+        'bars', 'Installierte Leistung', (l_invest, p_trans_install),
+        'Installierte Leistung [kW]')
+    yield 'invest_storages', (
+        'bars', 'Installierte Kapazität',
+        ([str(n) for n in comp_lists['storages']],
+         [np.nan if c is None else c for c in c_storage_install]),
+        'Kapazität [kWh]')
+
+
+def render_report(res=None, es=None, path=None, fmt='png', max_points=2000,
+                  workers=None):
+    """Render all bus, storage content and investment figures to files.
+
+    The figures are rendered without a display (Agg), so this can be used in
+    batch runs. Lines are downsampled to at most `max_points` points, which
+    makes the rendering time independent of the number of timesteps.
+
+    Parameters
+    ----------
+    res : :obj:`dict` or :class:`ResultViews`
+        Results of the optimisation.
+    es : :class:`oemof.solph.EnergySystem`
+    path : str (optional)
+        Output directory. Defaults to the results path of the config.
+    fmt : str
+        File format, e.g. 'png' or 'svg'.
+    max_points : int
+        Maximum number of points per line (see :func:`minmax_positions`).
+    workers : int (optional)
+        Number of worker processes rendering the figures. By default the
+        figures are rendered one after another.
+
+    Returns
+    -------
+    list of str
+        Files of the figures.
+    """
+    if path is None:
+        path = os.path.join(os.path.expanduser("~"),
+                            cfg.get('paths', 'results'))
+    os.makedirs(path, exist_ok=True)
+
+    tasks = [(os.path.join(path, '{0}.{1}'.format(name, fmt)), figure)
+             for name, figure in _file_names(
+                 report_figures(res=res, es=es, max_points=max_points))]
+
+    if workers is None or workers <= 1:
+        return [_render_figure(task) for task in tasks]
+
+    with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+        return pool.map(_render_figure, tasks)
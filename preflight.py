@@ -0,0 +1,198 @@
+"""
+oemof application for research project quarree100.
+
+Preflight estimate of the size of the optimisation model. The number of
+variables, constraints and nonzeros of the model built by
+:func:`setup_solve_model.create_model` is predicted per block from the
+nodes of the energy system, without building the pyomo model:
+
+>>> nd = setup_solve_model.nodes_from_excel(filename)
+>>> report = preflight.preflight(nd, memory_budget=8000)
+>>> report['blocks']
+
+If the predicted peak memory exceeds the budget, a time series aggregation
+is suggested that fits into it (see :mod:`aggregation`).
+
+The memory is estimated with the sizes of pyomo components given in
+:const:`BYTES_PER_VARIABLE`, :const:`BYTES_PER_CONSTRAINT` and
+:const:`BYTES_PER_NONZERO` and is only a rough guide.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import logging
+import math
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import oemof.solph as solph
+from oemof.solph.components import GenericStorage
+import setup_solve_model
+from customized.add_contraints import timestep_values
+from customized.heatpipe import HeatPipeline
+
+
+# approximate memory of pyomo model components in bytes (pyomo 5/6)
+BYTES_PER_VARIABLE = 200
+BYTES_PER_CONSTRAINT = 100
+BYTES_PER_NONZERO = 130
+
+# the peak memory while the model is written to and read by the solver is
+# a multiple of the memory of the model itself
+PEAK_FACTOR = 2.5
+
+# predicted memory in MB above which a job should be downscaled (None: no
+# limit)
+MEMORY_BUDGET = None
+
+BLOCKS = ['flows', 'buses', 'transformers', 'investments', 'storages',
+          'heatpipes', 'emission limit', 'objective']
+
+
+def _nonzero(values, timesteps):
+    """Number of timesteps with a value other than zero."""
+    if values is None:
+        return 0
+    return int(np.count_nonzero(
+        timestep_values(values, list(range(timesteps)))))
+
+
+def model_size(energysystem):
+    """Predict the size of the model of an energy system per block.
+
+    Parameters
+    ----------
+    energysystem : :class:`oemof.solph.EnergySystem`
+
+    Returns
+    -------
+    :pandas:`pandas.DataFrame`
+        'variables', 'constraints', 'nonzeros' and the estimated peak
+        'memory' in MB per block (index: :const:`BLOCKS`).
+    """
+    T = len(energysystem.timeindex)
+    size = OrderedDict((block, [0, 0, 0]) for block in BLOCKS)
+
+    def add(block, variables=0, constraints=0, nonzeros=0):
+        size[block][0] += variables
+        size[block][1] += constraints
+        size[block][2] += nonzeros
+
+    for n in energysystem.nodes:
+        for flow in n.outputs.values():
+            add('flows', variables=T)
+            summed = ((flow.summed_max is not None) +
+                      (flow.summed_min is not None))
+            if getattr(flow, 'investment', None) is not None:
+                add('investments', variables=1,
+                    constraints=T * (1 + bool(flow.fixed)) + summed,
+                    nonzeros=2 * T * (1 + bool(flow.fixed)) + summed * T)
+                add('objective', nonzeros=1)
+            else:
+                add('flows', constraints=summed, nonzeros=summed * T)
+            add('objective', nonzeros=_nonzero(flow.variable_costs, T))
+            factor = getattr(flow, 'emission_factor', None)
+            add('emission limit', nonzeros=_nonzero(factor, T))
+
+        if isinstance(n, solph.Bus):
+            add('buses', constraints=T,
+                nonzeros=T * (len(n.inputs) + len(n.outputs)))
+
+        elif isinstance(n, GenericStorage):
+            invest = n.investment is not None
+            add('storages', variables=T + 1 + invest,
+                constraints=T + n.balanced + T * invest +
+                (n.invest_relation_input_capacity is not None) +
+                (n.invest_relation_output_capacity is not None),
+                nonzeros=4 * T + 2 * n.balanced + 2 * T * invest)
+
+        elif isinstance(n, HeatPipeline):
+            flow = list(n.outputs.values())[0]
+            if n.catalog is not None:
+                k = len(n.catalog)
+                add('heatpipes', variables=k + 1, constraints=2 * T + 2,
+                    nonzeros=(4 + k) * T + 2 * k + 1)
+                add('objective', nonzeros=k)
+            elif getattr(flow, 'investment', None) is not None:
+                add('heatpipes', constraints=T, nonzeros=3 * T)
+            else:
+                add('heatpipes', constraints=T, nonzeros=2 * T)
+
+        elif isinstance(n, solph.Transformer):
+            pairs = len(n.inputs) * len(n.outputs)
+            add('transformers', constraints=T * pairs, nonzeros=2 * T * pairs)
+
+    add('emission limit', constraints=1)
+
+    table = pd.DataFrame.from_dict(
+        size, orient='index', columns=['variables', 'constraints',
+                                       'nonzeros'])
+    table['memory'] = (table['variables'] * BYTES_PER_VARIABLE +
+                       table['constraints'] * BYTES_PER_CONSTRAINT +
+                       table['nonzeros'] * BYTES_PER_NONZERO
+                       ) * PEAK_FACTOR / 1e6
+    return table
+
+
+def preflight(source, memory_budget=None):
+    """Predict the size of the model and check it against a memory budget.
+
+    Parameters
+    ----------
+    source : :obj:`dict` or :class:`oemof.solph.EnergySystem`
+        Nodes data or the energy system built from them.
+    memory_budget : numeric (optional)
+        Memory in MB available for the model. Defaults to
+        :const:`MEMORY_BUDGET`.
+
+    Returns
+    -------
+    report : :obj:`dict`
+        'blocks' (see :func:`model_size`), 'total' (sum of all blocks),
+        'timesteps', 'within_budget' and a 'suggestion' how to downscale the
+        job if it exceeds the budget (None otherwise).
+    """
+    if isinstance(source, dict):
+        energysystem = solph.EnergySystem(
+            timeindex=setup_solve_model.time_index(source))
+        energysystem.add(*setup_solve_model.create_nodes(nd=source))
+    else:
+        energysystem = source
+
+    if memory_budget is None:
+        memory_budget = MEMORY_BUDGET
+
+    blocks = model_size(energysystem)
+    total = blocks.sum()
+    timesteps = len(energysystem.timeindex)
+
+    logging.info(
+        'Predicted model size: {0:.0f} variables, {1:.0f} constraints, '
+        '{2:.0f} nonzeros, about {3:.0f} MB peak memory'.format(
+            total['variables'], total['constraints'], total['nonzeros'],
+            total['memory']))
+
+    report = {'blocks': blocks, 'total': total, 'timesteps': timesteps,
+              'within_budget': True, 'suggestion': None}
+
+    if memory_budget is not None and total['memory'] > memory_budget:
+        # the model size grows linearly with the number of timesteps
+        share = memory_budget / total['memory']
+        max_timesteps = int(timesteps * share)
+        report['within_budget'] = False
+        if max_timesteps >= 24:
+            report['suggestion'] = (
+                'aggregation.aggregate_nodes_data(nd, n_periods={0}) or '
+                'aggregation.downsample_nodes_data(nd, {1})'.format(
+                    max_timesteps // 24, int(math.ceil(1 / share))))
+        else:
+            report['suggestion'] = (
+                'aggregation.downsample_nodes_data(nd, {0})'.format(
+                    int(math.ceil(1 / share))))
+        logging.warning(
+            'The predicted peak memory of {0:.0f} MB exceeds the budget of '
+            '{1:.0f} MB. At most {2} timesteps fit into it, e.g. with {3}.'
+            .format(total['memory'], memory_budget, max_timesteps,
+                    report['suggestion']))
+
+    return report
@@ -0,0 +1,163 @@
+"""
+oemof application for research project quarree100.
+
+Local cache of solved scenarios. The results are stored keyed by a
+fingerprint of everything the solution depends on:
+
+* the content of the nodes data (incl. the emission limit)
+* the solver and its options
+* the versions of oemof, pyomo, pandas and numpy
+* the source code of the modules building the model
+
+Scenarios that have been solved before are not built and solved again, see
+:func:`setup_solve_model.solve_es`.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import hashlib
+import importlib
+import logging
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import pyomo
+import oemof
+import oemof.outputlib as outputlib
+from lean_results import ResultsView
+
+
+# increase if the content of the cache files changes
+RESULT_CACHE_VERSION = 2
+
+# modules whose source code defines the model
+MODEL_MODULES = ['setup_solve_model', 'aggregation', 'lean_results',
+                 'model_solver', 'customized.add_contraints',
+                 'customized.heatpipe']
+
+
+def _update(sha, obj):
+    """Feed an object of the nodes data into a hash."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        sha.update(repr(obj.shape).encode())
+        if isinstance(obj, pd.DataFrame):
+            sha.update(repr(list(obj.columns)).encode())
+            sha.update(repr([str(t) for t in obj.dtypes]).encode())
+        sha.update(pd.util.hash_pandas_object(obj, index=True).values
+                   .tobytes())
+    elif isinstance(obj, np.ndarray):
+        sha.update(repr((obj.shape, str(obj.dtype))).encode())
+        sha.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=repr):
+            sha.update(repr(key).encode())
+            _update(sha, obj[key])
+    else:
+        sha.update(repr(obj).encode())
+
+
+def _module_source_hash():
+    sha = hashlib.sha256()
+    for name in MODEL_MODULES:
+        with open(importlib.import_module(name).__file__, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+def model_fingerprint(nodes_data, solver='cbc', cmdline_options=None):
+    """Return a stable hash of everything a solution depends on.
+
+    Parameters
+    ----------
+    nodes_data : :obj:`dict`
+        Nodes data
+    solver : str
+        Solver to be used.
+    cmdline_options : dict (optional)
+        Solver options.
+
+    Returns
+    -------
+    str
+        SHA-256 hex digest.
+    """
+    sha = hashlib.sha256()
+    _update(sha, {
+        'cache_version': RESULT_CACHE_VERSION,
+        'versions': {'oemof': oemof.__version__,
+                     'pyomo': pyomo.version.version,
+                     'pandas': pd.__version__,
+                     'numpy': np.__version__},
+        'model_source': _module_source_hash(),
+        'solver': solver,
+        'cmdline_options': {str(k): str(v) for k, v in
+                            (cmdline_options or {}).items()},
+        'nodes_data': nodes_data})
+    return sha.hexdigest()
+
+
+def _path(cache_dir, fingerprint):
+    return os.path.join(cache_dir, 'results-{0}.pkl'.format(fingerprint))
+
+
+def load_results(cache_dir, fingerprint, energysystem=None):
+    """Load cached results.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory of the result cache.
+    fingerprint : str
+        See :func:`model_fingerprint`.
+    energysystem : :class:`oemof.solph.EnergySystem` (optional)
+        The keys of the results are mapped to the nodes of this energy
+        system; without it (or for unknown labels) the keys are strings.
+
+    Returns
+    -------
+    tuple or None
+        (results, meta results) or None if the results are not cached. The
+        results are a :class:`lean_results.ResultsView` if they have been
+        stored as one.
+    """
+    path = _path(cache_dir, fingerprint)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            cached = pickle.load(f)
+    except Exception as e:
+        logging.warning('Cannot read cached results {0}: {1}'.format(path, e))
+        return None
+
+    nodes = {}
+    if energysystem is not None:
+        nodes = {str(n): n for n in energysystem.nodes}
+    if isinstance(cached['main'], ResultsView):
+        results = cached['main'].map_nodes(lambda n: nodes.get(n, n))
+    else:
+        results = {tuple(nodes.get(n, n) for n in k): v
+                   for k, v in cached['main'].items()}
+
+    logging.info('Results loaded from cache {0}'.format(path))
+
+    return results, cached['meta']
+
+
+def store_results(cache_dir, fingerprint, results, meta_results):
+    """Store results (see :func:`load_results`) in the cache."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _path(cache_dir, fingerprint)
+    tmp_path = '{0}.tmp{1}'.format(path, os.getpid())
+    if isinstance(results, ResultsView):
+        # the arrays are stored, not the frames of every key
+        main = results.map_nodes(str)
+    else:
+        main = outputlib.processing.convert_keys_to_strings(
+            results, keep_none_type=True)
+    cached = {'main': main, 'meta': meta_results}
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    logging.info('Results stored in cache {0}'.format(path))
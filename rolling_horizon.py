@@ -0,0 +1,275 @@
+"""
+oemof application for research project quarree100.
+
+Rolling horizon dispatch. Instead of one model for the whole horizon, the
+energy system is solved for overlapping windows (e.g. one week with one day
+overlap) one after another. Only the first timesteps of every window up to
+the overlap are kept, the content of the storages at the end of them is the
+initial content of the next window. Only one window model exists at a time,
+so the peak memory depends on the window length and not on the horizon.
+
+Usage:
+
+>>> nd = setup_solve_model.nodes_from_excel(filename)
+>>> results = rolling_horizon.solve_rolling_horizon(nd, window=168,
+...                                                 overlap=24)
+
+The emission limit and the limits summed over the horizon are shared by
+the windows: every window gets the share of the limits for its kept
+timesteps and what the previous windows left unused (see
+:func:`setup_solve_model.slice_nodes_data` and :func:`used_limits`), so the
+whole horizon stays within the limits. Investments are not supported.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import logging
+import pandas as pd
+import oemof.outputlib as outputlib
+from pyomo.opt import TerminationCondition
+from customized.add_contraints import timestep_values
+import setup_solve_model
+from model_solver import ModelSolver
+
+
+def windows(timesteps, window, overlap):
+    """Split a horizon into overlapping windows.
+
+    Parameters
+    ----------
+    timesteps : int
+        Number of timesteps of the horizon.
+    window : int
+        Number of timesteps of a window.
+    overlap : int
+        Number of timesteps a window overlaps with the next one.
+
+    Returns
+    -------
+    list of tuple
+        (start, stop, keep) of every window, with `keep` being the number of
+        timesteps of the window that are part of the results.
+    """
+    if not 0 <= overlap < window:
+        raise ValueError('The overlap ({0}) has to be smaller than the window '
+                         '({1}).'.format(overlap, window))
+
+    result = []
+    start = 0
+    while start < timesteps:
+        stop = min(start + window, timesteps)
+        keep = stop - start if stop == timesteps else window - overlap
+        result.append((start, stop, keep))
+        start += keep
+
+    return result
+
+
+def _check_dispatch(nd):
+    """Raise an error if any active component of the nodes data invests
+    (also by the choice of a pipe size from a catalog)."""
+    for key, table in nd.items():
+        if isinstance(table, pd.DataFrame) and 'invest' in table and \
+                'active' in table:
+            invest = table['invest'].astype(bool)
+            if 'catalog' in table:
+                invest |= table['catalog'].fillna(0).astype(bool)
+            invest = table[table['active'].astype(bool) & invest]
+            if len(invest):
+                raise ValueError(
+                    'Rolling horizon is only possible for dispatch models. '
+                    'Investments in {0}: {1}'.format(
+                        key, ', '.join(invest['label'].astype(str))))
+
+
+def storage_levels(om, timestep):
+    """Return the content of all storages of a solved model at a timestep.
+
+    Returns
+    -------
+    :obj:`dict`
+        Content keyed by the storage label.
+    """
+    block = getattr(om, 'GenericStorageBlock', None)
+    if not hasattr(block, 'capacity'):
+        return {}
+    return {str(n): block.capacity[n, timestep].value
+            for n in block.init_cap}
+
+
+def fix_storage_levels(om, levels, final=None):
+    """Fix the initial content of the storages of a model.
+
+    The storages are no longer balanced, i.e. their content at the end of
+    the horizon is free unless it is given by `final`.
+
+    Parameters
+    ----------
+    om : :class:`oemof.solph.Model`
+    levels : :obj:`dict`
+        Absolute initial content keyed by the storage label.
+    final : :obj:`dict` (optional)
+        Absolute content at the end of the horizon keyed by the storage
+        label.
+    """
+    block = getattr(om, 'GenericStorageBlock', None)
+    if not hasattr(block, 'init_cap'):
+        return
+    final = final or {}
+    last = list(om.TIMESTEPS)[-1]
+    for n in block.init_cap:
+        if str(n) in levels:
+            block.init_cap[n].fix(levels[str(n)])
+            if n in block.balanced_cstr:
+                block.balanced_cstr[n].deactivate()
+        if str(n) in final:
+            block.capacity[n, last].fix(final[str(n)])
+
+
+def used_limits(om, nd, keep):
+    """Return how much of the limits a solved window uses in its first
+    timesteps.
+
+    Parameters
+    ----------
+    om : :class:`oemof.solph.Model`
+        Solved model of the window.
+    nd : :obj:`dict`
+        Nodes data of the window.
+    keep : int
+        Number of timesteps of the window that are part of the results.
+
+    Returns
+    -------
+    :obj:`dict`
+        Emissions and summed flows (in full load hours like
+        :attr:`summed_max`) keyed by (sheet, label, column) as in
+        :func:`setup_solve_model.slice_nodes_data`.
+    """
+    timesteps = list(om.TIMESTEPS)[:keep]
+
+    def flow_sum(i, o, weights):
+        flow = [om.flow[i, o, t].value or 0 for t in timesteps]
+        return float((timestep_values(weights, timesteps) * flow).sum())
+
+    used = {}
+    if hasattr(om, 'total_emissions'):
+        used['general', None, 'emission limit'] = sum(
+            flow_sum(i, o, timestep_values(
+                om.flows[i, o].emission_factor, timesteps) *
+                timestep_values(om.objective_weighting, timesteps))
+            for (i, o) in om.flows
+            if hasattr(om.flows[i, o], 'emission_factor'))
+
+    for key, columns in setup_solve_model.SUMMED_LIMITS.items():
+        if key not in nd:
+            continue
+        for label in nd[key]['label']:
+            node = om.es.groups.get(str(label))
+            if node is None:
+                continue
+            for (i, o) in om.flows:
+                flow = om.flows[i, o]
+                if node in (i, o) and flow.summed_max is not None and \
+                        flow.nominal_value:
+                    for col in columns:
+                        used[key, label, col] = (
+                            used.get((key, label, col), 0) +
+                            flow_sum(i, o, om.timeincrement) /
+                            flow.nominal_value)
+
+    return used
+
+
+def solve_rolling_horizon(excel_nodes, window=168, overlap=24, solver='cbc',
+                          cmdline_options=None, solve_kwargs=None):
+    """Solve the dispatch of the energy system with a rolling horizon.
+
+    The storages of the first window are balanced (content at the end equals
+    the free initial content), the following windows start with the content
+    reached in the previous one. The last window ends with the initial
+    content of the first one, so the storages are balanced over the
+    horizon.
+
+    Parameters
+    ----------
+    excel_nodes : :obj:`dict`
+        Nodes data
+    window : int
+        Number of timesteps of a window.
+    overlap : int
+        Number of timesteps a window overlaps with the next one. The
+        results of the overlap are replaced by those of the next window.
+    solver : str
+        Solver to be used.
+    cmdline_options : dict (optional)
+        Solver options, e.g. {'threads': 4}.
+    solve_kwargs : dict (optional)
+        Arguments passed to the solve method of the solver.
+
+    Returns
+    -------
+    :obj:`dict`
+        Results in the format of :func:`oemof.outputlib.processing.results`
+        for the whole horizon. The keys are the nodes of the first window,
+        the scalars are the ones of the first window.
+    """
+    _check_dispatch(excel_nodes)
+
+    timesteps = excel_nodes['general']['timesteps'][0]
+    index = setup_solve_model.time_index(excel_nodes)
+    parts = windows(timesteps, window, overlap)
+
+    keys = {}
+    scalars = {}
+    sequences = {}
+    levels = {}
+    initial = {}
+    used = {}
+
+    for number, (start, stop, keep) in enumerate(parts):
+        logging.info('Solve window {0} of {1} (timesteps {2} to {3})'
+                     .format(number + 1, len(parts), start, stop - 1))
+
+        nd = setup_solve_model.slice_nodes_data(excel_nodes, start, stop,
+                                                keep=keep, used=used)
+        es = setup_solve_model.setup_es(excel_nodes=nd, quiet=True)
+        om = setup_solve_model.create_model(energysystem=es, excel_nodes=nd)
+        # the last window ends with the initial content of the first one
+        fix_storage_levels(om, levels, final=initial
+                           if number == len(parts) - 1 else None)
+
+        solver_results = ModelSolver(om, solver=solver,
+                                     cmdline_options=cmdline_options,
+                                     solve_kwargs=solve_kwargs).solve()
+        if (solver_results.solver.termination_condition !=
+                TerminationCondition.optimal):
+            raise RuntimeError(
+                'No optimal solution for window {0} (timesteps {1} to {2}).'
+                .format(number + 1, start, stop - 1))
+
+        if number == 0:
+            block = getattr(om, 'GenericStorageBlock', None)
+            if hasattr(block, 'init_cap'):
+                initial = {str(n): block.init_cap[n].value
+                           for n in block.init_cap}
+        levels = storage_levels(om, keep - 1)
+        for k, v in used_limits(om, nd, keep).items():
+            used[k] = used.get(k, 0) + v
+
+        for k, v in outputlib.processing.results(om).items():
+            label = tuple(str(n) if n is not None else None for n in k)
+            if label not in keys:
+                keys[label] = k
+                scalars[label] = v['scalars']
+                sequences[label] = []
+            seq = v['sequences'].iloc[:keep].copy()
+            seq.index = index[start:start + keep]
+            sequences[label].append(seq)
+
+        # free the model before the next window is built
+        del om, es
+
+    return {keys[label]: {'scalars': scalars[label],
+                          'sequences': pd.concat(sequences[label])}
+            for label in keys}
@@ -8,12 +8,16 @@ SPDX-License-Identifier: GPL-3.0-or-later
 
 import setup_solve_model
 import postprocessing
+import node_registry
 import os
 import pprint as pp
 import oemof.solph as solph
 import oemof.outputlib as outputlib
 import logging
 from customized import add_contraints
+from customized import heatpipe
+import lean_results
+from model_solver import ModelSolver
 from matplotlib import pyplot as plt
 
 
@@ -28,8 +32,15 @@ path_to_data = 'ownCloud/FhG-owncloud-Quarree-AB3/oemof_AB1/Daten/'
 filename = os.path.join(
     os.path.expanduser("~"), path_to_data, 'AB1_Basecase_v12.xlsx')
 
+# directory of the binary cache of parsed scenario workbooks
+path_to_cache = os.path.join(os.path.expanduser("~"), 'oemof', 'q100_cache')
+
 # reading data from excel file with data read function
-node_data = setup_solve_model.nodes_from_excel(filename)
+node_data = setup_solve_model.nodes_from_excel(filename,
+                                               cache_dir=path_to_cache)
+
+# coarser timesteps for fast screening runs
+# node_data = setup_solve_model.resample_nodes_data(node_data, '4h')
 
 # setting up energy system
 e_sys = setup_solve_model.setup_es(excel_nodes=node_data)
@@ -49,7 +60,11 @@ add_contraints.emission_limit_dyn(
 
 logging.info('Solve the optimization problem')
 # if tee_switch is true solver messages will be displayed
-om.solve(solver='cbc', solve_kwargs={'tee': False})
+# with persistent=True the model is kept loaded in the solver (e.g. 'highs')
+# for further solves with changed parameters
+model_solver = ModelSolver(om, solver='cbc', persistent=False,
+                           solve_kwargs={'tee': False})
+model_solver.solve()
 
 # plot the Energy System
 try:
@@ -67,7 +82,8 @@ except ImportError:
 
 logging.info('Store the energy system with the results.')
 # add results to the energy system to make it possible to store them.
-e_sys.results['main'] = outputlib.processing.results(om)
+e_sys.results['main'] = lean_results.extract_results(om).view()
+heatpipe.heat_loss_results(om, e_sys.results['main'])
 e_sys.results['meta'] = outputlib.processing.meta_results(om)
 
 # store energy system with results
@@ -84,16 +100,10 @@ print('')
 
 def print_buses(res=None, es=None):
 
-    l_buses = []
+    views = postprocessing.result_views(res)
 
-    for n in es.nodes:
-        type_name =\
-            str(type(n)).replace("<class 'oemof.solph.", "").replace("'>", "")
-        if type_name == "network.Bus":
-            l_buses.append(n.label)
-
-    for n in l_buses:
-        print(outputlib.views.node(res, n)['sequences'].sum(axis=0))
+    for n in node_registry.component_lists(es)['buses']:
+        print(views.node(n)['sequences'].sum(axis=0))
 
 
 print_buses(res=e_sys.results['main'], es=e_sys)
@@ -110,5 +120,9 @@ print(om.total_emissions())
 # # plot the installed storage capacities
 # postprocessing.plot_storages_invest(res=results, es=e_sys)
 #
-# # expoprt the results to excel
-# postprocessing.export_excel(res=results, es=e_sys)
+# # export the results, one parquet file per bus (or fmt='excel')
+# postprocessing.export_results(res=results, es=e_sys, path='results')
+#
+# # render all figures to files without a display
+# postprocessing.render_report(res=results, es=e_sys, path='results',
+#                              workers=4)
@@ -12,27 +12,89 @@ from oemof.tools import economics
 import oemof.solph as solph
 import oemof.outputlib as outputlib
 import logging
+import hashlib
+import os
+import shutil
 import pandas as pd
 import numpy as np
+import pyomo.environ as po
+from pyomo.opt import TerminationCondition
 from customized import add_contraints
 from customized import heatpipe
+from model_solver import ModelSolver
+import aggregation
+import result_cache
+import lean_results
+import node_registry
 
 
-def nodes_from_excel(filename):
+# sheets of the scenario workbook, keyed by their name in the nodes data
+SHEETS = {'buses': 'Buses',
+          'commodity_sources': 'Sources',
+          'sources_series': 'Sources_series',
+          'demand': 'Demand',
+          'sinks': 'Sinks',
+          'transformer': 'Transformer',
+          'heatpipes': 'Heatpipes',
+          'heatpipe_catalog': 'Heatpipe_catalog',
+          'storages': 'Storages',
+          'timeseries': 'Timeseries',
+          'general': 'General'
+          }
+
+# sheets that may be missing in a scenario workbook
+OPTIONAL_SHEETS = ['heatpipes', 'heatpipe_catalog']
+
+# increase if the layout of the cache files changes
+CACHE_VERSION = 3
+
+# number of cache entries kept per workbook (the newest ones)
+CACHE_ENTRIES = 2
+
+
+def nodes_from_excel(filename, cache_dir=None, start=None, end=None):
+    """Read the nodes data from an Excel workbook.
+
+    Parameters
+    ----------
+    filename : str
+        Path of the scenario workbook.
+    cache_dir : str (optional)
+        Directory of the binary cache. If given, the parsed sheets are stored
+        there keyed by the content hash of the workbook, and loaded from there
+        as long as the workbook is unchanged.
+    start : int or timestamp (optional)
+        First timestep of a time window, see :func:`select_window`.
+    end : int or timestamp (optional)
+        Timestep after the time window.
+
+    Returns
+    -------
+    nodes_data : :obj:`dict`
+    """
+    if start is not None or end is not None:
+        # the workbook is read (and cached) completely
+        return select_window(nodes_from_excel(filename, cache_dir=cache_dir),
+                             start=start, end=end)
+
+    if cache_dir is not None:
+        cache_path = _cache_path(filename, cache_dir)
+        if os.path.isdir(cache_path):
+            try:
+                nodes_data = _read_cache(cache_path)
+            except (OSError, EOFError, ValueError) as e:
+                # e.g. removed by another process in the meantime
+                logging.warning('Cannot read cache entry {0}: {1}'.format(
+                    cache_path, e))
+            else:
+                print('Data from Excel file {} loaded from cache.'
+                      .format(filename))
+                return nodes_data
 
     xls = pd.ExcelFile(filename)
 
-    nodes_data = {'buses': xls.parse('Buses'),
-                  'commodity_sources': xls.parse('Sources'),
-                  'sources_series': xls.parse('Sources_series'),
-                  'demand': xls.parse('Demand'),
-                  'sinks': xls.parse('Sinks'),
-                  'transformer': xls.parse('Transformer'),
-#                  'heatpipes': xls.parse('Heatpipes'),
-                  'storages': xls.parse('Storages'),
-                  'timeseries': xls.parse('Timeseries'),
-                  'general': xls.parse('General')
-                  }
+    nodes_data = {key: xls.parse(sheet) for key, sheet in SHEETS.items()
+                  if key not in OPTIONAL_SHEETS or sheet in xls.sheet_names}
 
     # set datetime index
     nodes_data['timeseries'].set_index('timestamp', inplace=True)
@@ -42,9 +104,416 @@ def nodes_from_excel(filename):
     print('Data from Excel file {} imported.'
           .format(filename))
 
+    if cache_dir is not None:
+        _write_cache(cache_path, nodes_data)
+
     return nodes_data
 
 
+def file_hash(filename, blocksize=2**20):
+    """Return the SHA-256 hex digest of the content of a file."""
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _cache_path(filename, cache_dir):
+    """Return the cache entry of a workbook.
+
+    The name is `<stem>-<path hash>-v<version>-<content hash>`, the hash of
+    the absolute path tells workbooks of the same name apart.
+    """
+    path = os.path.abspath(filename)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    path_hash = hashlib.sha256(path.encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, '{0}-{1}-v{2}-{3}'.format(
+        stem, path_hash, CACHE_VERSION, file_hash(filename)))
+
+
+def _write_cache(cache_path, nodes_data):
+    """Store the parsed sheets of a workbook in the cache directory.
+
+    The timeseries table is stored as plain numpy arrays (.npz), all other
+    (small) sheets are pickled. Only the newest :const:`CACHE_ENTRIES`
+    entries of the same workbook are kept, so that an entry another process
+    is still reading is not removed right away.
+    """
+    cache_dir, name = os.path.split(cache_path)
+    stem = name.rsplit('-', 2)[0]
+    tmp_path = '{0}.tmp{1}'.format(cache_path, os.getpid())
+    os.makedirs(tmp_path, exist_ok=True)
+
+    sheets = {k: v for k, v in nodes_data.items() if k != 'timeseries'}
+    ts = nodes_data['timeseries']
+    if len(ts.select_dtypes(include=[np.number]).columns) == len(ts.columns):
+        np.savez(os.path.join(tmp_path, 'timeseries.npz'),
+                 values=ts.to_numpy(dtype=float),
+                 index=ts.index.values,
+                 columns=np.array(ts.columns, dtype=str))
+    else:
+        sheets['timeseries'] = ts
+    pd.to_pickle(sheets, os.path.join(tmp_path, 'sheets.pkl'))
+
+    try:
+        os.rename(tmp_path, cache_path)
+    except OSError:
+        # another process has written the same entry in the meantime
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return
+
+    entries = [os.path.join(cache_dir, entry)
+               for entry in os.listdir(cache_dir)
+               if entry.rsplit('-', 2)[0] == stem and '.tmp' not in entry]
+    entries.sort(key=_modified, reverse=True)
+    for path in entries[CACHE_ENTRIES:]:
+        if path != cache_path:
+            shutil.rmtree(path, ignore_errors=True)
+            logging.info('Removed outdated cache entry {0}'.format(path))
+
+
+def _modified(path):
+    """Return the modification time of a path (0 if it is gone)."""
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def _read_cache(cache_path):
+    nodes_data = pd.read_pickle(os.path.join(cache_path, 'sheets.pkl'))
+    ts_file = os.path.join(cache_path, 'timeseries.npz')
+    if os.path.isfile(ts_file):
+        with np.load(ts_file, allow_pickle=False) as ts:
+            nodes_data['timeseries'] = pd.DataFrame(
+                ts['values'], columns=list(ts['columns']),
+                index=pd.DatetimeIndex(ts['index'], name='timestamp'))
+    return nodes_data
+
+
+def split_ts_column(col):
+    """Split a timeseries column name into component label and parameter.
+
+    Both the `label.param` and the `label..param` convention are accepted
+    and result in the same parameter name.
+
+    Parameters
+    ----------
+    col : str
+        Column name of the timeseries sheet.
+
+    Returns
+    -------
+    tuple : (label, parameter)
+    """
+    label, _, param = str(col).partition('.')
+    return label, param.lstrip('.')
+
+
+def component_labels(nd, active_only=False):
+    """Return the labels of all components that may reference a timeseries.
+
+    Parameters
+    ----------
+    nd : :obj:`dict`
+        Nodes data
+    active_only : bool
+        Only return the labels of active components.
+
+    Returns
+    -------
+    set of str
+    """
+    labels = set()
+    for key in ['commodity_sources', 'sources_series', 'demand', 'sinks',
+                'transformer', 'heatpipes']:
+        if key in nd:
+            table = nd[key]
+            if active_only:
+                table = table[table['active'].astype(bool)]
+            labels.update(table['label'])
+    return labels
+
+
+def timeseries_index(timeseries, labels=None):
+    """Parse the column names of the timeseries table once.
+
+    The returned index maps every component label to a dictionary of its
+    timeseries parameters, so that node creation does not have to scan all
+    columns for every component.
+
+    Parameters
+    ----------
+    timeseries : :pandas:`pandas.DataFrame`
+        Timeseries table of the nodes data.
+    labels : iterable of str (optional)
+        Labels of all components. Columns referring to any other label are
+        reported as unknown.
+
+    Returns
+    -------
+    tsi : :obj:`dict`
+        Index of the form {label: {parameter: :pandas:`pandas.Series`}}.
+
+    Raises
+    ------
+    ValueError
+        If two columns refer to the same parameter of the same component,
+        e.g. `label.param` and `label..param`.
+    """
+    tsi = {}
+    columns = {}
+    malformed = []
+
+    for col in timeseries.columns:
+        label, param = split_ts_column(col)
+        if not label or not param:
+            malformed.append(col)
+            continue
+        if (label, param) in columns:
+            raise ValueError(
+                "Timeseries columns '{0}' and '{1}' both define parameter "
+                "'{2}' of component '{3}'.".format(
+                    columns[(label, param)], col, param, label))
+        columns[(label, param)] = col
+        tsi.setdefault(label, {})[param] = timeseries[col]
+
+    if malformed:
+        logging.warning(
+            'Timeseries columns without `label.parameter` name are ignored: '
+            '{0}'.format(', '.join(map(str, malformed))))
+
+    if labels is not None:
+        unknown = sorted(set(tsi) - set(labels))
+        if unknown:
+            logging.warning(
+                'Timeseries columns refer to unknown components: '
+                '{0}'.format(', '.join(unknown)))
+
+    return tsi
+
+
+def get_series(tsi, label, param):
+    """Return the timeseries of a parameter of a component.
+
+    Parameters
+    ----------
+    tsi : :obj:`dict`
+        Timeseries index created with :func:`timeseries_index`.
+    label : str
+        Label of the component.
+    param : str
+        Name of the parameter, e.g. 'variable_costs'.
+
+    Returns
+    -------
+    :pandas:`pandas.Series`
+    """
+    try:
+        return tsi[label][param]
+    except KeyError:
+        raise ValueError(
+            "No timeseries column '{0}.{1}' found for component '{0}'."
+            .format(label, param))
+
+
+def time_index(nd):
+    """Return the time index of the energy system for the nodes data.
+
+    The timestamps of the timeseries are used if they have a regular step
+    (e.g. 15 minutes or hours). Otherwise hourly steps starting on 1/1/2018
+    are assumed.
+    """
+    number_timesteps = nd['general']['timesteps'][0]
+
+    index = nd['timeseries'].index
+    if (isinstance(index, pd.DatetimeIndex) and
+            len(index) >= number_timesteps):
+        index = index[:number_timesteps]
+        if index.freq is not None:
+            return index
+        steps = np.unique(np.diff(index.values))
+        if len(steps) == 1:
+            return pd.DatetimeIndex(index, freq=pd.Timedelta(steps[0]))
+        if len(steps) > 1:
+            logging.warning('The timestamps of the timeseries are not '
+                            'regular. Hourly timesteps are assumed.')
+
+    return pd.date_range('1/1/2018', periods=number_timesteps, freq='H')
+
+
+def timestep_hours(nd):
+    """Return the length of a timestep of the nodes data in hours."""
+    return time_index(nd).freq.nanos / 3.6e12
+
+
+def horizon_hours(nd):
+    """Return the number of hours represented by the model horizon.
+
+    For aggregated nodes data (see :mod:`aggregation`) this is the sum of
+    the weights of the typical periods, otherwise the number of timesteps
+    times their length.
+    """
+    if 'aggregation' in nd:
+        return float(np.sum(nd['aggregation']['weights']))
+    return nd['general']['timesteps'][0] * timestep_hours(nd)
+
+
+def resample_nodes_data(nd, freq):
+    """Return the nodes data resampled to coarser timesteps.
+
+    The timeseries are averaged over the new timesteps with
+    :func:`aggregation.downsample_nodes_data`, so flows given as power keep
+    their energy with the longer time increment of the model. A last
+    timestep covering fewer original timesteps gets a shorter time
+    increment. For fast screening runs:
+
+    >>> nd = setup_solve_model.resample_nodes_data(nd, '4h')
+
+    Parameters
+    ----------
+    nd : :obj:`dict`
+        Nodes data
+    freq : str
+        New length of the timesteps as pandas frequency, e.g. '2h', '4h'
+        or 'D', a multiple of the timesteps of the nodes data.
+
+    Returns
+    -------
+    :obj:`dict`
+        Copy of the nodes data with the resampled timeseries.
+    """
+    step = pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+    factor = step / pd.Timedelta(hours=timestep_hours(nd))
+    if factor < 1 or not float(factor).is_integer():
+        raise ValueError('Timesteps of {0} are no multiple of the timesteps '
+                         'of the nodes data ({1} h).'.format(
+                             freq, timestep_hours(nd)))
+
+    return aggregation.downsample_nodes_data(nd, int(factor))
+
+
+# columns holding limits summed over the horizon, scaled when slicing
+SUMMED_LIMITS = {'transformer': ['in_1_sum_max'],
+                 'sinks': ['total_max']}
+
+
+def slice_nodes_data(nd, start, stop, timeseries=None, keep=None,
+                     used=None):
+    """Return the nodes data restricted to the timesteps start to stop.
+
+    The emission limit and the limits summed over the horizon (see
+    :const:`SUMMED_LIMITS`) are the budget of the slice: the share of the
+    limit for the timesteps up to `start + keep`, less what the timesteps
+    before `start` have used. By default the earlier timesteps have used
+    exactly their share, so the limits are spread evenly over the horizon.
+    The annualised investment costs follow the length of the slice (see
+    :func:`horizon_hours`) and the storages are balanced within the slice.
+
+    Parameters
+    ----------
+    nd : :obj:`dict`
+        Nodes data
+    start : int
+        First timestep.
+    stop : int
+        Timestep after the last one.
+    timeseries : :pandas:`pandas.DataFrame` (optional)
+        Timeseries of the slice if they have been read already, otherwise
+        they are taken from the nodes data.
+    keep : int (optional)
+        Number of timesteps of the slice the budget is given for, e.g.
+        without the overlap of a rolling horizon window. Defaults to all.
+    used : :obj:`dict` (optional)
+        Amounts of the limits used before `start`, keyed by (sheet, label,
+        column) with label None for the 'general' sheet.
+
+    Returns
+    -------
+    :obj:`dict`
+        Nodes data of the slice.
+    """
+    timesteps = nd['general']['timesteps'][0]
+    if keep is None:
+        keep = stop - start
+    if used is None:
+        used = {}
+
+    def budget(limit, used_before):
+        """Share of the limit up to the kept timesteps less the used one."""
+        used_before = used_before.fillna(limit * start / float(timesteps))
+        return (limit * (start + keep) / float(timesteps) -
+                used_before).clip(lower=0)
+
+    sliced = dict(nd)
+    if timeseries is None:
+        timeseries = nd['timeseries'].iloc[start:stop]
+    sliced['timeseries'] = timeseries
+
+    sliced['general'] = nd['general'].copy()
+    sliced['general']['timesteps'] = stop - start
+    limit = pd.to_numeric(nd['general']['emission limit'], errors='coerce')
+    sliced['general']['emission limit'] = budget(limit, pd.Series(
+        used.get(('general', None, 'emission limit')), index=limit.index,
+        dtype=float))
+
+    for key, columns in SUMMED_LIMITS.items():
+        if key in nd:
+            sliced[key] = nd[key].copy()
+            for col in columns:
+                if col in sliced[key]:
+                    limit = pd.to_numeric(sliced[key][col], errors='coerce')
+                    sliced[key][col] = budget(limit, pd.Series(
+                        [used.get((key, label, col))
+                         for label in sliced[key]['label']],
+                        index=limit.index, dtype=float))
+
+    return sliced
+
+
+def window_positions(index, start=None, end=None):
+    """Return the positions of a time window.
+
+    Parameters
+    ----------
+    index : :pandas:`pandas.DatetimeIndex`
+        Timestamps of the timesteps.
+    start : int or timestamp (optional)
+        First timestep of the window as position or timestamp. Defaults to
+        the first timestep.
+    end : int or timestamp (optional)
+        Timestep after the window (excluded) as position or timestamp.
+        Defaults to the end of the index.
+
+    Returns
+    -------
+    tuple : (start, stop)
+    """
+    def position(value, default):
+        if value is None:
+            return default
+        if isinstance(value, (int, np.integer)):
+            return int(value)
+        return int(index.searchsorted(pd.Timestamp(value)))
+
+    first = position(start, 0)
+    stop = min(position(end, len(index)), len(index))
+    if not 0 <= first < stop:
+        raise ValueError('The time window {0} to {1} contains no timesteps.'
+                         .format(start, end))
+    return first, stop
+
+
+def select_window(nd, start=None, end=None):
+    """Return the nodes data of a time window (see :func:`window_positions`
+    and :func:`slice_nodes_data`)."""
+    timesteps = nd['general']['timesteps'][0]
+    first, stop = window_positions(nd['timeseries'].index[:timesteps],
+                                   start=start, end=end)
+    return slice_nodes_data(nd, first, stop)
+
+
 def create_nodes(nd=None):
     """Create nodes (oemof objects) from node dict
 
@@ -63,6 +532,13 @@ def create_nodes(nd=None):
 
     nodes = []
 
+    # share of a year represented by the model horizon, used to scale the
+    # annualised investment costs
+    year_share = horizon_hours(nd) / 8760
+
+    # parse the timeseries column names once for all components
+    tsi = timeseries_index(nd['timeseries'], labels=component_labels(nd))
+
     # Create Bus objects from buses table
     busd = {}
 
@@ -92,16 +568,14 @@ def create_nodes(nd=None):
             outflow_args = {}
 
             if cs['cost_series']:
-                for col in nd['timeseries'].columns.values:
-                    if col.split('..')[0] == cs['label']:
-                        outflow_args['variable_costs'] = nd['timeseries'][col]
+                outflow_args['variable_costs'] = get_series(
+                    tsi, cs['label'], 'variable_costs')
             else:
                 outflow_args['variable_costs'] = cs['variable costs']
 
             if cs['emission_series']:
-                for col in nd['timeseries'].columns.values:
-                    if col.split('.')[0] == cs['label']:
-                        outflow_args['emission_factor'] = nd['timeseries'][col]
+                outflow_args['emission_factor'] = get_series(
+                    tsi, cs['label'], 'emission_factor')
             else:
                 outflow_args['emission_factor'] = \
                     np.full(nd['general']['timesteps'][0], cs['emissions'])
@@ -119,13 +593,10 @@ def create_nodes(nd=None):
                 # calculation epc
                 epc = economics.annuity(
                     capex=ss['capex'], n=ss['n'],
-                    wacc=nd['general']['interest rate'][0]) * nd[
-                          'general']['timesteps'][0] / 8760
+                    wacc=nd['general']['interest rate'][0]) * year_share
 
                 # get time series for node and parameter
-                for col in nd['timeseries'].columns.values:
-                    if col.split('.')[0] == ss['label']:
-                        av = nd['timeseries'][col]
+                av = get_series(tsi, ss['label'], 'actual_value')
 
                 # create
                 nodes.append(
@@ -144,9 +615,7 @@ def create_nodes(nd=None):
                 outflow_args = {'nominal_value': ss['installed'],
                                 'fixed': True}
                 # get time series for node and parameter
-                for col in nd['timeseries'].columns.values:
-                    if col.split('.')[0] == ss['label']:
-                        outflow_args[col.split('.')[1]] = nd['timeseries'][col]
+                outflow_args.update(tsi.get(ss['label'], {}))
 
                 # create
                 nodes.append(
@@ -162,9 +631,7 @@ def create_nodes(nd=None):
             inflow_args = {'nominal_value': de['scalingfactor'],
                            'fixed': de['fixed']}
             # get time series for node and parameter
-            for col in nd['timeseries'].columns.values:
-                if col.split('.')[0] == de['label']:
-                    inflow_args[col.split('.')[1]] = nd['timeseries'][col]
+            inflow_args.update(tsi.get(de['label'], {}))
 
             # create
             nodes.append(
@@ -181,16 +648,14 @@ def create_nodes(nd=None):
                             'summed_max': sk['total_max']}
 
             if sk['cost_series']:
-                for col in nd['timeseries'].columns.values:
-                    if col.split('..')[0] == sk['label']:
-                        outflow_args['variable_costs'] = nd['timeseries'][col]
+                outflow_args['variable_costs'] = get_series(
+                    tsi, sk['label'], 'variable_costs')
             else:
                 outflow_args['variable_costs'] = sk['variable_costs']
 
             if sk['emission_series']:
-                for col in nd['timeseries'].columns.values:
-                    if col.split('.')[0] == sk['label']:
-                        outflow_args['emission_factor'] = nd['timeseries'][col]
+                outflow_args['emission_factor'] = get_series(
+                    tsi, sk['label'], 'emission_factor')
             else:
                 outflow_args['emission_factor'] = \
                     np.full(nd['general']['timesteps'][0], sk['emissions'])
@@ -211,15 +676,13 @@ def create_nodes(nd=None):
                 if t['invest']:
 
                     if t['eff_out_1'] == 'series':
-                        for col in nd['timeseries'].columns.values:
-                            if col.split('.')[0] == t['label']:
-                                t[col.split('.')[1]] = nd['timeseries'][col]
+                        for param, series in tsi.get(t['label'], {}).items():
+                            t[param] = series
 
                     # calculation epc
                     epc_t = economics.annuity(
                         capex=t['capex'], n=t['n'],
-                        wacc=nd['general']['interest rate'][0]) * nd[
-                            'general']['timesteps'][0] / 8760
+                        wacc=nd['general']['interest rate'][0]) * year_share
 
                     # create
                     nodes.append(
@@ -231,9 +694,7 @@ def create_nodes(nd=None):
                                 emissions=['emissions'],
                                 summed_max=t['in_1_sum_max'],
                                 investment=solph.Investment(
-                                    ep_costs=epc_t + t['service']*(
-                                            nd['general'][
-                                                'timesteps'][0]/8760),
+                                    ep_costs=epc_t + t['service']*year_share,
                                     maximum=t['max_invest'],
                                     minimum=t['min_invest']))},
                             conversion_factors={
@@ -243,9 +704,8 @@ def create_nodes(nd=None):
                 else:
                     # create
                     if t['eff_out_1'] == 'series':
-                        for col in nd['timeseries'].columns.values:
-                            if col.split('.')[0] == t['label']:
-                                t[col.split('.')[1]] = nd['timeseries'][col]
+                        for param, series in tsi.get(t['label'], {}).items():
+                            t[param] = series
 
                     nodes.append(
                         solph.Transformer(
@@ -267,8 +727,7 @@ def create_nodes(nd=None):
                     # calculation epc
                     epc_t = economics.annuity(
                         capex=t['capex'], n=t['n'],
-                        wacc=nd['general']['interest rate'][0]) *\
-                          nd['general']['timesteps'][0] / 8760
+                        wacc=nd['general']['interest rate'][0]) * year_share
 
                     # create
                     nodes.append(
@@ -280,8 +739,7 @@ def create_nodes(nd=None):
                                 variable_costs=t['variable costs'],
                                 emissions=['emissions'],
                                 investment=solph.Investment(
-                                    ep_costs=epc_t + t['service']*(nd[
-                                        'general']['timesteps'][0] / 8760),
+                                    ep_costs=epc_t + t['service']*year_share,
                                     maximum=t['max_invest'],
                                     minimum=t['min_invest'])),
                                 busd[t['out_2']]: solph.Flow()
@@ -318,8 +776,7 @@ def create_nodes(nd=None):
                     # calculation epc
                     epc_t = economics.annuity(
                         capex=t['capex'], n=t['n'],
-                        wacc=nd['general']['interest rate'][0]) *\
-                          nd['general']['timesteps'][0] / 8760
+                        wacc=nd['general']['interest rate'][0]) * year_share
 
                     # create
                     nodes.append(
@@ -332,8 +789,7 @@ def create_nodes(nd=None):
                                 variable_costs=t['variable costs'],
                                 emissions=['emissions'],
                                 investment=solph.Investment(ep_costs=epc_t+t[
-                                    'service']*(nd[
-                                        'general']['timesteps'][0] / 8760),
+                                    'service']*year_share,
                                     maximum=t['max_invest'],
                                     minimum=t['min_invest']))},
                             conversion_factors={
@@ -346,9 +802,8 @@ def create_nodes(nd=None):
                 else:
 
                     if t['eff_out_1'] == 'series':
-                        for col in nd['timeseries'].columns.values:
-                            if col.split('.')[0] == t['label']:
-                                t[col.split('.')[1]] = nd['timeseries'][col]
+                        for param, series in tsi.get(t['label'], {}).items():
+                            t[param] = series
 
                     nodes.append(
                         solph.Transformer(
@@ -374,8 +829,7 @@ def create_nodes(nd=None):
                     # calculation epc
                     epc_t = economics.annuity(
                         capex=t['capex'], n=t['n'],
-                        wacc=nd['general']['interest rate'][0]) *\
-                          nd['general']['timesteps'][0] / 8760
+                        wacc=nd['general']['interest rate'][0]) * year_share
 
                     # create
                     nodes.append(
@@ -388,8 +842,7 @@ def create_nodes(nd=None):
                                 variable_costs=t['variable costs'],
                                 emissions=['emissions'],
                                 investment=solph.Investment(ep_costs=epc_t + t[
-                                    'service']*(nd[
-                                     'general']['timesteps'][0] / 8760),
+                                    'service']*year_share,
                                     maximum=t['max_invest'],
                                     minimum=t['min_invest'])
                                 ),
@@ -424,57 +877,66 @@ def create_nodes(nd=None):
                             })
                     )
 
-    """
-    # Create Transformer objects from 'transformers' table
-    for i, hp in nd['heatpipes'].iterrows():
-        if hp['active']:
-            if hp['invest']:
+    # Create HeatPipeline objects from the optional 'heatpipes' table; the
+    # rows are read as records instead of iterrows, and scalar efficiencies
+    # and loss factors are passed as scalars, so the memory of the network
+    # does not grow with the number of timesteps
+    if 'heatpipes' in nd:
+        hps = nd['heatpipes'][nd['heatpipes']['active'].astype(bool)]
+        invest = hps[hps['invest'].astype(bool)]
+
+        # annuity once per distinct capex and lifetime
+        epc_hp = {
+            (capex, n): economics.annuity(
+                capex=capex, n=n,
+                wacc=nd['general']['interest rate'][0]) * year_share
+            for capex, n in set(zip(invest['capex'], invest['n']))}
+
+        # pipe sizes to choose from for pipes with a 'catalog' flag, with
+        # the annualised costs per metre; shared by all these pipes
+        catalog = None
+        if 'heatpipe_catalog' in nd:
+            catalog = nd['heatpipe_catalog'].copy()
+            catalog['costs'] = [
+                (economics.annuity(
+                    capex=capex, n=n,
+                    wacc=nd['general']['interest rate'][0]) + service) *
+                year_share for capex, n, service in zip(
+                    catalog['capex'], catalog['n'], catalog['service'])]
+
+        for hp in hps.to_dict('records'):
+            extra_args = {}
+            if hp.get('catalog') == 1:
+                if catalog is None:
+                    raise ValueError(
+                        "Heatpipe '{0}' chooses its size from the catalog, "
+                        "but there is no '{1}' sheet.".format(
+                            hp['label'], SHEETS['heatpipe_catalog']))
+                outflow = solph.Flow()
+                extra_args['catalog'] = catalog
+            elif hp['invest']:
+                outflow = solph.Flow(investment=solph.Investment(
+                    ep_costs=epc_hp[hp['capex'], hp['n']] +
+                    hp['service'] * year_share,
+                    maximum=hp['max_invest'],
+                    minimum=hp['min_invest']))
+            else:
+                outflow = solph.Flow(nominal_value=hp['installed'])
 
-                # calculation epc
-                epc_t = economics.annuity(
-                    capex=hp['capex'], n=hp['n'],
-                    wacc=nd['general']['interest rate'][0]) * nd[
-                            'general']['timesteps'][0] / 8760
+            # a loss factor series in the timeseries replaces the scalar
+            heat_loss_factor = tsi.get(hp['label'], {}).get(
+                'heat_loss_factor', hp['heat_loss_factor'])
 
-                # create
-                nodes.append(
-                    heatpipe.Heatpipe(
-                        label=hp['label'],
-                        inputs={busd[hp['in_1']]: solph.Flow()},
-                        outputs={busd[hp['out_1']]: solph.Flow(
-                            investment=solph.Investment(
-                                ep_costs=epc_t + hp['service'] * (
-                                        nd['general'][
-                                            'timesteps'][0] / 8760),
-                                maximum=hp['max_invest'],
-                                minimum=hp['min_invest']))},
-                        effiency=[hp['efficiency'] for k in range(
-                            0, nd['general']['timesteps'][0])],
-                        heat_loss_factor=hp['heat_loss_factor'],
-                        length=hp['length']))
-
-            # else:
-            #     # create
-            #     if t['eff_out_1'] == 'series':
-            #         for col in nd['timeseries'].columns.values:
-            #             if col.split('.')[0] == t['label']:
-            #                 t[col.split('.')[1]] = nd['timeseries'][
-            #                     col]
-            #
-            #     nodes.append(
-            #         solph.Transformer(
-            #             label=t['label'],
-            #             inputs={busd[t['in_1']]: solph.Flow()},
-            #             outputs={busd[t['out_1']]: solph.Flow(
-            #                 nominal_value=t['installed'],
-            #                 summed_max=t['in_1_sum_max'],
-            #                 variable_costs=t['variable costs'],
-            #                 emissions=['emissions'])},
-            #             conversion_factors={
-            #                 busd[t['out_1']]: t['eff_out_1']})
-            #     )
+            nodes.append(
+                heatpipe.HeatPipeline(
+                    label=hp['label'],
+                    inputs={busd[hp['in_1']]: solph.Flow()},
+                    outputs={busd[hp['out_1']]: outflow},
+                    conversion_factors={busd[hp['out_1']]: hp['efficiency']},
+                    heat_loss_factor=heat_loss_factor,
+                    length=hp['length'],
+                    **extra_args))
 
-    """
     # create storages
     for i, s in nd['storages'].iterrows():
         if s['active']:
@@ -482,8 +944,7 @@ def create_nodes(nd=None):
                 # calculate epc
                 epc_s = economics.annuity(
                     capex=s['capex'], n=s['n'],
-                    wacc=nd['general']['interest rate'][0]) * \
-                        nd['general']['timesteps'][0] / 8760
+                    wacc=nd['general']['interest rate'][0]) * year_share
 
                 # create Storages
                 nodes.append(
@@ -508,7 +969,7 @@ def create_nodes(nd=None):
                         inputs={busd[s['bus']]: solph.Flow()},
                         outputs={busd[s['bus']]: solph.Flow()},
                         loss_rate=s['capacity_loss'],
-                        nominal_capacity=s['capacity'],
+                        nominal_storage_capacity=s['capacity'],
                         inflow_conversion_factor=s['inflow_conversion_factor'],
                         outflow_conversion_factor=s[
                             'outflow_conversion_factor'],
@@ -517,17 +978,27 @@ def create_nodes(nd=None):
     return nodes
 
 
-def setup_es(excel_nodes=None):
+def setup_es(excel_nodes=None, quiet=False):
+    """Create the energy system with the nodes of the nodes data.
+
+    Parameters
+    ----------
+    excel_nodes : :obj:`dict`
+        Nodes data
+    quiet : bool
+        Do not print the created objects, e.g. for an energy system built
+        many times.
+
+    Returns
+    -------
+    :class:`oemof.solph.EnergySystem`
+    """
     # Initialise the Energy System
     logger.define_logging()
     logging.info('Initialize the energy system')
 
-    number_timesteps = excel_nodes['general']['timesteps'][0]
-
-    date_time_index = pd.date_range('1/1/2018',
-                                    periods=number_timesteps,
-                                    freq='H')
-    energysystem = solph.EnergySystem(timeindex=date_time_index)
+    energysystem = node_registry.energy_system(
+        timeindex=time_index(excel_nodes))
 
     logging.info('Create oemof objects')
 
@@ -537,6 +1008,9 @@ def setup_es(excel_nodes=None):
     # add nodes and flows to energy system
     energysystem.add(*my_nodes)
 
+    if quiet:
+        return energysystem
+
     print('Energysystem has been created')
 
     print("*********************************************************")
@@ -550,52 +1024,211 @@ def setup_es(excel_nodes=None):
     return energysystem
 
 
-def solve_es(energysystem=None, excel_nodes=None):
-    # Optimise the energy system
-    logging.info('Optimise the energy system')
+def create_model(energysystem=None, excel_nodes=None):
+    """Create the optimisation model with the global emission limit.
 
-    # initialise the operational model
-    om = solph.Model(energysystem)
+    Parameters
+    ----------
+    energysystem : :class:`oemof.solph.EnergySystem`
+    excel_nodes : :obj:`dict`
+        Nodes data
+
+    Returns
+    -------
+    om : :class:`oemof.solph.Model`
+    """
+    # initialise the operational model; typical periods of aggregated nodes
+    # data are weighted with the number of periods they represent,
+    # downsampled steps have a time increment of several hours
+    if 'aggregation' in excel_nodes:
+        agg = excel_nodes['aggregation']
+        timeincrement = agg.get('timeincrement')
+        if timeincrement is not None:
+            timeincrement = list(timeincrement)
+        om = solph.Model(energysystem,
+                         objective_weighting=list(agg['weights']),
+                         timeincrement=timeincrement)
+        if timeincrement is None:
+            # the downsampled steps are chronological, typical periods
+            # carry the storage content over the original periods
+            aggregation.link_storage_periods(
+                om, agg['period_length'], assignment=agg['assignment'])
+    else:
+        om = solph.Model(energysystem)
 
     # Global CONSTRAINTS: CO2 Limit
     add_contraints.emission_limit_dyn(
         om, limit=excel_nodes['general']['emission limit'][0])
 
+    return om
+
+
+def solve_es(energysystem=None, excel_nodes=None, solver='cbc',
+             persistent=False, cmdline_options=None, cache_dir=None):
+    """Optimise the energy system.
+
+    Parameters
+    ----------
+    energysystem : :class:`oemof.solph.EnergySystem`
+    excel_nodes : :obj:`dict`
+        Nodes data
+    solver : str
+        Solver to be used.
+    persistent : bool
+        Use a persistent solver interface (see :class:`ModelSolver`).
+    cmdline_options : dict (optional)
+        Solver options, e.g. {'threads': 4}.
+    cache_dir : str (optional)
+        Directory of the result cache (see :mod:`result_cache`). If the
+        scenario has been solved before, the cached results are returned
+        without building and solving the model.
+
+    Returns
+    -------
+    result : :obj:`dict`
+        Processed results (a :class:`lean_results.ResultsView`, the arrays
+        are available as `result.lean`, also for cached results), also
+        stored with the meta results in `energysystem.results['main']` and
+        `energysystem.results['meta']`. The heat loss of the heat pipes is
+        the column 'heat_loss' of the sequences of (pipe, None), the meta
+        results hold the 'total_emissions'.
+    """
+    # Optimise the energy system
+    logging.info('Optimise the energy system')
+
+    if cache_dir is not None:
+        fingerprint = result_cache.model_fingerprint(
+            excel_nodes, solver=solver, cmdline_options=cmdline_options)
+        cached = result_cache.load_results(cache_dir, fingerprint,
+                                           energysystem=energysystem)
+        if cached is not None:
+            result, meta = cached
+            energysystem.results = {'main': result, 'meta': meta}
+            return result
+
+    om = create_model(energysystem=energysystem, excel_nodes=excel_nodes)
+
     logging.info('Solve the optimization problem')
     # if tee_switch is true solver messages will be displayed
-    om.solve(solver='cbc', solve_kwargs={'tee': True})
+    solver_results = ModelSolver(om, solver=solver, persistent=persistent,
+                                 cmdline_options=cmdline_options,
+                                 solve_kwargs={'tee': True}).solve()
 
     logging.info('Store the energy system with the results.')
 
-    # processing results
-    result = outputlib.processing.results(om)
+    # processing results; the values are copied into arrays, the view has
+    # the shape of the results of outputlib.processing.results
+    result = lean_results.extract_results(om).view()
+    # the heat loss of the pipes is no variable of the model
+    heatpipe.heat_loss_results(om, result)
+    meta = outputlib.processing.meta_results(om)
+    if hasattr(om, 'total_emissions'):
+        meta['total_emissions'] = po.value(om.total_emissions)
+    energysystem.results['main'] = result
+    energysystem.results['meta'] = meta
+
+    if (cache_dir is not None and solver_results.solver.termination_condition
+            == TerminationCondition.optimal):
+        result_cache.store_results(cache_dir, fingerprint, result, meta)
 
     return result
 
 
-def create_comp_lists(es=None):
+def investment_results(om):
+    """Return the optimised investments of a solved model.
+
+    Parameters
+    ----------
+    om : :class:`oemof.solph.Model`
+
+    Returns
+    -------
+    :pandas:`pandas.Series`
+        Invested capacity of flows (indexed by 'source -> target') and of
+        storages (indexed by the storage label).
+    """
+    invest = {}
 
-    l_buses = []
-    l_storages = []
-    l_transformer = []
+    block = getattr(om, 'InvestmentFlow', None)
+    if hasattr(block, 'invest'):
+        for (i, o) in block.invest:
+            invest['{0} -> {1}'.format(i, o)] = block.invest[i, o].value
 
-    for n in es.nodes:
+    block = getattr(om, 'GenericInvestmentStorageBlock', None)
+    if hasattr(block, 'invest'):
+        for n in block.invest:
+            invest[str(n)] = block.invest[n].value
 
-        type_name =\
-            str(type(n)).replace("<class 'oemof.solph.", "").replace("'>", "")
+    return pd.Series(invest)
+
+
+def emission_limit_sweep(energysystem=None, excel_nodes=None, limits=None,
+                         solver='cbc', solve_kwargs=None, persistent=False,
+                         cmdline_options=None):
+    """Solve the energy system for a series of emission limits.
+
+    The model is built once. Only the emission limit is changed before each
+    solve. With `persistent=True` the model also stays loaded in the solver
+    and each solve is warm-started from the previous one.
+
+    Parameters
+    ----------
+    energysystem : :class:`oemof.solph.EnergySystem`
+    excel_nodes : :obj:`dict`
+        Nodes data
+    limits : iterable of numeric
+        Absolute emission limits to solve for.
+    solver : str
+        Solver to be used.
+    solve_kwargs : dict (optional)
+        Arguments passed to the solve method of the solver, e.g.
+        {'tee': True}.
+    persistent : bool
+        Use a persistent solver interface (see :class:`ModelSolver`).
+    cmdline_options : dict (optional)
+        Solver options, e.g. {'threads': 4}.
+
+    Returns
+    -------
+    :pandas:`pandas.DataFrame`
+        One row per emission limit with the objective, the total emissions
+        and the investments (see :func:`investment_results`). Rows of limits
+        without optimal solution are empty.
+    """
+    limits = list(limits)
 
-        if type_name == "network.Bus":
-            l_buses.append(n.label)
+    logging.info('Optimise the energy system for {0} emission limits'
+                 .format(len(limits)))
 
-        if type_name == "network.Transformer":
-            l_transformer.append(n.label)
+    om = create_model(energysystem=energysystem, excel_nodes=excel_nodes)
+    model_solver = ModelSolver(om, solver=solver, persistent=persistent,
+                               cmdline_options=cmdline_options,
+                               solve_kwargs=solve_kwargs)
 
-        if type_name == "components.GenericStorage":
-            l_storages.append(n.label)
+    rows = []
+    for limit in limits:
+        add_contraints.set_emission_limit(om, limit)
+        model_solver.update(om.emission_limit)
 
-    comp_dict = {'buses': l_buses,
-                 'transformer': l_transformer,
-                 'storages': l_storages
-                 }
+        logging.info('Solve the optimization problem for emission limit {0}'
+                     .format(limit))
+        solver_results = model_solver.solve()
 
-    return comp_dict
+        if (solver_results.solver.termination_condition ==
+                TerminationCondition.optimal):
+            row = {'objective': po.value(om.objective),
+                   'total_emissions': po.value(om.total_emissions)}
+            row.update(investment_results(om))
+        else:
+            row = {}
+        rows.append(row)
+
+    sweep = pd.DataFrame(rows, index=pd.Index(limits, name='emission_limit'))
+
+    return sweep
+
+
+def create_comp_lists(es=None):
+    """Return the labels of the buses, transformers and storages of an
+    energy system (see :func:`node_registry.component_lists`)."""
+    return node_registry.component_lists(es)
@@ -0,0 +1,63 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def district_data(timesteps=24, emission_limit=1e6):
+    """Return the nodes data of a small district heated by a gas boiler
+    (emitting, cheap) and a pellet boiler (no emissions, expensive)."""
+
+    index = pd.date_range('1/1/2018', periods=timesteps, freq='H')
+    index.name = 'timestamp'
+    demand = 10 + 5 * np.sin(np.arange(timesteps) * 2 * np.pi / 24)
+
+    def sources(label, to, costs, emissions):
+        return {'label': label, 'active': 1, 'to': to, 'cost_series': 0,
+                'variable costs': costs, 'emission_series': 0,
+                'emissions': emissions}
+
+    def boiler(label, bus, eff):
+        return {'label': label, 'active': 1, 'in_1': bus, 'in_2': 0,
+                'out_1': 'b_heat', 'out_2': 0, 'eff_in_1': 1,
+                'eff_in_2': 0, 'eff_out_1': eff, 'eff_out_2': 0,
+                'invest': 0, 'installed': 100, 'capex': 0, 'n': 20,
+                'service': 0, 'max_invest': 0, 'min_invest': 0,
+                'variable costs': 0, 'in_1_sum_max': 1e6}
+
+    return {
+        'buses': pd.DataFrame({
+            'label': ['b_gas', 'b_pellet', 'b_heat'], 'active': 1,
+            'excess': 0, 'shortage': 0, 'excess costs': 0,
+            'shortage costs': 0}),
+        'commodity_sources': pd.DataFrame([
+            sources('gas', 'b_gas', 0.05, 0.2),
+            sources('pellets', 'b_pellet', 0.08, 0)]),
+        'sources_series': pd.DataFrame(columns=[
+            'label', 'active', 'to', 'invest', 'installed']),
+        'demand': pd.DataFrame({
+            'label': ['heat_demand'], 'active': [1], 'from': ['b_heat'],
+            'scalingfactor': [1], 'fixed': [1]}),
+        'sinks': pd.DataFrame(columns=['label', 'active', 'from']),
+        'transformer': pd.DataFrame([boiler('boiler_gas', 'b_gas', 1),
+                                     boiler('boiler_pellet', 'b_pellet', 1)]),
+        'storages': pd.DataFrame(columns=['label', 'active', 'bus',
+                                          'invest']),
+        'timeseries': pd.DataFrame({'heat_demand.actual_value': demand},
+                                   index=index),
+        'general': pd.DataFrame({'timesteps': [timesteps],
+                                 'interest rate': [0.05],
+                                 'emission limit': [emission_limit]})
+        }
+
+
+@pytest.fixture
+def district():
+    """Builder of the nodes data of a small district, see
+    :func:`district_data`."""
+    return district_data
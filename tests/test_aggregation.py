@@ -0,0 +1,160 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pandas as pd
+import pyomo.environ as pyo
+import oemof.solph as solph
+import aggregation
+import setup_solve_model
+
+
+def nodes_data(days):
+
+    index = pd.date_range('1/1/2018', periods=24 * len(days), freq='H')
+    hours = np.arange(24)
+    profiles = {'sunny': np.clip(np.sin((hours - 6) / 12. * np.pi), 0, 1),
+                'cloudy': np.full(24, 0.1)}
+    pv = np.concatenate([profiles[d] for d in days])
+
+    return {'timeseries': pd.DataFrame({'pv.actual_value': pv,
+                                        'demand.actual_value': 1 - pv},
+                                       index=index),
+            'general': pd.DataFrame({'timesteps': [len(index)]})}
+
+
+def test_repeated_days_are_reproduced_exactly():
+
+    nd = nodes_data(['sunny', 'cloudy', 'sunny', 'sunny', 'cloudy'])
+
+    for method in ['kmeans', 'kmedoids']:
+        agg = aggregation.aggregate_nodes_data(nd, n_periods=2,
+                                               method=method)
+
+        assert agg['general']['timesteps'][0] == 48
+        assert len(agg['timeseries']) == 48
+        assert list(agg['aggregation']['assignment']) == [0, 1, 0, 0, 1]
+        assert np.allclose(agg['aggregation']['weights'][[0, 24]], [3, 2])
+        assert agg['aggregation']['weights'].sum() == 120
+        assert np.allclose(agg['aggregation']['error'], 0)
+        # the original nodes data are not changed
+        assert nd['general']['timesteps'][0] == 120
+
+
+def test_incomplete_period_is_covered_by_weights():
+
+    nd = nodes_data(['sunny', 'cloudy', 'sunny'])
+    nd['timeseries'] = nd['timeseries'].iloc[:60]
+    nd['general']['timesteps'] = 60
+
+    agg = aggregation.aggregate_nodes_data(nd, n_periods=2)
+
+    assert np.isclose(agg['aggregation']['weights'].sum(), 60)
+
+
+def test_downsampled_steps_keep_the_sums():
+
+    nd = nodes_data(['sunny', 'cloudy'])
+    nd['timeseries'] = nd['timeseries'].iloc[:46]
+    nd['general']['timesteps'] = 46
+
+    down = aggregation.downsample_nodes_data(nd, 4)
+
+    assert down['general']['timesteps'][0] == 12
+    assert list(down['aggregation']['timeincrement']) == [4] * 11 + [2]
+    assert np.allclose(
+        (down['timeseries'].values *
+         down['aggregation']['weights'][:, None]).sum(axis=0),
+        nd['timeseries'].sum().values)
+    assert down['aggregation']['period_length'] == 12
+
+
+def storage_model(pv, weights=None, period_length=None, assignment=None,
+                  invest=False):
+    """Model of a house with pv, a storage and the grid as backup."""
+
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2018', periods=len(pv), freq='H'))
+    b_el = solph.Bus(label='b_el')
+    es.add(b_el)
+    es.add(solph.Source(label='pv', outputs={b_el: solph.Flow(
+        actual_value=pv, fixed=True, nominal_value=1)}))
+    es.add(solph.Source(label='grid', outputs={b_el: solph.Flow(
+        variable_costs=1)}))
+    es.add(solph.Sink(label='excess', inputs={b_el: solph.Flow()}))
+    es.add(solph.Sink(label='demand', inputs={b_el: solph.Flow(
+        actual_value=[2] * len(pv), fixed=True, nominal_value=1)}))
+    if invest:
+        capacity = {'investment': solph.Investment(ep_costs=0.01)}
+    else:
+        capacity = {'nominal_storage_capacity': 50}
+    es.add(solph.components.GenericStorage(
+        label='storage', inputs={b_el: solph.Flow()},
+        outputs={b_el: solph.Flow()}, **capacity))
+
+    om = solph.Model(es, objective_weighting=weights or [1] * len(pv))
+    if period_length is not None:
+        aggregation.link_storage_periods(om, period_length,
+                                         assignment=assignment)
+    om.solve(solver='cbc')
+    return om
+
+
+def test_storage_content_is_carried_over_periods():
+
+    # the surplus of sunny days covers the following cloudy day
+    days = {'sunny': [4] * 24, 'cloudy': [0] * 24}
+    order = ['sunny', 'cloudy', 'sunny', 'cloudy']
+    full = storage_model(np.concatenate([days[d] for d in order]))
+    assert np.isclose(pyo.value(full.objective), 0)
+
+    typical = np.concatenate([days['sunny'], days['cloudy']])
+    weights = [2] * 48
+    linked = storage_model(typical, weights, 24, assignment=[0, 1, 0, 1])
+    assert np.isclose(pyo.value(linked.objective), 0)
+
+    block = linked.GenericStorageBlock
+    storage = list(block.STORAGES)[0]
+    content = [block.inter_content[storage, p].value for p in range(5)]
+    assert np.allclose(np.diff(content), [48, -48, 48, -48])
+
+    # cyclic typical periods cannot shift energy between days
+    cyclic = storage_model(typical, weights, 24)
+    assert np.isclose(pyo.value(cyclic.objective), 2 * 48)
+
+
+def test_invested_storage_covers_period_changes():
+
+    days = {'sunny': [4] * 24, 'cloudy': [0] * 24}
+    typical = np.concatenate([days['sunny'], days['cloudy']])
+
+    om = storage_model(typical, [2] * 48, 24, assignment=[0, 1, 0, 1],
+                       invest=True)
+
+    block = om.GenericInvestmentStorageBlock
+    storage = list(block.INVESTSTORAGES)[0]
+    assert np.isclose(block.invest[storage].value, 48)
+    assert np.isclose(pyo.value(om.objective), 0.48)
+
+
+def test_summed_limits_are_scaled_to_typical_periods(district):
+
+    # three equal days, the gas boiler (100 installed) may cover 300 of the
+    # demand of 720
+    nd = district(timesteps=72)
+    nd['transformer'].loc[0, 'in_1_sum_max'] = 3
+
+    nd_agg = aggregation.aggregate_nodes_data(nd, n_periods=1)
+    assert nd_agg['transformer']['in_1_sum_max'][0] == 1
+    assert nd['transformer']['in_1_sum_max'][0] == 3
+
+    es = setup_solve_model.setup_es(excel_nodes=nd_agg)
+    results = setup_solve_model.solve_es(energysystem=es,
+                                         excel_nodes=nd_agg)
+    gas = results[es.groups['boiler_gas'], es.groups['b_heat']][
+        'sequences']['flow']
+    weights = nd_agg['aggregation']['weights']
+    assert np.isclose((gas * weights).sum(), 300)
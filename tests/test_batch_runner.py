@@ -0,0 +1,70 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import os
+import pandas as pd
+import pytest
+import batch_runner
+import input_backends
+
+
+def test_overrides_change_single_values():
+
+    nd = {'general': pd.DataFrame({'emission limit': [1000]}),
+          'transformer': pd.DataFrame({'label': ['chp', 'boiler'],
+                                       'capex': [100, 200]})}
+
+    batch_runner.apply_overrides(
+        nd, {('general', None, 'emission limit'): 500.5,
+             ('transformer', 'boiler', 'capex'): 250})
+
+    assert nd['general']['emission limit'][0] == 500.5
+    assert list(nd['transformer']['capex']) == [100, 250]
+
+
+def test_failing_scenario_does_not_stop_batch(tmpdir):
+
+    summary = batch_runner.run_batch(
+        ['missing.unknown', {'name': 'other', 'source': 'missing.xyz'}],
+        str(tmpdir), workers=2)
+
+    assert list(summary.index) == ['missing', 'other']
+    assert list(summary['status']) == ['failed', 'failed']
+    assert 'ValueError' in summary['error']['missing']
+    assert tmpdir.join('batch_summary.csv').check()
+
+
+def test_scenario_is_solved_and_exported(district, tmpdir):
+
+    source = os.path.join(str(tmpdir), 'district')
+    input_backends.save_nodes(district(timesteps=4), source, 'csv')
+
+    summary = batch_runner.run_batch(
+        [{'name': 'low_co2', 'source': source,
+          'overrides': {('general', None, 'emission limit'): 5}}],
+        str(tmpdir.join('results')), workers=1, fmt='csv')
+
+    result = summary.loc['low_co2']
+    assert result['status'] == 'ok'
+    assert result['termination'] == 'optimal'
+    assert result['total_emissions'] == pytest.approx(5)
+    assert os.listdir(result['results_path'])
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='needs named pipes')
+def test_hanging_scenario_is_stopped(district, tmpdir):
+
+    source = os.path.join(str(tmpdir), 'district')
+    input_backends.save_nodes(district(timesteps=4), source, 'csv')
+    # reading a named pipe without writer blocks the worker
+    os.remove(os.path.join(source, 'Buses.csv'))
+    os.mkfifo(os.path.join(source, 'Buses.csv'))
+
+    summary = batch_runner.run_batch([source], str(tmpdir.join('results')),
+                                     timeout=1)
+
+    assert summary['status']['district'] == 'timeout'
+    assert summary['runtime']['district'] < 10
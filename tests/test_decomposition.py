@@ -0,0 +1,100 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pandas as pd
+import oemof.solph as solph
+import decomposition
+import setup_solve_model
+
+
+def test_islands_are_separate_components():
+
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2018', periods=2, freq='H'))
+    b_el = solph.Bus(label='b_el')
+    b_heat = solph.Bus(label='b_heat')
+    es.add(b_el, b_heat)
+    es.add(solph.Source(label='grid', outputs={
+        b_el: solph.Flow(emission_factor=[0.4, 0.4])}))
+    es.add(solph.Sink(label='el_demand', inputs={b_el: solph.Flow()}))
+    es.add(solph.Source(label='solarthermal', outputs={
+        b_heat: solph.Flow(emission_factor=[0, 0])}))
+    es.add(solph.Sink(label='heat_demand', inputs={b_heat: solph.Flow()}))
+
+    parts = decomposition.components(es)
+    assert sorted(map(sorted, parts)) == [
+        ['b_el', 'el_demand', 'grid'],
+        ['b_heat', 'heat_demand', 'solarthermal']]
+
+    emitting = decomposition.emission_components(es, parts)
+    assert [parts[k] for k in emitting] == [{'b_el', 'el_demand', 'grid'}]
+
+    nd = {'buses': pd.DataFrame({'label': ['b_el', 'b_heat']}),
+          'demand': pd.DataFrame({'label': ['el_demand', 'heat_demand']}),
+          'timeseries': pd.DataFrame({'el_demand.actual_value': [1, 2],
+                                      'heat_demand.actual_value': [3, 4]}),
+          'general': pd.DataFrame({'timesteps': [2]})}
+    sub = decomposition.subset_nodes_data(nd, parts[emitting[0]])
+    assert list(sub['buses']['label']) == ['b_el']
+    assert list(sub['demand']['label']) == ['el_demand']
+    assert list(sub['timeseries'].columns) == ['el_demand.actual_value']
+    assert sub['general'] is nd['general']
+
+
+def two_islands(district):
+    """Nodes data of the district and a second district heated with
+    pellets only."""
+
+    nd = district(timesteps=24)
+
+    def add_copy(key, original, **changes):
+        row = nd[key][nd[key]['label'] == original].iloc[0].to_dict()
+        row.update(changes)
+        nd[key] = pd.concat([nd[key], pd.DataFrame([row])],
+                            ignore_index=True)
+
+    add_copy('buses', 'b_pellet', label='b_pellet_2')
+    add_copy('buses', 'b_heat', label='b_heat_2')
+    add_copy('commodity_sources', 'pellets', label='pellets_2',
+             to='b_pellet_2')
+    add_copy('transformer', 'boiler_pellet', label='boiler_pellet_2',
+             in_1='b_pellet_2', out_1='b_heat_2')
+    add_copy('demand', 'heat_demand', label='heat_demand_2',
+             **{'from': 'b_heat_2'})
+    nd['timeseries']['heat_demand_2.actual_value'] = (
+        2 * nd['timeseries']['heat_demand.actual_value'])
+    return nd
+
+
+def test_islands_are_solved_like_one_model(district):
+
+    nd = two_islands(district)
+
+    es = setup_solve_model.setup_es(excel_nodes=nd)
+    expected = setup_solve_model.solve_es(energysystem=es, excel_nodes=nd)
+    objective = es.results['meta']['objective']
+
+    es = setup_solve_model.setup_es(excel_nodes=nd)
+    assert len(decomposition.components(es)) == 2
+    result = decomposition.solve_components(energysystem=es, excel_nodes=nd,
+                                            workers=2)
+
+    assert np.isclose(es.results['meta']['objective'], objective)
+    assert len(es.results['meta']['components']) == 2
+
+    def labels(key):
+        return tuple(None if n is None else str(n) for n in key)
+
+    expected = {labels(k): v for k, v in expected.items()}
+    assert sorted(map(labels, result)) == sorted(expected)
+    for key, value in result.items():
+        pd.testing.assert_frame_equal(
+            value['sequences'], expected[labels(key)]['sequences'],
+            check_dtype=False, check_column_type=False, check_names=False,
+            check_freq=False)
+    # the keys are the nodes of the energy system
+    assert all(n in es.nodes for key in result for n in key if n is not None)
@@ -54,3 +54,38 @@ def test_dyn_emission_example():
     om.solve(solver='cbc', solve_kwargs={'tee': False})
 
 test_dyn_emission_example()
+
+
+def test_dyn_emission_skips_zero_factors():
+
+    date_time_index = pd.date_range('1/1/2012', periods=3, freq='H')
+
+    es = solph.EnergySystem(timeindex=date_time_index)
+
+    bel = solph.Bus(label='label_bel')
+
+    es.add(bel)
+
+    es.add(solph.Source(label='elec_net_fossil',
+                        outputs={bel: solph.Flow(
+                            variable_costs=10,
+                            emission_factor=[0.7, 0, 1.3])}))
+
+    es.add(solph.Source(label='elec_net_green',
+                        outputs={bel: solph.Flow(
+                            variable_costs=30,
+                            emission_factor=np.zeros(3))}))
+
+    es.add(solph.Sink(label='demand_el',
+                      inputs={bel: solph.Flow(
+                          actual_value=[5, 6, 7],
+                          fixed=True, nominal_value=1)}))
+
+    om = solph.Model(energysystem=es)
+
+    add_contraints.emission_limit_dyn(om, limit=15)
+
+    expr = om.total_emissions.expr
+
+    assert list(expr.linear_coefs) == [0.7, 1.3]
+    assert [v.index()[2] for v in expr.linear_vars] == [0, 2]
@@ -0,0 +1,43 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pytest
+import setup_solve_model
+
+
+@pytest.mark.parametrize('persistent', [False, True])
+def test_sweep_builds_the_model_once(district, monkeypatch, persistent):
+
+    nd = district(timesteps=24)
+    es = setup_solve_model.setup_es(excel_nodes=nd)
+
+    built = []
+    create_model = setup_solve_model.create_model
+
+    def counting_create_model(**kwargs):
+        built.append(kwargs)
+        return create_model(**kwargs)
+
+    monkeypatch.setattr(setup_solve_model, 'create_model',
+                        counting_create_model)
+
+    # all heat from gas emits 0.2 * 240, a negative limit is infeasible
+    limits = [1e6, 40, 20, -1]
+    sweep = setup_solve_model.emission_limit_sweep(
+        energysystem=es, excel_nodes=nd, limits=limits,
+        persistent=persistent)
+
+    assert len(built) == 1
+    assert list(sweep.index) == limits
+
+    assert np.isclose(sweep['total_emissions'][1e6], 0.2 * 240)
+    assert np.isclose(sweep['total_emissions'][40], 40)
+    assert np.isclose(sweep['total_emissions'][20], 20)
+    assert np.all(np.diff(sweep['total_emissions'].iloc[:3]) < 0)
+    assert np.all(np.diff(sweep['objective'].iloc[:3]) > 0)
+
+    assert sweep.loc[-1].isnull().all()
@@ -0,0 +1,200 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import oemof.solph as solph
+from oemof.outputlib import processing
+from customized import heatpipe
+import lean_results
+import setup_solve_model
+
+
+class Pipe:
+    """Stand-in with the attributes of a HeatPipeline used by the blocks."""
+
+    def __init__(self, heat_loss_factor, eta_out):
+        self.inputs = {'b_in': None}
+        self.outputs = {'b_out': None}
+        self.conversion_factors = {'b_in': 1, 'b_out': eta_out}
+        self.heat_loss_factor = heat_loss_factor
+        self.length = 200
+
+
+def test_constant_coefficients_are_shared():
+
+    constant = Pipe(0.001, 0.5)
+    varying = Pipe(0.001, [0.5, 0.6, 0.7])
+
+    pipes = heatpipe.pipe_parameters([constant, varying], [0, 1, 2])
+
+    i, o, ratio, loss = pipes[constant]
+    assert (i, o) == ('b_in', 'b_out')
+    assert list(ratio) == [0.5] * 3
+    assert np.allclose(loss, 0.2)
+    # a single value, broadcast to all timesteps
+    assert ratio.strides == (0,) and loss.strides == (0,)
+
+    ratio = pipes[varying][2]
+    assert list(ratio) == [0.5, 0.6, 0.7]
+
+
+def solve_pipe(outflow):
+
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2018', periods=3, freq='H'))
+    b_plant = solph.Bus(label='b_plant')
+    b_house = solph.Bus(label='b_house')
+    es.add(b_plant, b_house)
+    es.add(solph.Source(label='heat', outputs={
+        b_plant: solph.Flow(variable_costs=0.1)}))
+    es.add(solph.Sink(label='house', inputs={b_house: solph.Flow(
+        actual_value=[80, 60, 20], fixed=True, nominal_value=1)}))
+    pipe = heatpipe.HeatPipeline(
+        label='pipe', inputs={b_plant: solph.Flow()},
+        outputs={b_house: outflow}, conversion_factors={b_house: 0.9},
+        length=100, heat_loss_factor=[1e-4, 2e-4, 1e-4])
+    es.add(pipe)
+
+    om = solph.Model(es)
+    om.solve(solver='cbc')
+
+    results = processing.results(om)
+    inflow = results[b_plant, pipe]['sequences']['flow'].values
+    outflow = results[pipe, b_house]['sequences']['flow'].values
+    return om, pipe, inflow, outflow
+
+
+def test_fixed_pipe_loses_heat():
+
+    om, pipe, inflow, outflow = solve_pipe(solph.Flow(nominal_value=100))
+
+    loss = heatpipe.heat_loss_results(om)['pipe'].values
+    assert np.allclose(loss, np.array([1e-4, 2e-4, 1e-4]) * 100 * 100)
+    assert np.allclose(outflow, [80, 60, 20])
+    assert np.allclose(inflow, (outflow + loss) / 0.9)
+
+
+def test_invest_pipe_loses_heat_of_invested_capacity():
+
+    om, pipe, inflow, outflow = solve_pipe(solph.Flow(
+        investment=solph.Investment(ep_costs=1)))
+
+    capacity = processing.results(om)[pipe, list(pipe.outputs)[0]][
+        'scalars']['invest']
+    assert np.isclose(capacity, 80)
+
+    loss = heatpipe.heat_loss_results(om)['pipe'].values
+    assert np.allclose(loss, np.array([1e-4, 2e-4, 1e-4]) * 100 * capacity)
+    assert np.allclose(inflow, (outflow + loss) / 0.9)
+
+
+def test_catalog_size_is_chosen():
+
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2018', periods=3, freq='H'))
+    b_plant = solph.Bus(label='b_plant')
+    b_house = solph.Bus(label='b_house')
+    es.add(b_plant, b_house)
+    es.add(solph.Source(label='heat', outputs={
+        b_plant: solph.Flow(variable_costs=0.1)}))
+    es.add(solph.Sink(label='house', inputs={b_house: solph.Flow(
+        actual_value=[80, 60, 20], fixed=True, nominal_value=1)}))
+
+    catalog = pd.DataFrame({'capacity': [50, 100, 200],
+                            'costs': [1, 1.5, 2.5],
+                            'loss': [0.01, 0.015, 0.02]})
+    pipe = heatpipe.HeatPipeline(
+        label='pipe', inputs={b_plant: solph.Flow()},
+        outputs={b_house: solph.Flow()}, length=100, catalog=catalog)
+    es.add(pipe)
+
+    om = solph.Model(es)
+    om.solve(solver='cbc')
+
+    # the pipe has scalars only, the heat loss is added as sequence
+    results = lean_results.extract_results(om).view()
+    heatpipe.heat_loss_results(om, results)
+    results = results[pipe, None]
+    assert results['scalars']['invest'] == 100
+    assert results['scalars']['size_1'] == 1
+    assert np.allclose(results['sequences']['heat_loss'], 1.5)
+    assert np.allclose(
+        om.HeatPipelineCatalogBlock.heat_loss_values(pipe), 1.5)
+
+    # the costs are built with the block and can be queried again
+    block = om.HeatPipelineCatalogBlock
+    assert block._objective_expression() is block.investment_costs
+    assert np.isclose(block.investment_costs(), 1.5 * 100)
+
+
+def heatpipes_data(district):
+
+    nd = district(timesteps=3)
+    nd['buses'] = pd.concat([nd['buses'], pd.DataFrame({
+        'label': ['b_house'], 'active': [1], 'excess': [0], 'shortage': [0],
+        'excess costs': [0], 'shortage costs': [0]})], ignore_index=True)
+
+    def pipe(label, invest, catalog=0):
+        return {'label': label, 'active': 1, 'in_1': 'b_heat',
+                'out_1': 'b_house', 'efficiency': 0.9,
+                'heat_loss_factor': 0.001, 'length': 50, 'invest': invest,
+                'installed': 80, 'capex': 1000, 'n': 40, 'service': 0,
+                'max_invest': 200, 'min_invest': 0, 'catalog': catalog}
+
+    nd['heatpipes'] = pd.DataFrame([
+        pipe('pipe_fix', 0), pipe('pipe_inv', 1), pipe('pipe_off', 0)])
+    nd['heatpipes'].loc[2, 'active'] = 0
+    nd['timeseries']['pipe_fix.heat_loss_factor'] = [0.001, 0.002, 0.003]
+    return nd
+
+
+def test_heatpipes_are_created(district):
+
+    nd = heatpipes_data(district)
+    nodes = {str(n): n for n in setup_solve_model.create_nodes(nd=nd)}
+
+    assert 'pipe_off' not in nodes
+    fix, inv = nodes['pipe_fix'], nodes['pipe_inv']
+    assert isinstance(fix, heatpipe.HeatPipeline)
+    assert isinstance(inv, heatpipe.HeatPipeline)
+
+    b_house = nodes['b_house']
+    assert fix.outputs[b_house].nominal_value == 80
+    assert fix.outputs[b_house].investment is None
+    assert inv.outputs[b_house].investment.maximum == 200
+    assert fix.conversion_factors[b_house][0] == 0.9
+    assert fix.length == 50
+
+    # the series in the timeseries replaces the scalar loss factor
+    assert [fix.heat_loss_factor[t] for t in range(3)] == [
+        0.001, 0.002, 0.003]
+    assert inv.heat_loss_factor[2] == 0.001
+
+
+def test_catalog_pipe_needs_catalog_sheet(district):
+
+    nd = heatpipes_data(district)
+    nd['heatpipes'].loc[1, 'catalog'] = 1
+
+    with pytest.raises(ValueError, match='pipe_inv'):
+        setup_solve_model.create_nodes(nd=nd)
+
+
+def test_heat_loss_is_part_of_the_results(district):
+
+    nd = heatpipes_data(district)
+    es = setup_solve_model.setup_es(excel_nodes=nd)
+    results = setup_solve_model.solve_es(energysystem=es, excel_nodes=nd)
+
+    fix = es.groups['pipe_fix']
+    inv = es.groups['pipe_inv']
+    # loss factor series times length times installed capacity
+    assert np.allclose(results[fix, None]['sequences']['heat_loss'],
+                       [4, 8, 12])
+    assert np.allclose(results[inv, None]['sequences']['heat_loss'], 0)
+    assert es.results['main'] is results
@@ -0,0 +1,151 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import input_backends
+
+
+def nodes_data():
+
+    index = pd.date_range('1/1/2018', periods=4, freq='H')
+    index.name = 'timestamp'
+
+    return {
+        'buses': pd.DataFrame({'label': ['b_el'], 'active': [1],
+                               'excess': [0], 'shortage': [0],
+                               'excess costs': [0], 'shortage costs': [0]}),
+        'commodity_sources': pd.DataFrame({'label': ['gas', 'oil'],
+                                           'active': [1, 0]}),
+        'sources_series': pd.DataFrame({'label': ['pv'], 'active': [1]}),
+        'demand': pd.DataFrame({'label': ['demand_el'], 'active': [1]}),
+        'sinks': pd.DataFrame({'label': [], 'active': []}),
+        'transformer': pd.DataFrame({'label': ['chp', 'boiler'],
+                                     'active': [1, 1],
+                                     'eff_out_1': ['series', 0.9]}),
+        'storages': pd.DataFrame({'label': ['st'], 'active': [1],
+                                  'capacity': [10.0]}),
+        'timeseries': pd.DataFrame(
+            {'gas.emission_factor': np.arange(4.),
+             'oil.emission_factor': np.arange(4.),
+             'pv.actual_value': np.linspace(0, 1, 4),
+             'chp.eff_out_1': np.full(4, 0.9)},
+            index=index),
+        'general': pd.DataFrame({'timesteps': [4], 'interest rate': [0.05],
+                                 'emission limit': [100]})
+        }
+
+
+@pytest.mark.parametrize('backend,target', [('csv', 'scenario'),
+                                            ('sqlite', 'scenario.sqlite')])
+def test_roundtrip_reads_only_active_columns(tmpdir, backend, target):
+
+    nd = nodes_data()
+    path = os.path.join(str(tmpdir), target)
+    input_backends.save_nodes(nd, path, backend)
+
+    assert input_backends.guess_backend(path) == backend
+
+    loaded = input_backends.load_nodes(path)
+
+    assert sorted(loaded) == sorted(nd)
+    assert sorted(loaded['timeseries'].columns) == [
+        'chp.eff_out_1', 'gas.emission_factor', 'pv.actual_value']
+    assert (loaded['timeseries'].index == nd['timeseries'].index).all()
+    assert loaded['timeseries']['pv.actual_value'].iloc[-1] == 1
+    assert loaded['transformer']['eff_out_1'][0] == 'series'
+    assert loaded['general']['timesteps'][0] == 4
+
+
+def test_unknown_backend():
+
+    with pytest.raises(ValueError):
+        input_backends.load_nodes('scenario.unknown')
+
+
+@pytest.mark.parametrize('backend,target', [('csv', 'scenario'),
+                                            ('sqlite', 'scenario.sqlite')])
+def test_optional_heatpipes_sheet(tmpdir, backend, target):
+
+    nd = nodes_data()
+    nd['heatpipes'] = pd.DataFrame({'label': ['pipe_1'], 'active': [1],
+                                    'in_1': ['b_heat'], 'out_1': ['b_house'],
+                                    'length': [120.0]})
+    path = os.path.join(str(tmpdir), target)
+    input_backends.save_nodes(nd, path, backend)
+
+    loaded = input_backends.load_nodes(path)
+
+    assert list(loaded['heatpipes']['label']) == ['pipe_1']
+    assert loaded['heatpipes']['length'][0] == 120
+
+
+@pytest.mark.parametrize('backend,target', [('csv', 'scenario'),
+                                            ('sqlite', 'scenario.sqlite')])
+def test_time_window_is_read_and_scaled(tmpdir, backend, target):
+
+    path = os.path.join(str(tmpdir), target)
+    input_backends.save_nodes(nodes_data(), path, backend)
+
+    loaded = input_backends.load_nodes(path, start='2018-01-01 01:00',
+                                       end=3)
+
+    assert loaded['general']['timesteps'][0] == 2
+    assert loaded['general']['emission limit'][0] == 50
+    assert list(loaded['timeseries']['gas.emission_factor']) == [1, 2]
+    assert loaded['timeseries'].index[0] == pd.Timestamp('2018-01-01 01:00')
+
+
+
+def roundtrip(tmpdir, backend, target):
+
+    path = os.path.join(str(tmpdir), target)
+    input_backends.save_nodes(nodes_data(), path, backend)
+    return input_backends.load_nodes(path, backend=backend)
+
+
+def assert_same_nodes_data(loaded, expected):
+
+    assert sorted(loaded) == sorted(expected)
+    for key, table in expected.items():
+        if key == 'timeseries':
+            pd.testing.assert_frame_equal(loaded[key], table,
+                                          check_freq=False)
+        else:
+            # empty sheets have no values to derive the types from
+            pd.testing.assert_frame_equal(loaded[key], table,
+                                          check_dtype=len(table) > 0)
+
+
+def test_backends_read_same_types(tmpdir):
+
+    csv = roundtrip(tmpdir, 'csv', 'scenario')
+    sqlite = roundtrip(tmpdir, 'sqlite', 'scenario.sqlite')
+
+    # mixed columns keep their numbers
+    assert list(csv['transformer']['eff_out_1']) == ['series', 0.9]
+    assert csv['general']['timesteps'].dtype.kind == 'i'
+    assert_same_nodes_data(sqlite, csv)
+
+
+def test_parquet_reads_same_types(tmpdir):
+
+    pytest.importorskip('pyarrow')
+
+    assert_same_nodes_data(
+        roundtrip(tmpdir, 'parquet', 'scenario_parquet'),
+        roundtrip(tmpdir, 'csv', 'scenario'))
+
+
+def test_hdf5_reads_same_types(tmpdir):
+
+    pytest.importorskip('tables')
+
+    assert_same_nodes_data(
+        roundtrip(tmpdir, 'hdf5', 'scenario.h5'),
+        roundtrip(tmpdir, 'csv', 'scenario'))
@@ -0,0 +1,84 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pandas as pd
+import oemof.solph as solph
+from oemof.outputlib import processing
+from customized import heatpipe
+import lean_results
+
+
+def test_view_matches_processed_results():
+
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2018', periods=3, freq='H'))
+    b_heat = solph.Bus(label='b_heat')
+    es.add(b_heat)
+    es.add(solph.Source(label='boiler', outputs={b_heat: solph.Flow(
+        variable_costs=[1, 3, 1], investment=solph.Investment(
+            ep_costs=0.1))}))
+    es.add(solph.components.GenericStorage(
+        label='storage', inputs={b_heat: solph.Flow()},
+        outputs={b_heat: solph.Flow()}, nominal_storage_capacity=10))
+    es.add(solph.Sink(label='house', inputs={b_heat: solph.Flow(
+        actual_value=[4, 6, 2], fixed=True, nominal_value=1)}))
+
+    om = solph.Model(es)
+    om.solve(solver='cbc')
+
+    expected = processing.results(om)
+    lean = lean_results.extract_results(om)
+    view = lean.view()
+
+    assert set(view) == set(expected)
+    for key in expected:
+        for name in ['sequences', 'scalars']:
+            pd.testing.assert_frame_equal(
+                pd.DataFrame(view[key][name]),
+                pd.DataFrame(expected[key][name]), check_dtype=False,
+                check_names=False, check_freq=False)
+
+    assert lean.flow_values.shape == (3, len(es.flows()))
+    assert np.allclose(lean.flow('b_heat', 'house'), [4, 6, 2])
+
+
+def test_view_entries_can_be_changed():
+
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2018', periods=3, freq='H'))
+    b_plant = solph.Bus(label='b_plant')
+    b_house = solph.Bus(label='b_house')
+    es.add(b_plant, b_house)
+    es.add(solph.Source(label='heat', outputs={
+        b_plant: solph.Flow(variable_costs=0.1)}))
+    es.add(solph.Sink(label='house', inputs={b_house: solph.Flow(
+        actual_value=[80, 60, 20], fixed=True, nominal_value=1)}))
+    pipe = heatpipe.HeatPipeline(
+        label='pipe', inputs={b_plant: solph.Flow()},
+        outputs={b_house: solph.Flow(nominal_value=100)}, length=100,
+        heat_loss_factor=1e-4)
+    es.add(pipe)
+
+    om = solph.Model(es)
+    om.solve(solver='cbc')
+
+    view = lean_results.extract_results(om).view()
+    assert (pipe, None) not in view
+
+    heatpipe.heat_loss_results(om, view)
+    assert list(view[pipe, None]['sequences']['heat_loss']) == [1, 1, 1]
+
+    # built entries are kept
+    flow = view[b_plant, pipe]['sequences']
+    flow['flow'] = 0
+    assert view[b_plant, pipe]['sequences'] is flow
+
+    # the arrays are stored with label keys
+    relabeled = view.map_nodes(str)
+    assert ('pipe', None) in relabeled
+    assert list(relabeled['b_plant', 'pipe']['sequences']['flow']) == [0] * 3
+    assert np.allclose(relabeled.lean.flow('b_plant', 'pipe'), [81, 61, 21])
@@ -0,0 +1,67 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import oemof.solph as solph
+import pandas as pd
+import pyomo.environ as po
+from pyomo.opt import TerminationCondition
+from customized import add_contraints
+from model_solver import ModelSolver
+
+
+def model(limit):
+
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2018', periods=3, freq='H'))
+    bel = solph.Bus(label='bel')
+    es.add(bel)
+    es.add(solph.Source(label='fossil', outputs={bel: solph.Flow(
+        variable_costs=10, emission_factor=1)}))
+    es.add(solph.Source(label='green', outputs={bel: solph.Flow(
+        variable_costs=30, emission_factor=0)}))
+    es.add(solph.Sink(label='demand', inputs={bel: solph.Flow(
+        actual_value=[5, 5, 5], fixed=True, nominal_value=1)}))
+
+    om = solph.Model(es)
+    add_contraints.emission_limit_dyn(om, limit=limit)
+    return om
+
+
+def test_persistent_solves():
+
+    om = model(limit=15)
+    model_solver = ModelSolver(om, solver='cbc', persistent=True)
+    assert model_solver.persistent
+
+    results = model_solver.solve()
+    assert (results.solver.termination_condition ==
+            TerminationCondition.optimal)
+    assert po.value(om.objective) == 150
+    # the suffixes of oemof are kept
+    assert om.dual is None and om.rc is None
+
+    add_contraints.set_emission_limit(om, 6)
+    model_solver.update(om.emission_limit)
+    results = model_solver.solve()
+    assert po.value(om.objective) == 6 * 10 + 9 * 30
+    assert po.value(om.total_emissions) == 6
+
+
+def test_infeasible_limit_returns_results():
+
+    om = model(limit=15)
+    model_solver = ModelSolver(om, solver='cbc', persistent=True)
+    model_solver.solve()
+
+    # without the green source the demand can only be met with emissions
+    # above the limit
+    for t in om.TIMESTEPS:
+        om.flow[om.es.groups['green'], om.es.groups['bel'], t].setub(0)
+    add_contraints.set_emission_limit(om, 3)
+    results = model_solver.solve()
+
+    assert (results.solver.termination_condition !=
+            TerminationCondition.optimal)
@@ -0,0 +1,92 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pandas as pd
+import network_reduction
+
+
+def pipe(label, bus_in, bus_out, length):
+
+    return {'label': label, 'active': 1, 'invest': 1, 'in_1': bus_in,
+            'out_1': bus_out, 'length': length, 'efficiency': 0.99,
+            'heat_loss_factor': 0.001, 'capex': length * 10., 'service': 0,
+            'n': 40, 'max_invest': 500, 'min_invest': 0}
+
+
+def nodes_data():
+
+    buses = ['b_plant', 'b_1', 'b_2', 'b_house', 'b_dead']
+
+    return {
+        'buses': pd.DataFrame({'label': buses, 'active': 1, 'excess': 0,
+                               'shortage': 0}),
+        'commodity_sources': pd.DataFrame({'label': ['heat'], 'active': [1],
+                                           'to': ['b_plant']}),
+        'demand': pd.DataFrame({'label': ['house'], 'active': [1],
+                                'from': ['b_house']}),
+        'heatpipes': pd.DataFrame([
+            pipe('p_1', 'b_plant', 'b_1', 100),
+            pipe('p_2', 'b_1', 'b_2', 50),
+            pipe('p_3', 'b_2', 'b_house', 30),
+            pipe('p_dead', 'b_1', 'b_dead', 80)])}
+
+
+def test_chain_is_merged_and_dead_end_pruned():
+
+    nd_red, reduction = network_reduction.reduce_heat_network(nodes_data())
+
+    pipes = nd_red['heatpipes']
+    assert list(pipes['label']) == ['p_1__p_3']
+    p = pipes.iloc[0]
+    assert (p['in_1'], p['out_1']) == ('b_plant', 'b_house')
+    assert p['length'] == 180
+    assert p['capex'] == 1800
+    assert np.isclose(p['efficiency'], 0.99 ** 3)
+    assert reduction['pruned'] == ['p_dead']
+    assert sorted(nd_red['buses']['label']) == ['b_house', 'b_plant']
+
+    # the merged pipe has the loss of the series of segments
+    capacity, inflow = 100., 80.
+    out = inflow
+    for length in [100, 50, 30]:
+        out = out * 0.99 - 0.001 * length * capacity
+    merged_out = (inflow * p['efficiency'] -
+                  p['heat_loss_factor'] * p['length'] * capacity)
+    assert np.isclose(out, merged_out)
+
+    flows = network_reduction.segment_flows(
+        pd.DataFrame({'p_1__p_3': [merged_out]}), reduction,
+        capacities={'p_1__p_3': capacity})
+    assert np.isclose(flows['p_3'][0], merged_out)
+    assert np.isclose(flows['p_1'][0], inflow * 0.99 - 0.1 * capacity)
+    assert flows['p_dead'][0] == 0
+
+
+def test_catalog_pipes_are_merged_and_pruned():
+
+    nd = nodes_data()
+    nd['heatpipes']['invest'] = 0
+    nd['heatpipes']['catalog'] = 1
+    # catalog pipes have no installed capacity
+    nd['heatpipes']['installed'] = np.nan
+
+    nd_red, reduction = network_reduction.reduce_heat_network(nd)
+
+    pipes = nd_red['heatpipes']
+    assert list(pipes['label']) == ['p_1__p_3']
+    p = pipes.iloc[0]
+    assert p['length'] == 180
+    assert np.isclose(p['efficiency'], 0.99 ** 3)
+    assert reduction['pruned'] == ['p_dead']
+
+    catalog = pd.DataFrame({'capacity': [50, 100], 'loss': [0.01, 0.02]})
+    flows = network_reduction.segment_flows(
+        pd.DataFrame({'p_1__p_3': [80.]}), reduction,
+        capacities={'p_1__p_3': 100}, catalog=catalog)
+    assert np.isclose(flows['p_3'][0], 80)
+    assert np.isclose(flows['p_2'][0], (80 + 0.02 * 30) / 0.99)
+    assert np.isclose(flows['p_1'][0], (flows['p_2'][0] + 0.02 * 50) / 0.99)
@@ -0,0 +1,55 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import pandas as pd
+import oemof.solph as solph
+from customized import heatpipe
+import node_registry
+
+
+def test_nodes_are_indexed_by_class():
+
+    es = node_registry.energy_system(
+        timeindex=pd.date_range('1/1/2018', periods=3, freq='H'))
+    b_gas = solph.Bus(label='b_gas')
+    b_heat = solph.Bus(label='b_heat')
+    boiler = solph.Transformer(
+        label='boiler', inputs={b_gas: solph.Flow()},
+        outputs={b_heat: solph.Flow()})
+    es.add(b_gas, b_heat, boiler)
+
+    assert node_registry.nodes_of_type(es, solph.Bus) == [b_gas, b_heat]
+
+    # nodes added later are indexed as well, subclasses under their parents
+    b_house = solph.Bus(label='b_house')
+    pipe = heatpipe.HeatPipeline(
+        label='pipe', inputs={b_heat: solph.Flow()},
+        outputs={b_house: solph.Flow()}, length=100, heat_loss_factor=0)
+    storage = solph.components.GenericStorage(
+        label='storage', inputs={b_heat: solph.Flow()},
+        outputs={b_heat: solph.Flow()}, nominal_storage_capacity=10)
+    es.add(b_house, pipe, storage)
+
+    assert node_registry.component_lists(es) == {
+        'buses': ['b_gas', 'b_heat', 'b_house'],
+        'transformer': ['boiler', 'pipe'],
+        'storages': ['storage']}
+    assert node_registry.nodes_of_type(es, heatpipe.HeatPipeline) == [pipe]
+    assert node_registry.node_by_label(es, 'pipe') is pipe
+
+
+def test_energy_system_without_index():
+
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2018', periods=3, freq='H'))
+    b_heat = solph.Bus(label='b_heat')
+    es.add(b_heat)
+
+    assert node_registry.nodes_of_type(es, solph.Bus) == [b_heat]
+
+    b_gas = solph.Bus(label='b_gas')
+    es.add(b_gas)
+    assert node_registry.nodes_of_type(es, solph.Bus) == [b_heat, b_gas]
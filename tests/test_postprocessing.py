@@ -0,0 +1,87 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import oemof.solph as solph
+import oemof.outputlib as outputlib
+import node_registry
+import postprocessing
+
+
+class Node:
+
+    def __init__(self, label):
+        self.label = label
+
+    def __str__(self):
+        return self.label
+
+
+def results():
+
+    index = pd.date_range('1/1/2018', periods=2, freq='H')
+    b_heat, boiler, house = Node('b_heat'), Node('boiler'), Node('house')
+
+    def flow(values, invest=None):
+        scalars = pd.Series(dtype=float)
+        if invest is not None:
+            scalars = pd.Series({'invest': invest})
+        return {'scalars': scalars,
+                'sequences': pd.DataFrame({'flow': values}, index=index)}
+
+    return {(boiler, b_heat): flow([3., 4.], invest=5.),
+            (b_heat, house): flow([3., 4.])}
+
+
+def test_node_views_are_cached_and_evicted():
+
+    res = results()
+    views = postprocessing.ResultViews(res, max_cached=1)
+
+    bus = views.node('b_heat')
+    expected = outputlib.views.node(res, 'b_heat')
+    pd.testing.assert_frame_equal(bus['sequences'], expected['sequences'])
+    assert views.node('b_heat') is bus
+
+    assert views.node('boiler')['scalars'].iloc[0] == 5
+    # the view of the bus has been evicted
+    assert views.node('b_heat') is not bus
+
+
+def test_export_one_file_per_bus(tmpdir):
+
+    es = node_registry.energy_system(
+        timeindex=pd.date_range('1/1/2018', periods=2, freq='H'))
+    b_heat = solph.Bus(label='b_heat')
+    es.add(b_heat, solph.Transformer(label='boiler',
+                                     outputs={b_heat: solph.Flow()}))
+
+    path = postprocessing.export_results(
+        res=results(), es=es, path=os.path.join(str(tmpdir), 'results'),
+        fmt='csv')
+
+    assert sorted(os.listdir(path)) == ['Invest.csv', 'b_heat.csv']
+    heat = pd.read_csv(os.path.join(path, 'b_heat.csv'), index_col=0)
+    assert list(heat.columns) == ['b_heat -> house: flow',
+                                  'boiler -> b_heat: flow']
+    assert list(heat['boiler -> b_heat: flow']) == [3, 4]
+    assert pd.read_csv(os.path.join(path, 'Invest.csv'))['boiler'][0] == 5
+
+
+def test_downsampling_keeps_peaks():
+
+    values = np.zeros((8760, 2))
+    values[1000, 0] = 10
+    values[5000, 1] = -3
+
+    positions = postprocessing.minmax_positions(values, max_points=200)
+
+    assert positions.shape[0] <= 200
+    assert (np.diff(positions, axis=0) >= 0).all()
+    assert values[positions[:, 0], 0].max() == 10
+    assert values[positions[:, 1], 1].min() == -3
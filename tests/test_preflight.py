@@ -0,0 +1,39 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import pandas as pd
+import oemof.solph as solph
+from customized import add_contraints
+import preflight
+
+
+def test_prediction_matches_the_built_model():
+
+    es = solph.EnergySystem(
+        timeindex=pd.date_range('1/1/2018', periods=3, freq='H'))
+    b_gas = solph.Bus(label='b_gas')
+    b_heat = solph.Bus(label='b_heat')
+    es.add(b_gas, b_heat)
+    es.add(solph.Source(label='gas', outputs={b_gas: solph.Flow(
+        variable_costs=2, emission_factor=[0.2, 0, 0.2])}))
+    es.add(solph.Transformer(
+        label='boiler', inputs={b_gas: solph.Flow()},
+        outputs={b_heat: solph.Flow(investment=solph.Investment(
+            ep_costs=10))},
+        conversion_factors={b_heat: 0.9}))
+    es.add(solph.Sink(label='house', inputs={b_heat: solph.Flow(
+        actual_value=[8, 6, 2], fixed=True, nominal_value=1)}))
+
+    report = preflight.preflight(es, memory_budget=1e-3)
+
+    om = solph.Model(es)
+    add_contraints.emission_limit_dyn(om, limit=100)
+
+    assert report['total']['variables'] == om.nvariables()
+    assert report['total']['constraints'] == om.nconstraints()
+    assert report['blocks'].loc['emission limit', 'nonzeros'] == 2
+    assert not report['within_budget']
+    assert 'downsample_nodes_data' in report['suggestion']
@@ -0,0 +1,68 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pandas as pd
+import lean_results
+import result_cache
+
+
+def nodes_data(limit=1000):
+
+    return {'general': pd.DataFrame({'timesteps': [2],
+                                     'emission limit': [limit]}),
+            'timeseries': pd.DataFrame({'pv.actual_value': [0.1, 0.5]})}
+
+
+def test_fingerprint_covers_data_and_solver_options():
+
+    fp = result_cache.model_fingerprint(nodes_data(), cmdline_options={
+        'threads': 2})
+
+    assert fp == result_cache.model_fingerprint(
+        nodes_data(), cmdline_options={'threads': 2})
+    assert fp != result_cache.model_fingerprint(
+        nodes_data(limit=999), cmdline_options={'threads': 2})
+    assert fp != result_cache.model_fingerprint(
+        nodes_data(), cmdline_options={'threads': 4})
+
+    nd = nodes_data()
+    nd['timeseries'].iloc[1, 0] = 0.6
+    assert fp != result_cache.model_fingerprint(
+        nd, cmdline_options={'threads': 2})
+
+
+def test_results_roundtrip(tmpdir):
+
+    results = {('pv', 'b_el'): {'scalars': pd.Series(dtype=float),
+                                'sequences': pd.DataFrame({'flow': [1, 2]})}}
+
+    assert result_cache.load_results(str(tmpdir), 'abc') is None
+
+    result_cache.store_results(str(tmpdir), 'abc', results, {'objective': 3})
+    loaded, meta = result_cache.load_results(str(tmpdir), 'abc')
+
+    assert list(loaded) == [('pv', 'b_el')]
+    assert list(loaded['pv', 'b_el']['sequences']['flow']) == [1, 2]
+    assert meta == {'objective': 3}
+
+
+def test_view_roundtrip(tmpdir):
+
+    lean = lean_results.LeanResults(
+        pd.date_range('1/1/2018', periods=2, freq='H'), [('pv', 'b_el')],
+        np.array([[1.], [2.]]), [], np.empty((2, 0)), [], [])
+    view = lean.view()
+    view['pv', None] = {'scalars': pd.Series({'size': 3.}),
+                        'sequences': pd.DataFrame()}
+
+    result_cache.store_results(str(tmpdir), 'abc', view, {})
+    loaded, _ = result_cache.load_results(str(tmpdir), 'abc')
+
+    assert isinstance(loaded, lean_results.ResultsView)
+    assert list(loaded) == [('pv', 'b_el'), ('pv', None)]
+    assert list(loaded.lean.flow('pv', 'b_el')) == [1, 2]
+    assert loaded['pv', None]['scalars']['size'] == 3
@@ -0,0 +1,107 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from oemof.outputlib import processing
+import rolling_horizon
+import setup_solve_model
+
+
+def test_windows_cover_horizon_once():
+
+    parts = rolling_horizon.windows(400, window=168, overlap=24)
+
+    assert parts == [(0, 168, 144), (144, 312, 144), (288, 400, 112)]
+    assert sum(keep for _, _, keep in parts) == 400
+
+    with pytest.raises(ValueError):
+        rolling_horizon.windows(400, window=24, overlap=24)
+
+
+def test_slice_scales_summed_limits():
+
+    nd = {'timeseries': pd.DataFrame({'pv.actual_value': range(100)}),
+          'transformer': pd.DataFrame({'label': ['chp'],
+                                       'in_1_sum_max': [5000.]}),
+          'general': pd.DataFrame({'timesteps': [100],
+                                   'emission limit': [1000]})}
+
+    sliced = setup_solve_model.slice_nodes_data(nd, 20, 45)
+
+    assert list(sliced['timeseries']['pv.actual_value']) == list(
+        range(20, 45))
+    assert sliced['general']['timesteps'][0] == 25
+    assert sliced['general']['emission limit'][0] == 250
+    assert sliced['transformer']['in_1_sum_max'][0] == 1250
+    # the original nodes data are not changed
+    assert nd['transformer']['in_1_sum_max'][0] == 5000
+
+
+def test_slice_budget_follows_used_limits():
+
+    nd = {'timeseries': pd.DataFrame({'pv.actual_value': range(100)}),
+          'transformer': pd.DataFrame({'label': ['chp'],
+                                       'in_1_sum_max': [5000.]}),
+          'general': pd.DataFrame({'timesteps': [100],
+                                   'emission limit': [1000]})}
+
+    # only the first 10 timesteps of the slice are kept, the timesteps
+    # before have used less emissions and more of the chp than their share
+    sliced = setup_solve_model.slice_nodes_data(
+        nd, 20, 45, keep=10,
+        used={('general', None, 'emission limit'): 150,
+              ('transformer', 'chp', 'in_1_sum_max'): 1500})
+
+    assert sliced['general']['emission limit'][0] == 300 - 150
+    assert sliced['transformer']['in_1_sum_max'][0] == 0
+
+
+def test_rolling_horizon_keeps_emission_limit(district):
+
+    nd = district(timesteps=72, emission_limit=30)
+
+    def gas_flow(results):
+        return [v['sequences']['flow'] for k, v in results.items()
+                if (str(k[0]), str(k[1])) == ('gas', 'b_gas')][0]
+
+    es = setup_solve_model.setup_es(excel_nodes=nd)
+    om = setup_solve_model.create_model(energysystem=es, excel_nodes=nd)
+    om.solve(solver='cbc')
+    assert np.isclose(0.2 * gas_flow(processing.results(om)).sum(), 30)
+
+    # the overlap of the windows must not add to the limit
+    results = rolling_horizon.solve_rolling_horizon(nd, window=24,
+                                                    overlap=12)
+    flow = gas_flow(results)
+    assert len(flow) == 72
+    assert 0.2 * flow.sum() <= 30 + 1e-6
+
+
+def test_storage_is_balanced_over_the_horizon(district, capsys):
+
+    # the gas boiler alone cannot cover the peak of the demand, the storage
+    # shifts heat from the night to the morning
+    nd = district(timesteps=72)
+    nd['transformer'].loc[0, 'installed'] = 12
+    nd['transformer'].loc[1, 'active'] = 0
+    nd['storages'] = pd.DataFrame({
+        'label': ['heat_storage'], 'active': [1], 'bus': ['b_heat'],
+        'invest': [0], 'capacity_loss': [0], 'capacity': [100],
+        'inflow_conversion_factor': [1], 'outflow_conversion_factor': [1]})
+
+    results = rolling_horizon.solve_rolling_horizon(nd, window=24,
+                                                    overlap=12)
+
+    storage = [v for k, v in results.items()
+               if (str(k[0]), k[1]) == ('heat_storage', None)][0]
+    initial = storage['scalars']['init_cap']
+    assert initial > 1
+    assert np.isclose(storage['sequences']['capacity'].iloc[-1], initial)
+
+    # the nodes of the windows are not printed
+    assert 'The following objects' not in capsys.readouterr().out
@@ -0,0 +1,54 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import setup_solve_model
+
+
+def nodes_data():
+
+    index = pd.date_range('1/1/2019', periods=10, freq='15min')
+    return {'timeseries': pd.DataFrame({'demand.actual_value': np.arange(10.)},
+                                       index=index),
+            'general': pd.DataFrame({'timesteps': [10]})}
+
+
+def test_quarter_hours_are_taken_from_the_data():
+
+    nd = nodes_data()
+    nd['timeseries'].index.freq = None
+
+    index = setup_solve_model.time_index(nd)
+    assert index[0] == pd.Timestamp('1/1/2019')
+    assert setup_solve_model.timestep_hours(nd) == 0.25
+    assert setup_solve_model.horizon_hours(nd) == 2.5
+
+
+def test_resampling_keeps_the_energy():
+
+    nd = nodes_data()
+    hourly = setup_solve_model.resample_nodes_data(nd, '1h')
+
+    assert hourly['general']['timesteps'][0] == 3
+    assert setup_solve_model.timestep_hours(hourly) == 1
+    assert list(hourly['timeseries']['demand.actual_value']) == [1.5, 5.5,
+                                                                 8.5]
+    # the last hour only covers two quarter hours
+    assert list(hourly['aggregation']['timeincrement']) == [1, 1, 0.5]
+    assert setup_solve_model.horizon_hours(hourly) == 2.5
+    assert np.isclose(
+        (hourly['timeseries']['demand.actual_value'] *
+         hourly['aggregation']['timeincrement']).sum(),
+        nd['timeseries']['demand.actual_value'].sum() * 0.25)
+    # the original nodes data are not changed
+    assert nd['general']['timesteps'][0] == 10
+
+    with pytest.raises(ValueError):
+        setup_solve_model.resample_nodes_data(nd, '5min')
+    with pytest.raises(ValueError):
+        setup_solve_model.resample_nodes_data(nd, '20min')
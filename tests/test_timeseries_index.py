@@ -0,0 +1,42 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import pandas as pd
+import pytest
+import setup_solve_model
+
+
+def test_both_column_conventions_are_indexed():
+
+    ts = pd.DataFrame({'gas.emission_factor': [0.2, 0.3],
+                       'gas..variable_costs': [5, 6],
+                       'pv.actual_value': [0.1, 0.5]})
+
+    tsi = setup_solve_model.timeseries_index(ts, labels={'gas', 'pv'})
+
+    assert sorted(tsi) == ['gas', 'pv']
+    assert sorted(tsi['gas']) == ['emission_factor', 'variable_costs']
+    assert list(tsi['gas']['variable_costs']) == [5, 6]
+    assert list(setup_solve_model.get_series(
+        tsi, 'pv', 'actual_value')) == [0.1, 0.5]
+
+
+def test_duplicate_columns_are_rejected():
+
+    ts = pd.DataFrame({'gas.variable_costs': [1, 2],
+                       'gas..variable_costs': [1, 2]})
+
+    with pytest.raises(ValueError):
+        setup_solve_model.timeseries_index(ts)
+
+
+def test_missing_series_is_reported():
+
+    tsi = setup_solve_model.timeseries_index(
+        pd.DataFrame({'gas.emission_factor': [0.2]}))
+
+    with pytest.raises(ValueError):
+        setup_solve_model.get_series(tsi, 'gas', 'variable_costs')
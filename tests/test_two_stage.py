@@ -0,0 +1,64 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import pytest
+import setup_solve_model
+import two_stage
+
+
+def invest_data(district):
+    """District with the gas boiler as only, invested heat generator."""
+    nd = district(timesteps=24)
+    nd['transformer'].loc[0, ['invest', 'capex', 'max_invest']] = \
+        [1, 1000, 100]
+    nd['transformer'].loc[1, 'active'] = 0
+    return nd
+
+
+def test_dispatch_is_solved_with_the_fixed_investments(district,
+                                                       monkeypatch):
+
+    models = []
+    create_model = setup_solve_model.create_model
+
+    def record(*args, **kwargs):
+        models.append(create_model(*args, **kwargs))
+        return models[-1]
+
+    monkeypatch.setattr(setup_solve_model, 'create_model', record)
+
+    # the demand averaged over two steps is below the peak of the full
+    # resolution, so the dispatch needs a margin
+    es, summary = two_stage.solve_two_stage(
+        invest_data(district), factor=2, margins=[0, 0.1])
+
+    assert len(models) == 2
+    stage1 = two_stage.investment_decisions(models[0])
+    label = 'boiler_gas -> b_heat'
+    capacity = stage1['InvestmentFlow', 'invest', label]
+    assert 14 < capacity < 15
+
+    invest = [v for i, v in models[1].InvestmentFlow.invest.items()
+              if two_stage._label(i) == label][0]
+    assert invest.fixed
+    assert invest.value == pytest.approx(capacity * 1.1)
+
+    assert summary['margin'] == 0.1
+    assert summary['termination'] == 'optimal'
+    assert summary['investments'][label] == pytest.approx(capacity)
+    assert es.results['main'] is not None
+
+
+def test_missing_investment_is_an_error(district):
+
+    nd = invest_data(district)
+    es = setup_solve_model.setup_es(excel_nodes=nd)
+    om = setup_solve_model.create_model(energysystem=es, excel_nodes=nd)
+
+    with pytest.raises(ValueError, match='boiler_oil -> b_heat'):
+        two_stage.fix_investments(om, {
+            ('InvestmentFlow', 'invest', 'boiler_gas -> b_heat'): 10,
+            ('InvestmentFlow', 'invest', 'boiler_oil -> b_heat'): 10})
@@ -0,0 +1,112 @@
+"""
+oemof application for research project quarree100.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import os
+import pandas as pd
+import pytest
+import setup_solve_model
+
+
+def write(path, content):
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def nodes_data(limit=100):
+
+    index = pd.date_range('1/1/2018', periods=2, freq='H', name='timestamp')
+    return {'general': pd.DataFrame({'timesteps': [2],
+                                     'emission limit': [limit]}),
+            'timeseries': pd.DataFrame({'pv.actual_value': [0.1, 0.5]},
+                                       index=index)}
+
+
+def test_cache_entry_follows_content_and_version(tmpdir, monkeypatch):
+
+    workbook = os.path.join(str(tmpdir), 'scenario.xlsx')
+    cache_dir = os.path.join(str(tmpdir), 'cache')
+    write(workbook, 'first')
+
+    entry = setup_solve_model._cache_path(workbook, cache_dir)
+    assert setup_solve_model._cache_path(workbook, cache_dir) == entry
+
+    write(workbook, 'second')
+    changed = setup_solve_model._cache_path(workbook, cache_dir)
+    assert changed != entry
+
+    monkeypatch.setattr(setup_solve_model, 'CACHE_VERSION',
+                        setup_solve_model.CACHE_VERSION + 1)
+    assert setup_solve_model._cache_path(workbook, cache_dir) != changed
+
+
+def test_workbooks_of_same_name_keep_their_entries(tmpdir):
+
+    cache_dir = os.path.join(str(tmpdir), 'cache')
+    first = os.path.join(str(tmpdir), 'a', 'scenario.xlsx')
+    second = os.path.join(str(tmpdir), 'b', 'scenario.xlsx')
+    write(first, 'a')
+    write(second, 'b')
+
+    first_entry = setup_solve_model._cache_path(first, cache_dir)
+    setup_solve_model._write_cache(first_entry, nodes_data())
+
+    entries = []
+    for limit in range(3):
+        write(second, 'b{0}'.format(limit))
+        entries.append(setup_solve_model._cache_path(second, cache_dir))
+        setup_solve_model._write_cache(entries[-1], nodes_data(limit))
+        os.utime(entries[-1], (limit, limit))
+
+    # only the newest entries of the second workbook are kept
+    assert sorted(os.listdir(cache_dir)) == sorted(
+        os.path.basename(e) for e in [first_entry] + entries[-2:])
+
+    cached = setup_solve_model._read_cache(entries[-1])
+    assert cached['general']['emission limit'][0] == 2
+    pd.testing.assert_frame_equal(cached['timeseries'],
+                                  nodes_data()['timeseries'],
+                                  check_freq=False)
+
+
+def test_workbook_is_read_from_cache(tmpdir, monkeypatch, capsys):
+
+    pytest.importorskip('openpyxl')
+
+    workbook = os.path.join(str(tmpdir), 'scenario.xlsx')
+    cache_dir = os.path.join(str(tmpdir), 'cache')
+
+    def save(limit):
+        nd = nodes_data(limit)
+        with pd.ExcelWriter(workbook) as writer:
+            for key, sheet in setup_solve_model.SHEETS.items():
+                if key == 'timeseries':
+                    nd[key].reset_index().to_excel(
+                        writer, sheet_name=sheet, index=False)
+                elif key not in setup_solve_model.OPTIONAL_SHEETS:
+                    nd.get(key, pd.DataFrame({'label': []})).to_excel(
+                        writer, sheet_name=sheet, index=False)
+
+    def read():
+        nd = setup_solve_model.nodes_from_excel(workbook, cache_dir=cache_dir)
+        return nd, 'from cache' in capsys.readouterr().out
+
+    save(100)
+    assert not read()[1]
+    nd, cached = read()
+    assert cached
+    assert nd['general']['emission limit'][0] == 100
+
+    save(50)
+    nd, cached = read()
+    assert not cached
+    assert nd['general']['emission limit'][0] == 50
+
+    monkeypatch.setattr(setup_solve_model, 'CACHE_VERSION',
+                        setup_solve_model.CACHE_VERSION + 1)
+    assert not read()[1]
+    assert read()[1]
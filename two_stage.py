@@ -0,0 +1,210 @@
+"""
+oemof application for research project quarree100.
+
+Two-stage investment heuristic. The investment model is first solved for a
+reduced time representation, either typical periods (see
+:func:`aggregation.aggregate_nodes_data`) or chronologically downsampled
+steps (see :func:`aggregation.downsample_nodes_data`). The invested
+capacities are then fixed and the dispatch is solved at full resolution,
+which validates the sizing and reports the true costs.
+
+Usage:
+
+>>> nd = setup_solve_model.nodes_from_excel(filename)
+>>> es, summary = two_stage.solve_two_stage(nd, n_periods=12,
+...                                         margins=[0, 0.05, 0.1])
+
+If the dispatch with the fixed capacities is infeasible, it is solved again
+with the capacities increased by the next margin.
+
+SPDX-License-Identifier: GPL-3.0-or-later
+"""
+
+import logging
+import pandas as pd
+import pyomo.environ as po
+import oemof.outputlib as outputlib
+from pyomo.opt import TerminationCondition
+from customized import heatpipe
+import aggregation
+import lean_results
+import setup_solve_model
+from model_solver import ModelSolver
+
+
+# blocks of the model with investment variables
+INVEST_BLOCKS = ['InvestmentFlow', 'GenericInvestmentStorageBlock']
+
+
+def _label(index):
+    """Return the labels of the nodes of a variable index."""
+    if not isinstance(index, tuple):
+        index = (index,)
+    return ' -> '.join(str(n) for n in index)
+
+
+def investment_decisions(om):
+    """Return the investment decisions of a solved model.
+
+    Parameters
+    ----------
+    om : :class:`oemof.solph.Model`
+
+    Returns
+    -------
+    :obj:`dict`
+        Values of the 'invest' variables of the :const:`INVEST_BLOCKS` and
+        of the size variables of the heat pipeline catalog, keyed by
+        (block, variable, label).
+    """
+    decisions = {}
+    for name in INVEST_BLOCKS:
+        block = getattr(om, name, None)
+        if hasattr(block, 'invest'):
+            for index in block.invest:
+                decisions[name, 'invest', _label(index)] = \
+                    block.invest[index].value
+
+    block = getattr(om, 'HeatPipelineCatalogBlock', None)
+    if block is not None:
+        for var in block._sizes:
+            for n in var:
+                decisions['HeatPipelineCatalogBlock', var.local_name,
+                          _label(n)] = var[n].value
+
+    return decisions
+
+
+def fix_investments(om, decisions, margin=0):
+    """Fix the investment variables of a model.
+
+    Parameters
+    ----------
+    om : :class:`oemof.solph.Model`
+        Model with the same investment components as the one the
+        decisions are taken from.
+    decisions : :obj:`dict`
+        See :func:`investment_decisions`.
+    margin : float
+        Relative increase of the invested capacities. The sizes chosen from
+        the heat pipeline catalog are discrete and fixed without margin.
+    """
+    indices = {}
+    missing = []
+    for (name, var_name, label), value in decisions.items():
+        var = getattr(getattr(om, name, None), var_name, None)
+        if var is None:
+            missing.append(label)
+            continue
+        if (name, var_name) not in indices:
+            indices[name, var_name] = {_label(i): i for i in var}
+        index = indices[name, var_name].get(label)
+        if index is None:
+            missing.append(label)
+            continue
+        if var_name == 'invest':
+            value = value * (1 + margin)
+        var[index].fix(value)
+
+    if missing:
+        raise ValueError('Investments not found in the model: {0}'.format(
+            ', '.join(missing)))
+
+
+def solve_two_stage(excel_nodes, n_periods=None, period_length=24,
+                    factor=None, method='kmeans', margins=(0,),
+                    solver='cbc', cmdline_options=None):
+    """Size the energy system on a reduced time representation and solve
+    the dispatch at full resolution.
+
+    Parameters
+    ----------
+    excel_nodes : :obj:`dict`
+        Nodes data
+    n_periods : int (optional)
+        Number of typical periods of the first stage.
+    period_length : int
+        Number of timesteps per typical period.
+    factor : int (optional)
+        Number of timesteps averaged to one step of the first stage, used if
+        `n_periods` is not given.
+    method : str
+        Clustering method of the typical periods, 'kmeans' or 'kmedoids'.
+    margins : list of float
+        Relative capacity margins tried one after another until the full
+        resolution dispatch is feasible.
+    solver : str
+        Solver to be used.
+    cmdline_options : dict (optional)
+        Solver options, e.g. {'threads': 4}.
+
+    Returns
+    -------
+    energysystem : :class:`oemof.solph.EnergySystem`
+        Full resolution energy system with the results of the dispatch in
+        `energysystem.results['main']` and `energysystem.results['meta']`.
+    summary : :obj:`dict`
+        'objective_stage1' and 'objective' (total costs at full
+        resolution), the 'margin' used, the 'termination' condition of the
+        dispatch and the fixed 'investments'
+        (:pandas:`pandas.Series` of :func:`investment_decisions`).
+    """
+    if n_periods is not None:
+        nd_red = aggregation.aggregate_nodes_data(
+            excel_nodes, n_periods, period_length=period_length,
+            method=method)
+    elif factor is not None:
+        nd_red = aggregation.downsample_nodes_data(excel_nodes, factor)
+    else:
+        raise ValueError('Either n_periods or factor has to be given.')
+
+    logging.info('Stage 1: solve the investment model with {0} timesteps'
+                 .format(nd_red['general']['timesteps'][0]))
+    es_red = setup_solve_model.setup_es(excel_nodes=nd_red)
+    om_red = setup_solve_model.create_model(energysystem=es_red,
+                                            excel_nodes=nd_red)
+    solver_results = ModelSolver(om_red, solver=solver,
+                                 cmdline_options=cmdline_options).solve()
+    if (solver_results.solver.termination_condition !=
+            TerminationCondition.optimal):
+        raise RuntimeError(
+            'No optimal solution of the first stage: {0}'.format(
+                solver_results.solver.termination_condition))
+
+    decisions = investment_decisions(om_red)
+    summary = {'objective_stage1': po.value(om_red.objective)}
+    del om_red, es_red
+
+    logging.info('Stage 2: solve the dispatch with {0} fixed investments '
+                 'at full resolution'.format(len(decisions)))
+    es = setup_solve_model.setup_es(excel_nodes=excel_nodes)
+    om = setup_solve_model.create_model(energysystem=es,
+                                        excel_nodes=excel_nodes)
+    model_solver = ModelSolver(om, solver=solver,
+                               cmdline_options=cmdline_options)
+
+    for margin in margins:
+        fix_investments(om, decisions, margin=margin)
+        solver_results = model_solver.solve()
+        termination = solver_results.solver.termination_condition
+        logging.info('Dispatch with a capacity margin of {0:.0%}: {1}'
+                     .format(margin, termination))
+        if termination == TerminationCondition.optimal:
+            break
+
+    summary.update({'margin': margin, 'termination': str(termination),
+                    'investments': pd.Series(
+                        {label: value for (_, var, label), value
+                         in decisions.items() if var == 'invest'})})
+
+    if termination == TerminationCondition.optimal:
+        summary['objective'] = po.value(om.objective)
+        # the heat loss of the pipes is no variable of the model
+        es.results['main'] = lean_results.extract_results(om).view()
+        heatpipe.heat_loss_results(om, es.results['main'])
+        es.results['meta'] = outputlib.processing.meta_results(om)
+    else:
+        logging.warning('The dispatch is infeasible with all capacity '
+                        'margins.')
+
+    return es, summary